@@ -3,15 +3,22 @@ from flask_cors import CORS
 from flask_migrate import Migrate
 from .config import Config
 from .models import db
-from .models.models import Topic, Question, WikiPage
-from .routes import topic_bp, quiz_bp, api_bp, wiki_bp
+from .models import models  # noqa: F401  registers every table on db.metadata for create_all/migrations
+from .routes import topic_bp, quiz_bp, api_bp, wiki_bp, search_bp
+from . import compression, health, metrics
+from .json_provider import FastJSONProvider
+from .logging_config import setup_logging
+import logging
 import os
 
 migrate = Migrate()
+logger = logging.getLogger(__name__)
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = FastJSONProvider(app)
+    setup_logging()
     
     # Initialize extensions
 
@@ -19,26 +26,36 @@ def create_app(config_class=Config):
     if os.getenv('ALLOWED_ORIGINS'):
         # Get allowed origins from environment variable
         allowed_origins = os.getenv('ALLOWED_ORIGINS').split(',')
-        print(f"CORS allowing specific origins: {allowed_origins}")
+        logger.info("CORS allowing specific origins", extra={'origins': allowed_origins})
         # Initialize CORS with specific origins
         CORS(app, origins=allowed_origins, supports_credentials=True)
     else:
         # Use default behavior (allow all origins) for development
-        print("CORS allowing all origins (development mode)")
+        logger.info("CORS allowing all origins (development mode)")
         CORS(app)
     
     db.init_app(app)
     migrate.init_app(app, db)
+    metrics.init_app(app)
+    compression.init_app(app)
     
     # Register blueprints
     app.register_blueprint(topic_bp)
     app.register_blueprint(quiz_bp)
     app.register_blueprint(wiki_bp)
+    app.register_blueprint(search_bp)
     app.register_blueprint(api_bp)
     
-    # Health check route
+    # Liveness: the process is up; never touches the database
     @app.route('/health', methods=['GET'])
+    @app.route('/health/live', methods=['GET'])
     def health_check():
         return {"status": "healthy"}, 200
     
+    # Readiness: database reachable, pool not saturated and search index built (DB pinged at most once per interval)
+    @app.route('/health/ready', methods=['GET'])
+    def readiness_check():
+        ready, checks = health.get_readiness_check().run()
+        return {"status": "ready" if ready else "not ready", "checks": checks}, 200 if ready else 503
+    
     return app
\ No newline at end of file
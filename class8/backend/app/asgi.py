@@ -0,0 +1,197 @@
+"""ASGI serving mode with async database reads for the hot GET endpoints.
+
+Selected with ``SERVER_MODE=asgi`` (see gunicorn.conf.py), which serves
+``asgi:app`` with uvicorn workers. Requests are matched against the Flask
+app's own URL map:
+
+* GET/HEAD requests for the views in ``ASYNC_VIEWS`` (topic list, quiz,
+  wiki list and wiki page) run on the event loop, with an async SQLAlchemy
+  engine (asyncpg/aiosqlite). A slow query parks a coroutine instead of
+  blocking a worker.
+* Everything else, including writes, stats, search and
+  ``/api/wiki/<slug>?format=html`` (which writes the render cache), goes to
+  the unchanged Flask app through a thread pool (a2wsgi).
+
+Async views run inside a Flask request context with the app's
+before/after/teardown hooks, so CORS headers, metrics, request logs, the
+response cache and error pages are the same in both modes.
+"""
+import io
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from flask import abort, current_app, jsonify, request
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import defer, load_only, sessionmaker
+from werkzeug.exceptions import HTTPException
+
+from app import cache, create_app
+from app.config import Config, engine_options
+from app.models.models import CacheVersion, Question, Topic, WikiPage
+from app.routes.quiz_routes import quiz_payload
+from app.routes.wiki_routes import SUMMARY_COLUMNS, conditional_page_response, wiki_list_payload
+
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}
+ASYNC_VIEWS = {}
+
+
+def async_database_url(url):
+    """Swap the sync driver in a database URL for its asyncio counterpart"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    query = dict(url.query)
+    if 'sslmode' in query:  # libpq spelling; asyncpg calls it ssl
+        query['ssl'] = query.pop('sslmode')
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}", query=query)
+
+
+def async_view(endpoint, accepts=None):
+    """Serve the Flask ``endpoint`` with this coroutine; ``accepts(request)`` may send a request to Flask instead"""
+    def decorator(view):
+        ASYNC_VIEWS[endpoint] = (view, accepts)
+        return view
+    return decorator
+
+
+def _sessions():
+    return current_app.extensions['async_db']()
+
+
+async def _cache_version(namespace):
+    async with _sessions() as session:
+        return await session.scalar(select(CacheVersion.version).filter_by(namespace=namespace)) or 0
+
+
+@async_view('topics.get_topics')
+@cache.cached_async_response(cache.TOPICS, _cache_version)
+async def get_topics():
+    async with _sessions() as session:
+        topics = (await session.execute(select(Topic))).scalars().all()
+    return jsonify([topic.to_dict() for topic in topics])
+
+
+@async_view('quizzes.get_quiz')
+async def get_quiz(topic_slug):
+    async with _sessions() as session:
+        topic = await session.scalar(select(Topic).filter_by(slug=topic_slug).limit(1))
+        if topic is None:
+            abort(404)
+        all_questions = (await session.execute(select(Question).filter_by(topic_id=topic.id))).scalars().all()
+    return jsonify(quiz_payload(topic, all_questions))
+
+
+@async_view('wiki.get_all_wiki_pages')
+async def get_all_wiki_pages():
+    category = request.args.get('category')
+    view = request.args.get('view', 'full')
+    if view not in ('full', 'summary'):
+        return jsonify({'error': 'view must be one of: full, summary'}), 400
+
+    query = select(WikiPage)
+    if view == 'summary':
+        query = query.options(load_only(*SUMMARY_COLUMNS))
+    if category:
+        query = query.filter_by(category=category)
+    async with _sessions() as session:
+        pages = (await session.execute(query)).scalars().all()
+    return jsonify(wiki_list_payload(pages, view, category))
+
+
+@async_view('wiki.get_wiki_page', accepts=lambda req: req.args.get('format', 'markdown') == 'markdown')
+async def get_wiki_page(slug):
+    async with _sessions() as session:
+        page = await session.scalar(
+            select(WikiPage).options(defer(WikiPage.content)).filter_by(slug=slug).limit(1)
+        )
+        if page is None:
+            abort(404)
+        response = conditional_page_response(page, 'markdown')
+        if response.status_code == 304:
+            return response
+        result = page.to_dict(include_content=False)
+        result['content'] = await session.scalar(select(WikiPage.content).filter_by(id=page.id))
+    response.set_data(current_app.json.dumps_bytes(result))
+    return response
+
+
+class AsyncApp:
+    """ASGI callable: async views for hot reads, the Flask app for everything else"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config.get('ASGI_WSGI_THREADS', 10))
+        url = flask_app.config.get('ASYNC_DATABASE_URI') or async_database_url(
+            flask_app.config['SQLALCHEMY_DATABASE_URI']
+        )
+        self.engine = create_async_engine(url, **engine_options(str(url)))
+        flask_app.extensions['async_db'] = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            environ = build_environ(scope, io.BytesIO())
+            view, view_args = self._match(environ)
+            if view is not None:
+                return await self._serve(view, view_args, environ, send)
+        await self.wsgi(scope, receive, send)
+
+    def _match(self, environ):
+        flask_request = self.flask_app.request_class(environ)
+        try:
+            rule, view_args = self.flask_app.create_url_adapter(flask_request).match(return_rule=True)
+        except HTTPException:
+            return None, None
+        view, accepts = ASYNC_VIEWS.get(rule.endpoint, (None, None))
+        if view is None or (accepts is not None and not accepts(flask_request)):
+            return None, None
+        return view, view_args
+
+    async def _serve(self, view, view_args, environ, send):
+        """Flask's full_dispatch_request, awaiting the view"""
+        app = self.flask_app
+        ctx = app.request_context(environ)
+        error = None
+        try:
+            ctx.push()
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    rv = await view(**view_args)
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+            response = app.finalize_request(rv)
+        except Exception as e:
+            error = e
+            response = app.handle_exception(e)
+        try:
+            app_iter, status, headers = response.get_wsgi_response(environ)
+            await send({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+            })
+            for chunk in app_iter:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            response.close()
+            ctx.pop(error)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(config_class=Config):
+    return AsyncApp(create_app(config_class))
@@ -0,0 +1,202 @@
+"""Versioned response cache for small catalog endpoints (topics, wiki categories).
+
+Each namespace has a version number stored in ``cache_versions``. Write routes
+call ``invalidate(namespace)`` inside their transaction, which bumps the
+version in the database; cached bodies are keyed by version, so every worker
+and pod stops serving the old body once the write commits. Workers trust their
+last-read version for ``RESPONSE_CACHE_VERSION_TTL`` seconds, so another
+process can serve a stale body for at most that long; the process that did
+the write drops its copy of the version as soon as the transaction commits.
+Dropping it any earlier would let a concurrent request re-read the old version
+and cache the old body under it.
+
+Bodies are keyed by path plus the query arguments the view declares it reads,
+so junk query strings share an entry, and each worker keeps at most
+``RESPONSE_CACHE_MAX_ENTRIES`` bodies, evicting the least recently used.
+
+Cached responses carry a body-hash ETag and a ``Cache-Control`` header so
+browsers and CDNs can revalidate with If-None-Match. Compressed bodies are
+kept with the entry, one per Content-Encoding.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import compression
+from app.models import db
+from app.models.models import CacheVersion
+
+TOPICS = 'topics'
+WIKI_CATEGORIES = 'wiki_categories'
+
+_PENDING = 'response_cache_namespaces'  # Session.info key: namespaces bumped in the open transaction
+
+
+class ResponseCache:
+    def __init__(self, version_ttl, max_entries):
+        self.version_ttl = version_ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.versions = {}   # namespace -> (version, read at)
+        self.entries = OrderedDict()  # (namespace, version, key) -> (body, mimetype, etag, {encoding: body}), oldest use first
+
+    def current_version(self, namespace):
+        version = self.cached_version(namespace)
+        if version is None:
+            version = db.session.query(CacheVersion.version).filter_by(namespace=namespace).scalar() or 0
+            self.store_version(namespace, version)
+        return version
+
+    def cached_version(self, namespace):
+        """The last version read for ``namespace`` if it is still trusted, else None"""
+        with self.lock:
+            known = self.versions.get(namespace)
+        if known and time.monotonic() - known[1] < self.version_ttl:
+            return known[0]
+        return None
+
+    def store_version(self, namespace, version):
+        with self.lock:
+            self.versions[namespace] = (version, time.monotonic())
+            # Drop bodies cached under older versions of this namespace
+            for entry_key in [k for k in self.entries if k[0] == namespace and k[1] != version]:
+                del self.entries[entry_key]
+
+    def get(self, namespace, version, key):
+        with self.lock:
+            entry = self.entries.get((namespace, version, key))
+            if entry is not None:
+                self.entries.move_to_end((namespace, version, key))
+            return entry
+
+    def put(self, namespace, version, key, entry):
+        with self.lock:
+            self.entries[(namespace, version, key)] = entry
+            self.entries.move_to_end((namespace, version, key))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def forget_version(self, namespace):
+        with self.lock:
+            self.versions.pop(namespace, None)
+
+
+def _get_cache():
+    cache = current_app.extensions.get('response_cache')
+    if cache is None:
+        cache = ResponseCache(
+            current_app.config.get('RESPONSE_CACHE_VERSION_TTL', 1.0),
+            current_app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 256),
+        )
+        current_app.extensions['response_cache'] = cache
+    return cache
+
+
+def invalidate(*namespaces):
+    """Bump namespace versions as part of the caller's transaction (commit is the caller's)
+
+    This worker forgets its cached versions once that transaction commits.
+    """
+    table = CacheVersion.__table__
+    for namespace in namespaces:
+        result = db.session.execute(
+            table.update().where(table.c.namespace == namespace).values(version=table.c.version + 1)
+        )
+        if result.rowcount == 0:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert().values(namespace=namespace, version=1))
+            except IntegrityError:
+                db.session.execute(
+                    table.update().where(table.c.namespace == namespace).values(version=table.c.version + 1)
+                )
+        db.session.info.setdefault(_PENDING, set()).add(namespace)
+
+
+@event.listens_for(Session, 'after_commit')
+def _forget_committed_versions(session):
+    namespaces = session.info.pop(_PENDING, None)
+    if namespaces:
+        cache = _get_cache()
+        for namespace in namespaces:
+            cache.forget_version(namespace)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_pending_versions(session, transaction):
+    # The outermost transaction ended without committing (a commit already popped them)
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
+
+
+def _make_entry(response):
+    body = response.get_data()
+    return body, response.mimetype, hashlib.sha1(body).hexdigest(), {}
+
+
+def _entry_response(entry):
+    body, mimetype, etag, encoded = entry
+    response = current_app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('RESPONSE_CACHE_MAX_AGE', 30)
+    compression.compress_response(response, encoded)
+    return response.make_conditional(request)
+
+
+def _cache_key(query_args):
+    """The request path plus the values of ``query_args``; any other query arguments are ignored"""
+    return request.path, tuple((name, tuple(request.args.getlist(name))) for name in query_args)
+
+
+def cached_response(namespace, query_args=()):
+    """Serve a GET view from the versioned cache, with ETag and Cache-Control headers
+
+    ``query_args`` names the query arguments the view reads; only they are part of the cache key.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = _get_cache()
+            key = _cache_key(query_args)
+            version = cache.current_version(namespace)
+            entry = cache.get(namespace, version, key)
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = _make_entry(response)
+                cache.put(namespace, version, key, entry)
+            return _entry_response(entry)
+        return wrapper
+    return decorator
+
+
+def cached_async_response(namespace, load_version, query_args=()):
+    """``cached_response`` for async views; ``load_version(namespace)`` is awaited on a version miss"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            cache = _get_cache()
+            key = _cache_key(query_args)
+            version = cache.cached_version(namespace)
+            if version is None:
+                version = await load_version(namespace)
+                cache.store_version(namespace, version)
+            entry = cache.get(namespace, version, key)
+            if entry is None:
+                response = current_app.make_response(await view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = _make_entry(response)
+                cache.put(namespace, version, key, entry)
+            return _entry_response(entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,123 @@
+"""Content-Encoding negotiation for JSON and text responses.
+
+Responses of at least ``COMPRESS_MIN_SIZE`` bytes are compressed with brotli
+(when the Brotli package is installed) or gzip, whichever the client's
+Accept-Encoding prefers. Streamed responses are compressed chunk by chunk and
+flushed with every chunk, so clients still receive rows as they are produced.
+
+A compressed response gets a weak ETag (``W/"..."``): the bytes differ from
+the identity body but the content is the same, and If-None-Match uses weak
+comparison, so revalidation keeps working. Cached catalog responses keep
+their compressed bodies next to the cache entry (see ``cache.py``), so they
+are compressed once per version rather than once per request.
+"""
+import gzip
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/csv'}
+
+
+def available_encodings():
+    """Supported encodings, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate():
+    """The best encoding the current request accepts, or None"""
+    accepted = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding in available_encodings():
+        quality = accepted.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding):
+    config = current_app.config
+    if encoding == 'br':
+        return brotli.compress(body, quality=config.get('COMPRESS_BROTLI_QUALITY', 4))
+    return gzip.compress(body, compresslevel=config.get('COMPRESS_LEVEL', 4), mtime=0)
+
+
+def _stream_compressor(encoding):
+    """Return (compress(chunk), flush(), finish()) callables for a streamed body"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=current_app.config.get('COMPRESS_BROTLI_QUALITY', 4))
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(current_app.config.get('COMPRESS_LEVEL', 4), zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _iter_compressed(chunks, compressor):
+    process, flush, finish = compressor
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+def _select_encoding(response):
+    """Negotiated encoding if ``response`` may be compressed, else None; sets Vary either way"""
+    if not current_app.config.get('COMPRESS_RESPONSES', True):
+        return None
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers:
+        return None
+    response.vary.add('Accept-Encoding')
+    if request.method == 'HEAD' or response.status_code != 200 or response.direct_passthrough:
+        return None
+    return negotiate()
+
+
+def _mark_encoded(response, encoding):
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def compress_response(response, encoded=None):
+    """Compress a buffered response in place; ``encoded`` caches bodies by encoding"""
+    encoding = _select_encoding(response)
+    if encoding is None or response.is_streamed:
+        return response
+    body = response.get_data()
+    if len(body) < current_app.config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+    data = encoded.get(encoding) if encoded is not None else None
+    if data is None:
+        data = compress(body, encoding)
+        if encoded is not None:
+            encoded[encoding] = data
+    if len(data) < len(body):
+        response.set_data(data)
+        _mark_encoded(response, encoding)
+    return response
+
+
+def _after_request(response):
+    if not response.is_streamed:
+        return compress_response(response)
+    encoding = _select_encoding(response)
+    if encoding is not None:
+        chunks = response.response
+        if hasattr(chunks, 'close'):
+            response.call_on_close(chunks.close)
+        response.response = _iter_compressed(chunks, _stream_compressor(encoding))
+        response.headers.pop('Content-Length', None)
+        _mark_encoded(response, encoding)
+    return response
+
+
+def init_app(app):
+    app.after_request(_after_request)
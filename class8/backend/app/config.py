@@ -3,8 +3,42 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def engine_options(database_url):
+    """Connection pool settings; SQLite's default pools take no sizing options"""
+    options = {'pool_pre_ping': True}
+    if not database_url.startswith('sqlite'):
+        options.update(
+            pool_size=int(os.getenv('DB_POOL_SIZE', '5')),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '10')),
+            pool_timeout=float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800'))
+        )
+    return options
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'postgresql://postgres:postgres@db:5432/devops_learning')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     DEBUG = bool(int(os.getenv('FLASK_DEBUG', '0')))
+    # 'auto' uses PostgreSQL full-text search when available, else the in-process index
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+    # Catalog response cache: how long a worker trusts its cached version, the max-age sent to clients/CDNs,
+    # and how many bodies a worker keeps
+    RESPONSE_CACHE_VERSION_TTL = float(os.getenv('RESPONSE_CACHE_VERSION_TTL', '1'))
+    RESPONSE_CACHE_MAX_AGE = int(os.getenv('RESPONSE_CACHE_MAX_AGE', '30'))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '256'))
+    # Readiness probe: seconds between DB pings, and pool usage above which the pod reports not ready
+    READINESS_CHECK_INTERVAL = float(os.getenv('READINESS_CHECK_INTERVAL', '5'))
+    READINESS_POOL_THRESHOLD = float(os.getenv('READINESS_POOL_THRESHOLD', '0.9'))
+    # SERVER_MODE=asgi (read by gunicorn.conf.py) serves asgi:app; these tune that mode.
+    # ASYNC_DATABASE_URL defaults to DATABASE_URL with the asyncpg/aiosqlite driver
+    ASYNC_DATABASE_URI = os.getenv('ASYNC_DATABASE_URL')
+    ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '10'))  # threads for requests handled by Flask
+    # 'auto' serializes JSON with orjson when installed; 'stdlib' forces the json module
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto')
+    # gzip/brotli for JSON and text responses of at least COMPRESS_MIN_SIZE bytes
+    COMPRESS_RESPONSES = bool(int(os.getenv('COMPRESS_RESPONSES', '1')))
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '4'))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '4'))
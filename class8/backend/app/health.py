@@ -0,0 +1,80 @@
+"""Liveness and readiness checks.
+
+Liveness only says the process can answer. Readiness also waits for the
+search index to be built and checks the database, but pings it at most once
+per ``READINESS_CHECK_INTERVAL`` seconds per worker; probes in between reuse
+the last result. Pool saturation is read
+from the pool's own counters on every probe, which costs no round trip, and
+a saturated pool skips the ping so a probe never waits for a connection.
+"""
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import text
+
+from app import metrics, search
+from app.models import db
+
+
+class ReadinessCheck:
+    def __init__(self, interval, pool_threshold):
+        self.interval = interval
+        self.pool_threshold = pool_threshold
+        self.lock = threading.Lock()
+        self.checked_at = None
+        self.db_ok = False
+        self.db_error = None
+
+    def ping(self):
+        """Ping the database unless another probe did so within the interval"""
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < self.interval:
+            return
+        if not self.lock.acquire(blocking=False):
+            return  # another thread is pinging; use the previous result
+        try:
+            with db.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            self.db_ok, self.db_error = True, None
+        except Exception as e:
+            self.db_ok, self.db_error = False, type(e).__name__
+            current_app.logger.warning("Readiness database ping failed", exc_info=True)
+        finally:
+            self.checked_at = time.monotonic()
+            self.lock.release()
+
+    def run(self):
+        pool = metrics.record_pool_status()
+        saturated = bool(pool and pool['capacity']
+                         and pool['checked_out'] >= pool['capacity'] * self.pool_threshold)
+        if not saturated:
+            self.ping()
+        
+        backend = search.get_backend()
+        search_ready = backend.is_ready()
+        if not search_ready:
+            backend.start(current_app._get_current_object())  # no-op while a build is running
+
+        ready = self.db_ok and not saturated and search_ready
+        checks = {
+            'database': {
+                'ok': self.db_ok,
+                'error': self.db_error,
+                'checked_seconds_ago': round(time.monotonic() - self.checked_at, 3) if self.checked_at else None
+            },
+            'pool': dict(pool or {}, saturated=saturated),
+            'search': {'ready': search_ready}
+        }
+        return ready, checks
+
+
+def get_readiness_check():
+    check = current_app.extensions.get('readiness')
+    if check is None:
+        check = ReadinessCheck(
+            current_app.config.get('READINESS_CHECK_INTERVAL', 5.0),
+            current_app.config.get('READINESS_POOL_THRESHOLD', 0.9)
+        )
+        current_app.extensions['readiness'] = check
+    return check
@@ -0,0 +1,197 @@
+"""Streaming question import shared by the bulk upload endpoint and CLI.
+
+Rows come from JSON lists, NDJSON or CSV, are validated one at a time and
+written in chunks: topic slugs are resolved through an in-memory slug -> id
+map (one query up front, one multi-row insert per chunk for new topics) and
+questions go in with a single executemany per chunk. Duplicates (same
+normalized content hash within a topic) are detected with one lookup per
+chunk and either skipped or used to update the stored question.
+"""
+import csv
+import json
+
+from sqlalchemy import bindparam, tuple_
+
+from app import cache, search
+from app.models import db
+from app.models.models import Topic, Question, question_content_hash
+
+REQUIRED_FIELDS = ('topic_slug', 'question_text', 'options', 'correct_answer')
+CHUNK_SIZE = 1000
+ON_DUPLICATE_CHOICES = ('skip', 'update')
+
+
+class RowError(ValueError):
+    """A row failed validation; the message is reported back per row"""
+
+
+def iter_ndjson_rows(lines):
+    """Yield one dict per non-blank NDJSON line"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            yield {}
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield RowError('Invalid JSON')
+
+
+def iter_csv_rows(lines):
+    """Yield question dicts from CSV with option1..option4 or an options column"""
+    for row in csv.DictReader(lines):
+        options = [row[f'option{i}'] for i in range(1, 5) if row.get(f'option{i}')]
+
+        # If CSV has a single options column instead of option1, option2, etc.
+        if not options and row.get('options'):
+            try:
+                options = json.loads(row['options'])
+            except ValueError:
+                # Fallback: assume comma-separated values
+                options = [opt.strip() for opt in row['options'].split(',')]
+
+        question = {k: v for k, v in row.items() if k in REQUIRED_FIELDS and v not in (None, '')}
+        if options:
+            question['options'] = options
+        yield question
+
+
+def validate_question(question_data):
+    """Return a normalized question dict, None for empty rows, or raise RowError"""
+    if isinstance(question_data, RowError):
+        raise question_data
+
+    if not isinstance(question_data, dict):
+        raise RowError('Expected an object')
+
+    # Skip empty rows
+    if not question_data or not any(question_data.values()):
+        return None
+
+    if not all(k in question_data for k in REQUIRED_FIELDS):
+        raise RowError('Missing required fields')
+
+    question_text = question_data['question_text']
+    if not isinstance(question_text, str) or not question_text.strip():
+        raise RowError('Empty question text')
+
+    options = question_data['options']
+    if not isinstance(options, list) or len(options) != 4:
+        raise RowError('Invalid options format')
+
+    if any(opt is None or str(opt).strip() == '' for opt in options):
+        raise RowError('Empty options not allowed')
+
+    try:
+        correct_answer = int(question_data['correct_answer'])
+    except (ValueError, TypeError) as e:
+        raise RowError('Invalid correct_answer value') from e
+    if not 0 <= correct_answer <= 3:
+        raise RowError('Invalid correct_answer value')
+
+    topic_slug = str(question_data['topic_slug']).strip()
+    if not topic_slug:
+        raise RowError('Missing required fields')
+
+    return {
+        'topic_slug': topic_slug,
+        'question_text': question_text.strip(),
+        'options': [str(opt).strip() for opt in options],
+        'correct_answer': correct_answer
+    }
+
+
+class TopicResolver:
+    """Maps topic slugs to ids, creating missing topics in bulk"""
+
+    def __init__(self):
+        self.ids = dict(db.session.query(Topic.slug, Topic.id))
+        self.created = []
+
+    def resolve(self, slugs):
+        missing = sorted({slug for slug in slugs if slug not in self.ids})
+        if not missing:
+            return
+
+        db.session.execute(Topic.__table__.insert(), [
+            {
+                'name': slug.replace('-', ' ').title(),
+                'description': f"Questions about {slug.replace('-', ' ').title()}",
+                'slug': slug
+            }
+            for slug in missing
+        ])
+        self.ids.update(db.session.query(Topic.slug, Topic.id).filter(Topic.slug.in_(missing)))
+        self.created.extend(missing)
+        cache.invalidate(cache.TOPICS)
+
+
+def find_existing_hashes(keys):
+    """Return the subset of (topic_id, content_hash) keys already stored"""
+    if not keys:
+        return set()
+    return set(
+        db.session.query(Question.topic_id, Question.content_hash)
+        .filter(tuple_(Question.topic_id, Question.content_hash).in_(list(keys)))
+    )
+
+
+def insert_questions(resolver, questions, on_duplicate='skip'):
+    """Write a chunk of validated questions with one executemany.
+
+    Questions whose content hash already exists for the topic, in the
+    database or earlier in the chunk, are skipped or (with
+    ``on_duplicate='update'``) overwrite the stored options and answer.
+    Returns ``(inserted, duplicates)``.
+    """
+    if not questions:
+        return 0, 0
+    resolver.resolve(q['topic_slug'] for q in questions)
+
+    rows = {}
+    duplicates = 0
+    for q in questions:
+        topic_id = resolver.ids[q['topic_slug']]
+        key = (topic_id, question_content_hash(q['question_text'], q['options']))
+        if key in rows:
+            duplicates += 1
+            if on_duplicate == 'skip':
+                continue
+        rows[key] = {
+            'topic_id': topic_id,
+            'question_text': q['question_text'],
+            'options': q['options'],
+            'correct_answer': q['correct_answer'],
+            'content_hash': key[1]
+        }
+
+    existing = find_existing_hashes(rows.keys())
+    duplicates += len(existing)
+
+    new_rows = [row for key, row in rows.items() if key not in existing]
+    if new_rows:
+        vector_values = search.question_vector_values()
+        if vector_values:
+            for row in new_rows:
+                row['search_text'] = row['question_text']
+        db.session.execute(Question.__table__.insert().values(**vector_values), new_rows)
+
+    if on_duplicate == 'update' and existing:
+        table = Question.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.topic_id == bindparam('t_id'), table.c.content_hash == bindparam('t_hash'))
+            .values(options=bindparam('options'), correct_answer=bindparam('correct_answer')),
+            [
+                {
+                    't_id': key[0],
+                    't_hash': key[1],
+                    'options': rows[key]['options'],
+                    'correct_answer': rows[key]['correct_answer']
+                }
+                for key in existing
+            ]
+        )
+
+    return len(new_rows), duplicates
@@ -0,0 +1,58 @@
+"""Fast JSON serialization for API responses.
+
+``FastJSONProvider`` replaces Flask's default ``app.json`` provider. With
+``JSON_ENCODER=auto`` (the default) it uses orjson when it is installed and
+falls back to the standard library otherwise; ``JSON_ENCODER=stdlib`` forces
+the fallback. Output is the same either way: compact, keys sorted, UTF-8.
+Pretty printing (debug mode) always goes through the standard library.
+"""
+import json
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+ENCODERS = ('auto', 'orjson', 'stdlib')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def __init__(self, app):
+        super().__init__(app)
+        encoder = app.config.get('JSON_ENCODER', 'auto')
+        if encoder not in ENCODERS:
+            raise ValueError(f"JSON_ENCODER must be one of: {', '.join(ENCODERS)}")
+        if encoder == 'orjson' and orjson is None:
+            raise ValueError('JSON_ENCODER=orjson but orjson is not installed')
+        self.use_orjson = orjson is not None and encoder != 'stdlib'
+        if self.use_orjson:
+            # Datetimes go through Flask's default() so they keep the HTTP date format
+            self.orjson_options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                self.orjson_options |= orjson.OPT_SORT_KEYS
+
+    def dumps_bytes(self, obj):
+        """Serialize ``obj`` as compact UTF-8 JSON bytes"""
+        if self.use_orjson:
+            return orjson.dumps(obj, default=self.default, option=self.orjson_options)
+        return json.dumps(obj, default=self.default, sort_keys=self.sort_keys, separators=(',', ':'),
+                          ensure_ascii=False).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs.keys() - {'separators', 'ensure_ascii'}:
+            return self.dumps_bytes(obj).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+def dumps_bytes(obj):
+    """Compact JSON bytes with the current app's provider"""
+    return current_app.json.dumps_bytes(obj)
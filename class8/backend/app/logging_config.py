@@ -0,0 +1,21 @@
+import logging
+import sys
+
+from pythonjsonlogger import jsonlogger
+
+
+def setup_logging(level=logging.INFO):
+    """Send all log records to stdout as one JSON object per line"""
+    logger = logging.getLogger()
+    if any(getattr(handler, '_json_stdout', False) for handler in logger.handlers):
+        return logger
+    
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(jsonlogger.JsonFormatter(
+        fmt='%(asctime)s %(levelname)s %(name)s %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    ))
+    handler._json_stdout = True
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return logger
@@ -0,0 +1,143 @@
+"""Prometheus metrics and per-request instrumentation.
+
+``init_app`` records request latency, in-flight requests, the number and
+time of SQL statements issued per request and connection pool usage, logs one JSON line per request and
+mounts ``/metrics``. Under gunicorn, ``gunicorn.conf.py`` sets
+``PROMETHEUS_MULTIPROC_DIR`` before the workers import this module, so every
+worker writes its samples there and ``/metrics`` aggregates all of them no
+matter which worker answers the scrape.
+"""
+import logging
+import os
+import time
+
+from flask import g, has_request_context, request
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, make_wsgi_app, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = Counter(
+    'http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency in seconds', ['method', 'endpoint']
+)
+IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'HTTP requests currently being served', multiprocess_mode='livesum'
+)
+DB_STATEMENTS = Histogram(
+    'db_statements_per_request', 'SQL statements executed per request', ['endpoint'],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250, 500)
+)
+DB_TIME = Histogram(
+    'db_time_per_request_seconds', 'Time spent executing SQL per request', ['endpoint'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5)
+)
+# Summed over live workers, since every worker has its own pool
+DB_POOL_SIZE = Gauge('db_pool_size', 'Persistent connections the pool keeps', multiprocess_mode='livesum')
+DB_POOL_CAPACITY = Gauge('db_pool_capacity', 'Maximum connections including overflow', multiprocess_mode='livesum')
+DB_POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Connections currently in use', multiprocess_mode='livesum')
+DB_POOL_OVERFLOW = Gauge('db_pool_overflow', 'Overflow connections currently open', multiprocess_mode='livesum')
+QUIZZES_SERVED = Counter('quizzes_served_total', 'Quizzes served')
+QUIZ_SUBMISSIONS = Counter('quiz_submissions_total', 'Quiz submissions recorded')
+QUIZ_GRADING_SECONDS = Histogram('quiz_grading_seconds', 'Time spent grading and recording a submission')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if has_request_context() and 'db_statements' in g:
+        g.db_statements += 1
+        g.db_time += elapsed
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    started = context.connection.info.get('query_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def record_pool_status():
+    """Read the connection pool counters (no database round trip) and update the pool gauges"""
+    pool = db.engine.pool
+    if not hasattr(pool, 'checkedout'):
+        return None  # SQLite pools have no size limits
+    # The pool's own limit, so engine defaults (QueuePool allows 10 overflow connections) count too;
+    # -1 means unlimited, and pools without overflow have no fixed capacity to report
+    max_overflow = getattr(pool, '_max_overflow', None)
+    status = {
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'overflow': max(pool.overflow(), 0),
+        'capacity': pool.size() + max_overflow if max_overflow is not None and max_overflow >= 0 else None
+    }
+    DB_POOL_SIZE.set(status['size'])
+    DB_POOL_CHECKED_OUT.set(status['checked_out'])
+    DB_POOL_OVERFLOW.set(status['overflow'])
+    if status['capacity'] is not None:
+        DB_POOL_CAPACITY.set(status['capacity'])
+    return status
+
+
+def _metrics_app():
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return make_wsgi_app(registry)
+    return make_wsgi_app()
+
+
+def _before_request():
+    g.request_started = time.perf_counter()
+    g.db_statements = 0
+    g.db_time = 0.0
+    IN_FLIGHT.inc()
+
+
+def _after_request(response):
+    g.response_status = response.status_code
+    return response
+
+
+def _teardown_request(exc):
+    # Runs after streamed bodies finish, so their queries are counted too
+    if 'request_started' not in g:
+        return
+    IN_FLIGHT.dec()
+    duration = time.perf_counter() - g.request_started
+    endpoint = request.endpoint or 'unknown'
+    status = g.get('response_status', 500)
+    
+    REQUESTS.labels(method=request.method, endpoint=endpoint, status=status).inc()
+    REQUEST_LATENCY.labels(method=request.method, endpoint=endpoint).observe(duration)
+    DB_STATEMENTS.labels(endpoint=endpoint).observe(g.db_statements)
+    DB_TIME.labels(endpoint=endpoint).observe(g.db_time)
+    record_pool_status()
+    
+    logger.info('Request processed', extra={
+        'method': request.method,
+        'path': request.path,
+        'endpoint': endpoint,
+        'status': status,
+        'duration': round(duration, 6),
+        'db_statements': g.db_statements,
+        'db_time': round(g.db_time, 6)
+    })
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {'/metrics': _metrics_app()})
@@ -3,7 +3,9 @@ from flask_sqlalchemy import SQLAlchemy
 db = SQLAlchemy()
 
 # Import models here
-from .models import Topic, Question, WikiPage
+from .models import Topic, Question, WikiPage, QuizAttempt, QuestionOutcome, QuestionStats, TopicStats, LeaderboardEntry, WikiRenderedPage, CacheVersion
 
 # Make models available at package level
-__all__ = ['db', 'Topic', 'Question', 'WikiPage']
\ No newline at end of file
+__all__ = ['db', 'Topic', 'Question', 'WikiPage', 'QuizAttempt', 'QuestionOutcome', 'QuestionStats',
+           'TopicStats', 'LeaderboardEntry', 'WikiRenderedPage',
+           'CacheVersion']
\ No newline at end of file
@@ -1,7 +1,25 @@
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from . import db
+import hashlib
+import json
 import random
 
+def question_content_hash(question_text, options):
+    """Hash of the normalized question text and sorted options, used to spot duplicates"""
+    def normalize(value):
+        return ' '.join(str(value).split()).casefold()
+
+    payload = json.dumps([normalize(question_text), sorted(normalize(opt) for opt in options)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+# tsvector on PostgreSQL (maintained by app/search.py); unused plain text elsewhere
+SearchVector = db.Text().with_variant(TSVECTOR(), 'postgresql')
+
+def _content_hash_default(context):
+    params = context.get_current_parameters()
+    return question_content_hash(params['question_text'], params['options'])
+
 class Topic(db.Model):
     __tablename__ = 'topics'
 
@@ -21,13 +39,23 @@ class Topic(db.Model):
 
 class Question(db.Model):
     __tablename__ = 'questions'
+    __table_args__ = (
+        db.UniqueConstraint('topic_id', 'content_hash', name='uq_questions_topic_content_hash'),
+        db.Index('ix_questions_topic_id_id', 'topic_id', 'id'),
+        db.Index('ix_questions_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     topic_id = db.Column(db.Integer, db.ForeignKey('topics.id'), nullable=False)
     question_text = db.Column(db.Text, nullable=False)
     options = db.Column(db.JSON, nullable=False)
     correct_answer = db.Column(db.Integer, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # Indexed so the in-process search index can find recent writes and edits; null on rows from before it existed
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Nullable only until backfill_question_hashes.py has run over pre-existing rows
+    content_hash = db.Column(db.String(64), nullable=True, default=_content_hash_default)
+    search_vector = db.deferred(db.Column(SearchVector, nullable=True))
 
     def shuffle_options(self):
         """Shuffle options and adjust correct answer index accordingly"""
@@ -67,26 +95,144 @@ class Question(db.Model):
 
 class WikiPage(db.Model):
     __tablename__ = 'wiki_pages'
+    __table_args__ = (
+        db.Index('ix_wiki_pages_search_vector', 'search_vector', postgresql_using='gin'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     slug = db.Column(db.String(100), unique=True, nullable=False)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    category = db.Column(db.String(100), nullable=False)  # e.g., "roadmap", "links", "guides"
+    category = db.Column(db.String(100), nullable=False, index=True)  # e.g., "roadmap", "links", "guides"
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     author = db.Column(db.String(100), nullable=True)
     is_published = db.Column(db.Boolean, default=True)
-    
-    def to_dict(self):
+    search_vector = db.deferred(db.Column(SearchVector, nullable=True))
+
+    def etag(self):
+        return f"{self.id}-{self.updated_at.strftime('%Y%m%d%H%M%S%f')}" if self.updated_at else str(self.id)
+
+    def to_summary_dict(self):
         return {
             'id': self.id,
             'slug': self.slug,
             'title': self.title,
-            'content': self.content,
+            'category': self.category,
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    def to_dict(self, include_content=True):
+        result = {
+            'id': self.id,
+            'slug': self.slug,
+            'title': self.title,
             'category': self.category,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
             'author': self.author,
             'is_published': self.is_published
-        }
\ No newline at end of file
+        }
+        if include_content:
+            result['content'] = self.content
+        return result
+
+class QuizAttempt(db.Model):
+    __tablename__ = 'quiz_attempts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    topic_id = db.Column(db.Integer, db.ForeignKey('topics.id', ondelete='CASCADE'), nullable=False, index=True)
+    player = db.Column(db.String(100), nullable=True)
+    correct = db.Column(db.Integer, nullable=False)
+    total = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class QuestionOutcome(db.Model):
+    """One row per answered question per attempt, kept narrow for item analysis"""
+    __tablename__ = 'question_outcomes'
+
+    attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempts.id', ondelete='CASCADE'), primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id', ondelete='CASCADE'), primary_key=True, index=True)
+    selected_answer = db.Column(db.SmallInteger, nullable=True)
+    is_correct = db.Column(db.Boolean, nullable=False)
+
+class QuestionStats(db.Model):
+    """Running counters per question, updated as submissions arrive"""
+    __tablename__ = 'question_stats'
+
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id', ondelete='CASCADE'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    option_0 = db.Column(db.Integer, nullable=False, default=0)
+    option_1 = db.Column(db.Integer, nullable=False, default=0)
+    option_2 = db.Column(db.Integer, nullable=False, default=0)
+    option_3 = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'question_id': self.question_id,
+            'attempts': self.attempts,
+            'correct': self.correct,
+            'percent_correct': round(self.correct / self.attempts * 100, 2) if self.attempts else None,
+            'option_distribution': [self.option_0, self.option_1, self.option_2, self.option_3]
+        }
+
+class TopicStats(db.Model):
+    """Running counters per topic, updated as submissions arrive"""
+    __tablename__ = 'topic_stats'
+
+    topic_id = db.Column(db.Integer, db.ForeignKey('topics.id', ondelete='CASCADE'), primary_key=True)
+    submissions = db.Column(db.Integer, nullable=False, default=0)
+    answered = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    score_total = db.Column(db.Float, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'submissions': self.submissions,
+            'answered': self.answered,
+            'correct': self.correct,
+            'percent_correct': round(self.correct / self.answered * 100, 2) if self.answered else None,
+            'average_score': round(self.score_total / self.submissions, 2) if self.submissions else None
+        }
+
+class LeaderboardEntry(db.Model):
+    """Best score per player per topic; the (topic_id, best_score) index serves top-N reads"""
+    __tablename__ = 'leaderboard_entries'
+    __table_args__ = (
+        db.Index('ix_leaderboard_topic_score', 'topic_id', 'best_score'),
+    )
+
+    topic_id = db.Column(db.Integer, db.ForeignKey('topics.id', ondelete='CASCADE'), primary_key=True)
+    player = db.Column(db.String(100), primary_key=True)
+    best_score = db.Column(db.Float, nullable=False, default=0)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    best_score_at = db.Column(db.DateTime)  # when best_score was first reached; breaks leaderboard ties
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'player': self.player,
+            'best_score': self.best_score,
+            'best_score_at': self.best_score_at.isoformat() if self.best_score_at else None,
+            'attempts': self.attempts,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class WikiRenderedPage(db.Model):
+    """Sanitized HTML for one version of a wiki page, rendered once and reused"""
+    __tablename__ = 'wiki_rendered_pages'
+
+    page_id = db.Column(db.Integer, db.ForeignKey('wiki_pages.id', ondelete='CASCADE'), primary_key=True)
+    version = db.Column(db.DateTime, nullable=False)  # updated_at of the page this HTML was rendered from
+    renderer = db.Column(db.String(20), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CacheVersion(db.Model):
+    """Version counter per cached response namespace, bumped by writes (see app/cache.py)"""
+    __tablename__ = 'cache_versions'
+
+    namespace = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,70 @@
+"""Server-side markdown rendering for wiki pages.
+
+Pages are rendered to sanitized HTML once per ``updated_at`` version and the
+result is stored in ``wiki_rendered_pages``; later reads of the same version
+are served from there. Bump RENDERER_VERSION when the markdown extensions or
+sanitizer allow-list change so stale renders are redone.
+"""
+import bleach
+import markdown
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db
+from app.models.models import WikiRenderedPage
+
+RENDERER_VERSION = 'md-1'
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables', 'sane_lists']
+
+ALLOWED_TAGS = frozenset({
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'del', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 'strong', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'ul'
+})
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title'],
+    'abbr': ['title'],
+    'code': ['class'],
+    'img': ['src', 'alt', 'title'],
+    'td': ['align'],
+    'th': ['align']
+}
+ALLOWED_PROTOCOLS = frozenset({'http', 'https', 'mailto'})
+
+
+def render_markdown(text):
+    """Markdown -> HTML with anything outside the allow-list stripped"""
+    html = markdown.markdown(text or '', extensions=MARKDOWN_EXTENSIONS, output_format='html')
+    return bleach.clean(
+        html,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        protocols=ALLOWED_PROTOCOLS,
+        strip=True
+    )
+
+
+def get_rendered_html(page):
+    """Cached HTML for the page's current version, rendering it on a miss"""
+    cached = db.session.get(WikiRenderedPage, page.id)
+    if cached and cached.version == page.updated_at and cached.renderer == RENDERER_VERSION:
+        return cached.html
+
+    html = render_markdown(page.content)
+    try:
+        if cached:
+            cached.version = page.updated_at
+            cached.renderer = RENDERER_VERSION
+            cached.html = html
+        else:
+            db.session.add(WikiRenderedPage(
+                page_id=page.id, version=page.updated_at, renderer=RENDERER_VERSION, html=html
+            ))
+        db.session.commit()
+    except IntegrityError:
+        # Another request stored this version first
+        db.session.rollback()
+    return html
+
+
+def invalidate(page_id):
+    """Drop the stored render; called from the wiki write routes before committing"""
+    WikiRenderedPage.query.filter_by(page_id=page_id).delete(synchronize_session=False)
@@ -1,11 +1,36 @@
-from flask import jsonify, request
-from app.models.models import Topic, Question
+from flask import jsonify, request, url_for
+from sqlalchemy.exc import IntegrityError
+from app.models.models import Topic, Question, question_content_hash
 from app.models import db
+from app import cache, importer, metrics, search, stats
+from app.streaming import json_array_response
 from . import quiz_bp
+import csv
+import io
+import logging
+from datetime import datetime
 import random
 import string
 
+logger = logging.getLogger(__name__)
+
 MAX_QUIZ_QUESTIONS = 15
+MAX_REPORTED_ERRORS = 1000
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 5000
+STREAM_BATCH_SIZE = 1000
+
+# Public field name -> column, so ?fields= only loads what is asked for
+QUESTION_FIELDS = {
+    'id': Question.id,
+    'topic_id': Question.topic_id,
+    'question': Question.question_text,
+    'options': Question.options,
+    'correct_answer': Question.correct_answer,
+    'created_at': Question.created_at
+}
+DEFAULT_QUESTION_FIELDS = ('id', 'question', 'options', 'correct_answer')
 
 @quiz_bp.route('/<topic_slug>', methods=['GET'])
 def get_quiz(topic_slug):
@@ -13,14 +38,17 @@ def get_quiz(topic_slug):
     
     # Get all questions for the topic
     all_questions = Question.query.filter_by(topic_id=topic.id).all()
-    
+    return jsonify(quiz_payload(topic, all_questions))
+
+def quiz_payload(topic, all_questions):
+    """Pick the quiz questions; shared with the async view in app/asgi.py"""
     if not all_questions:
-        return jsonify({
+        return {
             'title': topic.name,
             'questions': [],
             'total_questions': 0,
             'selected_questions': 0
-        })
+        }
     
     # Shuffle and limit questions
     selected_questions = random.sample(
@@ -28,12 +56,13 @@ def get_quiz(topic_slug):
         min(MAX_QUIZ_QUESTIONS, len(all_questions))
     )
     
-    return jsonify({
+    metrics.QUIZZES_SERVED.inc()
+    return {
         'title': topic.name,
         'questions': [q.to_dict(shuffle=False) for q in selected_questions],
         'total_questions': len(all_questions),
         'selected_questions': len(selected_questions)
-    })
+    }
 
 @quiz_bp.route('/submit', methods=['POST'])
 def submit_quiz():
@@ -48,34 +77,58 @@ def submit_quiz():
     if not topic:
         return jsonify({'error': 'Topic not found'}), 404
     
-    # Get all questions that were answered
-    question_ids = [int(qid) for qid in answers.keys()]
-    questions = Question.query.filter(Question.id.in_(question_ids)).all()
+    player = data.get('player')
+    if player is not None and (not isinstance(player, str) or not player.strip() or len(player) > 100):
+        return jsonify({'error': 'Invalid player name'}), 400
     
-    correct_count = 0
-    total_questions = len(questions)
+    if not isinstance(answers, dict):
+        return jsonify({'error': 'answers must map question ids to option indexes'}), 400
+    try:
+        question_ids = [int(qid) for qid in answers]
+    except ValueError:
+        return jsonify({'error': 'answers must map question ids to option indexes'}), 400
     
-    for question in questions:
-        submitted_answer = answers.get(str(question.id))
-        if submitted_answer == question.correct_answer:
-            correct_count += 1
+    # Get all questions that were answered
+    questions = Question.query.filter(Question.id.in_(question_ids), Question.topic_id == topic.id).all()
+    if not questions:
+        # Nothing to grade: don't record an empty attempt that drags down the topic's average
+        return jsonify({'error': 'No answered questions belong to this topic'}), 400
     
-    score = (correct_count / total_questions * 100) if total_questions > 0 else 0
+    try:
+        with metrics.QUIZ_GRADING_SECONDS.time():
+            attempt = stats.record_submission(topic, questions, answers, player=player.strip() if player else None)
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("Error recording submission", extra={'topic': topic_slug})
+        return jsonify({'error': 'Failed to record submission'}), 500
+    metrics.QUIZ_SUBMISSIONS.inc()
     
     return jsonify({
-        'score': score,
-        'correct': correct_count,
-        'total': total_questions
+        'score': attempt.score,
+        'correct': attempt.correct,
+        'total': attempt.total
     })
 
+@quiz_bp.route('/questions/<int:question_id>/stats', methods=['GET'])
+def get_question_stats(question_id):
+    """Difficulty statistics for a single question"""
+    if not db.session.query(Question.id).filter_by(id=question_id).first():
+        return jsonify({'error': 'Question not found'}), 404
+    return jsonify(stats.get_question_stats(question_id))
+
 @quiz_bp.route('/questions', methods=['GET', 'POST'])
 def manage_questions():
     if request.method == 'POST':
         data = request.get_json()
-        print("Received question data:", data)
+        logger.debug("Received question data", extra={'question': data})
         
         if not all(k in data for k in ('topic_slug', 'question_text', 'options', 'correct_answer')):
             return jsonify({'error': 'Missing required fields'}), 400
+        
+        on_duplicate = request.args.get('on_duplicate', 'skip')
+        if on_duplicate not in importer.ON_DUPLICATE_CHOICES:
+            return jsonify({'error': 'on_duplicate must be one of: skip, update'}), 400
             
         # Find or create topic
         topic = Topic.query.filter_by(slug=data['topic_slug']).first()
@@ -88,163 +141,205 @@ def manage_questions():
                 slug=data['topic_slug']
             )
             db.session.add(topic)
+            cache.invalidate(cache.TOPICS)
             db.session.commit()
             
         try:
+            content_hash = question_content_hash(data['question_text'], data['options'])
             question = Question(
                 topic_id=topic.id,
                 question_text=data['question_text'],
                 options=data['options'],
-                correct_answer=data['correct_answer']
+                correct_answer=data['correct_answer'],
+                content_hash=content_hash
             )
             
-            db.session.add(question)
+            # Insert first and let uq_questions_topic_content_hash catch duplicates, so two
+            # concurrent posts of the same question can't both pass a lookup and insert twice
+            try:
+                with db.session.begin_nested():
+                    db.session.add(question)
+                    db.session.flush()
+            except IntegrityError:
+                existing = Question.query.filter_by(topic_id=topic.id, content_hash=content_hash).first()
+                if existing is None:
+                    raise
+                if on_duplicate == 'update':
+                    existing.options = data['options']
+                    existing.correct_answer = data['correct_answer']
+                db.session.commit()
+                return jsonify(existing.to_dict(shuffle=False)), 200
+            
             db.session.commit()
+            search.get_backend().index_question(question)
             return jsonify(question.to_dict(shuffle=False)), 201
             
         except Exception as e:
             db.session.rollback()
-            print(f"Error adding question: {str(e)}")
+            logger.exception("Error adding question", extra={'topic_slug': data['topic_slug']})
             return jsonify({'error': str(e)}), 400
             
-    questions = Question.query.all()
-    return jsonify([q.to_dict(shuffle=False) for q in questions])
+    return list_questions()
+
+def list_questions():
+    """Stream one keyset page of questions as a JSON array.
+
+    The cursor for the next page is returned in the ``X-Next-Cursor`` and
+    ``Link`` headers, so the body stays a plain array that can be written
+    out row by row.
+    """
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+    cursor = request.args.get('cursor', 0, type=int)
+    
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(DEFAULT_QUESTION_FIELDS)
+    unknown = [f for f in fields if f not in QUESTION_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    
+    filters = [Question.id > cursor]
+    topic_slug = request.args.get('topic')
+    if topic_slug:
+        topic_id = db.session.query(Topic.id).filter_by(slug=topic_slug).scalar()
+        if topic_id is None:
+            return jsonify({'error': 'Topic not found'}), 404
+        filters.append(Question.topic_id == topic_id)
+    try:
+        if request.args.get('created_after'):
+            filters.append(Question.created_at >= datetime.fromisoformat(request.args['created_after']))
+        if request.args.get('created_before'):
+            filters.append(Question.created_at < datetime.fromisoformat(request.args['created_before']))
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use ISO format'}), 400
+    
+    # The last id of this page and whether anything follows, read from the id index only
+    boundary = (
+        db.session.query(Question.id)
+        .filter(*filters)
+        .order_by(Question.id)
+        .offset(limit - 1)
+        .limit(2)
+        .all()
+    )
+    headers = {}
+    if len(boundary) == 2:
+        next_cursor = boundary[0].id
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        headers['X-Next-Cursor'] = str(next_cursor)
+        headers['Link'] = f'<{url_for(request.endpoint, _external=True, **args)}>; rel="next"'
+    
+    columns = [QUESTION_FIELDS[f] for f in fields]
+    rows = (
+        db.session.query(*columns)
+        .filter(*filters)
+        .order_by(Question.id)
+        .limit(limit)
+        .yield_per(STREAM_BATCH_SIZE)
+    )
+    return json_array_response((_serialize_row(fields, row) for row in rows), headers=headers)
+
+def _serialize_row(fields, row):
+    item = dict(zip(fields, row))
+    if item.get('created_at') is not None:
+        item['created_at'] = item['created_at'].isoformat()
+    return item
 
 @quiz_bp.route('/questions/bulk', methods=['POST'])
 def bulk_upload_questions():
-    if not request.is_json:
-        return jsonify({'error': 'Content-Type must be application/json'}), 400
-        
-    questions_data = request.get_json()
-    if not isinstance(questions_data, list):
-        return jsonify({'error': 'Expected a list of questions'}), 400
+    """Bulk import questions from a JSON list, an NDJSON stream or a CSV stream"""
+    if request.mimetype == 'application/json':
+        questions_data = request.get_json()
+        if not isinstance(questions_data, list):
+            return jsonify({'error': 'Expected a list of questions'}), 400
+        rows = iter(questions_data)
+    elif request.mimetype in NDJSON_MIMETYPES:
+        rows = importer.iter_ndjson_rows(_text_stream())
+    elif request.mimetype == 'text/csv':
+        rows = importer.iter_csv_rows(_text_stream())
+    else:
+        return jsonify({'error': 'Content-Type must be application/json, application/x-ndjson or text/csv'}), 400
+    
+    on_duplicate = request.args.get('on_duplicate', 'skip')
+    if on_duplicate not in importer.ON_DUPLICATE_CHOICES:
+        return jsonify({'error': 'on_duplicate must be one of: skip, update'}), 400
         
     success_count = 0
+    duplicate_count = 0
     failed_count = 0
     errors = []
-    valid_questions = []
-    created_topics = []
+    chunk = []
+    resolver = importer.TopicResolver()
     
-    # First pass: Validate all questions and create topics if needed
-    for index, question_data in enumerate(questions_data):
-        try:
-            # Skip empty rows
-            if not question_data or not any(question_data.values()):
-                continue
-
-            # Validate required fields
-            if not all(k in question_data for k in ('topic_slug', 'question_text', 'options', 'correct_answer')):
-                failed_count += 1
-                errors.append(f"Row {index + 1}: Missing required fields")
-                continue
-
-            # Validate content
-            if not question_data['question_text'] or not question_data['question_text'].strip():
-                failed_count += 1
-                errors.append(f"Row {index + 1}: Empty question text")
-                continue
-
-            # Validate options
-            if not isinstance(question_data['options'], list) or len(question_data['options']) != 4:
-                failed_count += 1
-                errors.append(f"Row {index + 1}: Invalid options format")
-                continue
-
-            if any(opt is None or str(opt).strip() == '' for opt in question_data['options']):
-                failed_count += 1
-                errors.append(f"Row {index + 1}: Empty options not allowed")
-                continue
-
-            # Validate correct_answer
+    try:
+        for index, question_data in enumerate(rows):
             try:
-                correct_answer = int(question_data['correct_answer'])
-                if not 0 <= correct_answer <= 3:
-                    raise ValueError("Correct answer must be between 0 and 3")
-                question_data['correct_answer'] = correct_answer
-            except (ValueError, TypeError):
+                question = importer.validate_question(question_data)
+            except importer.RowError as e:
                 failed_count += 1
-                errors.append(f"Row {index + 1}: Invalid correct_answer value")
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(f"Row {index + 1}: {str(e)}")
                 continue
-
-            # Find or create topic
-            topic_slug = question_data['topic_slug'].strip()
-            topic = Topic.query.filter_by(slug=topic_slug).first()
             
-            if not topic:
-                # Track which topics we've created during this operation
-                if topic_slug not in created_topics:
-                    # Generate a nice title from the slug
-                    topic_name = topic_slug.replace('-', ' ').title()
-                    
-                    # Create new topic
-                    topic = Topic(
-                        name=topic_name,
-                        description=f"Questions about {topic_name}",
-                        slug=topic_slug
-                    )
-                    db.session.add(topic)
-                    created_topics.append(topic_slug)
-                    print(f"Created new topic: {topic_name} ({topic_slug})")
-                else:
-                    # We've created this topic during this batch, but it's not committed yet
-                    topic = Topic.query.filter_by(slug=topic_slug).first()
-
-            # If all validations pass, add to valid questions
-            valid_questions.append({
-                'topic_id': topic.id if topic.id else None,  # Will be set after commit
-                'topic_slug': topic_slug,  # Keep track of slug for topics created in this batch
-                'question_text': question_data['question_text'].strip(),
-                'options': [str(opt).strip() for opt in question_data['options']],
-                'correct_answer': correct_answer
-            })
+            if question is None:
+                continue
             
-        except Exception as e:
-            failed_count += 1
-            errors.append(f"Row {index + 1}: {str(e)}")
-            continue
+            chunk.append(question)
+            if len(chunk) >= importer.CHUNK_SIZE:
+                inserted, duplicates = _write_questions(resolver, chunk, on_duplicate)
+                success_count += inserted
+                duplicate_count += duplicates
+                chunk = []
+        
+        inserted, duplicates = _write_questions(resolver, chunk, on_duplicate)
+        success_count += inserted
+        duplicate_count += duplicates
+        db.session.commit()
+    except _BulkWriteError as e:
+        db.session.rollback()
+        return jsonify({
+            'error': e.message,
+            'detail': e.detail,
+            'errors': errors
+        }), 400
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({
+            'error': 'Malformed upload stream',
+            'detail': str(e),
+            'errors': errors
+        }), 400
     
-    # Commit new topics first if any were created
-    if created_topics:
-        try:
-            db.session.commit()
-            print(f"Successfully created {len(created_topics)} new topics")
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({
-                'error': 'Failed to create new topics',
-                'detail': str(e),
-                'errors': errors
-            }), 400
-    
-    # Second pass: Add valid questions to database
-    if valid_questions:
-        try:
-            for question_data in valid_questions:
-                # If we were tracking by slug for new topics, get the actual topic id now
-                if question_data['topic_id'] is None:
-                    topic = Topic.query.filter_by(slug=question_data['topic_slug']).first()
-                    question_data['topic_id'] = topic.id
-                
-                # Remove the temporary slug field
-                if 'topic_slug' in question_data:
-                    question_data.pop('topic_slug')
-                
-                question = Question(**question_data)
-                db.session.add(question)
-                success_count += 1
-            
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({
-                'error': 'Failed to commit questions to database',
-                'detail': str(e),
-                'errors': errors
-            }), 400
+    if resolver.created:
+        logger.info("Created topics during bulk upload", extra={'topics_created': len(resolver.created)})
     
     return jsonify({
         'success': success_count,
+        'duplicates': duplicate_count,
         'failed': failed_count,
-        'topics_created': len(created_topics),
+        'topics_created': len(resolver.created),
         'errors': errors if errors else None
-    })
\ No newline at end of file
+    })
+
+class _BulkWriteError(Exception):
+    def __init__(self, message, detail):
+        super().__init__(message)
+        self.message = message
+        self.detail = detail
+
+def _text_stream():
+    return io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+
+def _write_questions(resolver, questions, on_duplicate):
+    if not questions:
+        return 0, 0
+    try:
+        resolver.resolve(q['topic_slug'] for q in questions)
+    except Exception as e:
+        raise _BulkWriteError('Failed to create new topics', str(e)) from e
+    try:
+        return importer.insert_questions(resolver, questions, on_duplicate)
+    except Exception as e:
+        raise _BulkWriteError('Failed to commit questions to database', str(e)) from e
\ No newline at end of file
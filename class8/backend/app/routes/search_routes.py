@@ -0,0 +1,27 @@
+from flask import jsonify, request
+from app import search
+from . import search_bp
+
+@search_bp.route('', methods=['GET'])
+def search_content():
+    """Ranked full-text search over wiki pages and questions"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter "q" is required'}), 400
+    
+    doc_type = request.args.get('type')
+    if doc_type and doc_type not in search.DOC_TYPES:
+        return jsonify({'error': 'type must be one of: wiki, question'}), 400
+    
+    limit = request.args.get('limit', search.DEFAULT_LIMIT, type=int)
+    limit = min(max(limit, 1), search.MAX_LIMIT)
+    
+    try:
+        results = search.get_backend().search(query, doc_type=doc_type, limit=limit)
+    except search.IndexNotReady:
+        return jsonify({'error': 'Search index is still being built'}), 503, {'Retry-After': '1'}
+    return jsonify({
+        'query': query,
+        'results': results,
+        'count': len(results)
+    })
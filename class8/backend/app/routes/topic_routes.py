@@ -1,13 +1,22 @@
 from flask import jsonify, request
 from app.models.models import Topic
 from app.models import db
+from app import cache, stats
 from . import topic_bp
 
 @topic_bp.route('', methods=['GET'])
+@cache.cached_response(cache.TOPICS)
 def get_topics():
     topics = Topic.query.all()
     return jsonify([topic.to_dict() for topic in topics])
 
+@topic_bp.route('/<topic_slug>/stats', methods=['GET'])
+def get_topic_stats(topic_slug):
+    """Aggregate counters and leaderboard for a topic"""
+    topic = Topic.query.filter_by(slug=topic_slug).first_or_404()
+    limit = request.args.get('limit', stats.LEADERBOARD_SIZE, type=int)
+    return jsonify(stats.get_topic_stats(topic, limit=max(limit, 1)))
+
 @topic_bp.route('', methods=['POST'])
 def create_topic():
     data = request.get_json()
@@ -23,6 +32,7 @@ def create_topic():
     
     try:
         db.session.add(topic)
+        cache.invalidate(cache.TOPICS)
         db.session.commit()
         return jsonify(topic.to_dict()), 201
     except Exception as e:
@@ -42,6 +52,7 @@ def update_topic(topic_id):
         topic.slug = data['slug']
         
     try:
+        cache.invalidate(cache.TOPICS)
         db.session.commit()
         return jsonify(topic.to_dict())
     except Exception as e:
@@ -53,6 +64,7 @@ def delete_topic(topic_id):
     topic = Topic.query.get_or_404(topic_id)
     try:
         db.session.delete(topic)
+        cache.invalidate(cache.TOPICS)
         db.session.commit()
         return '', 204
     except Exception as e:
@@ -1,50 +1,97 @@
-from flask import jsonify, request
+from flask import Response, current_app, jsonify, request
+from sqlalchemy.orm import defer, load_only
 from app.models.models import WikiPage
 from app.models import db
 from slugify import slugify
+from app import cache, rendering, search
 from . import wiki_bp
 from datetime import datetime
 
+# Everything a listing needs; content stays deferred
+SUMMARY_COLUMNS = (WikiPage.id, WikiPage.slug, WikiPage.title, WikiPage.category, WikiPage.updated_at)
+
 @wiki_bp.route('', methods=['GET'])
 def get_all_wiki_pages():
-    """Get all wiki pages or filter by category"""
+    """Get all wiki pages or filter by category.
+
+    ``?view=summary`` skips the page bodies: only the listing columns are
+    loaded from the database and returned.
+    """
     category = request.args.get('category')
+    view = request.args.get('view', 'full')
+    if view not in ('full', 'summary'):
+        return jsonify({'error': 'view must be one of: full, summary'}), 400
     
     try:
+        query = WikiPage.query
+        if view == 'summary':
+            query = query.options(load_only(*SUMMARY_COLUMNS))
         if category:
-            print(f"Filtering wiki pages by category: {category}")
-            pages = WikiPage.query.filter_by(category=category).all()
-            if not pages:
-                print(f"No wiki pages found in category: {category}")
-                return jsonify({
-                    "message": f"No wiki pages found in category: {category}",
-                    "pages": []
-                })
-        else:
-            print("Retrieving all wiki pages")
-            pages = WikiPage.query.all()
-            if not pages:
-                print("No wiki pages found")
-                return jsonify({
-                    "message": "No wiki pages found",
-                    "pages": []
-                })
-        
-        result = [page.to_dict() for page in pages]
-        print(f"Returning {len(result)} wiki pages")
-        return jsonify(result)
+            query = query.filter_by(category=category)
+        pages = query.all()
+        return jsonify(wiki_list_payload(pages, view, category))
     
     except Exception as e:
-        print(f"Error retrieving wiki pages: {str(e)}")
+        current_app.logger.exception("Error retrieving wiki pages")
         return jsonify({"error": str(e)}), 500
 
+def wiki_list_payload(pages, view, category=None):
+    """Listing body; shared with the async view in app/asgi.py"""
+    if not pages:
+        message = f"No wiki pages found in category: {category}" if category else "No wiki pages found"
+        return {
+            "message": message,
+            "pages": []
+        }
+    
+    if view == 'summary':
+        return [page.to_summary_dict() for page in pages]
+    return [page.to_dict() for page in pages]
+
+def conditional_page_response(page, output_format):
+    """Response carrying the page's validators, already answered with 304 if they match the request"""
+    response = Response(mimetype='application/json')
+    response.set_etag(page.etag() if output_format == 'markdown' else f"{page.etag()}-{rendering.RENDERER_VERSION}")
+    response.last_modified = page.updated_at
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @wiki_bp.route('/<string:slug>', methods=['GET'])
 def get_wiki_page(slug):
-    """Get a specific wiki page by slug"""
-    page = WikiPage.query.filter_by(slug=slug).first_or_404()
-    return jsonify(page.to_dict())
+    """Get a specific wiki page by slug.
+
+    ``?format=html`` returns the page with ``content_html`` (sanitized,
+    server-rendered markdown) instead of the raw ``content``.
+
+    Supports conditional requests: the ETag and Last-Modified headers come
+    from ``updated_at``, and the content column is deferred so a matching
+    If-None-Match/If-Modified-Since is answered with 304 before it is read.
+    """
+    output_format = request.args.get('format', 'markdown')
+    if output_format not in ('markdown', 'html'):
+        return jsonify({'error': 'format must be one of: markdown, html'}), 400
+    
+    page = (
+        WikiPage.query
+        .options(defer(WikiPage.content))
+        .filter_by(slug=slug)
+        .first_or_404()
+    )
+    
+    response = conditional_page_response(page, output_format)
+    if response.status_code == 304:
+        return response
+    
+    if output_format == 'html':
+        result = page.to_dict(include_content=False)
+        result['content_html'] = rendering.get_rendered_html(page)
+    else:
+        result = page.to_dict()
+    response.set_data(current_app.json.dumps_bytes(result))
+    return response
 
 @wiki_bp.route('/categories', methods=['GET'])
+@cache.cached_response(cache.WIKI_CATEGORIES)
 def get_categories():
     """Get all unique wiki categories"""
     categories = db.session.query(WikiPage.category).distinct().all()
@@ -78,7 +125,9 @@ def create_wiki_page():
         )
         
         db.session.add(page)
+        cache.invalidate(cache.WIKI_CATEGORIES)
         db.session.commit()
+        search.get_backend().index_wiki_page(page)
         return jsonify(page.to_dict()), 201
     except Exception as e:
         db.session.rollback()
@@ -112,7 +161,10 @@ def update_wiki_page(slug):
     page.updated_at = datetime.utcnow()
     
     try:
+        rendering.invalidate(page.id)
+        cache.invalidate(cache.WIKI_CATEGORIES)
         db.session.commit()
+        search.get_backend().index_wiki_page(page)
         return jsonify(page.to_dict())
     except Exception as e:
         db.session.rollback()
@@ -124,8 +176,12 @@ def delete_wiki_page(slug):
     page = WikiPage.query.filter_by(slug=slug).first_or_404()
     
     try:
+        page_id = page.id
+        rendering.invalidate(page_id)
+        cache.invalidate(cache.WIKI_CATEGORIES)
         db.session.delete(page)
         db.session.commit()
+        search.get_backend().remove_wiki_page(page_id)
         return '', 204
     except Exception as e:
         db.session.rollback()
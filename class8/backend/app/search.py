@@ -0,0 +1,472 @@
+"""Full-text search over wiki pages and questions.
+
+Two interchangeable backends sit behind ``get_backend()``:
+
+* ``PostgresSearch`` queries the ``search_vector`` tsvector columns (GIN
+  indexed) with ``plainto_tsquery``, ranks with ``ts_rank_cd`` and builds
+  snippets with ``ts_headline``. The columns are filled on every ORM write by
+  the mapper events below and by bulk Core inserts through
+  ``question_vector_values()``/``wiki_vector_values()``.
+* ``MemorySearch`` is a pure-Python BM25 inverted index for SQLite/dev. It is
+  built on a background thread started by the first search or readiness
+  probe, so CLI scripts never build it (searches get ``IndexNotReady``, a
+  503, until it is done), updated by the wiki/question
+  write routes, and catches up on rows written or edited by other processes
+  (bulk uploads, CLI imports), found by ``updated_at``, before each query. It
+  lives per process, so it is not meant for multi-worker production serving.
+
+Snippets from both backends are HTML-escaped with matches wrapped in <b>.
+"""
+import html
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import bindparam, event, func, literal, union_all
+
+from app.models import db
+from app.models.models import Question, WikiPage
+
+TS_CONFIG = 'english'
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+SNIPPET_WORDS = 30
+DOC_TYPES = ('wiki', 'question')
+
+# Control characters can't appear in stored text, so they mark matches safely until escaping
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have how in is it its of on or that the this to '
+    'was were what when where which who why will with you your'.split()
+)
+
+
+def _stem(term):
+    # Just enough folding that "pods"/"pod" and "policies"/"policy" match
+    if len(term) > 4 and term.endswith('ies'):
+        return term[:-3] + 'y'
+    if len(term) > 3 and term.endswith('s') and not term.endswith('ss'):
+        return term[:-1]
+    return term
+
+
+def tokenize(text):
+    return [_stem(t) for t in _TOKEN_RE.findall((text or '').lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def _finish_snippet(marked):
+    escaped = html.escape(marked.replace('\n', ' '))
+    return escaped.replace(_MARK_START, '<b>').replace(_MARK_END, '</b>')
+
+
+def ts_vector(*weighted_texts):
+    vector = None
+    for text, weight in weighted_texts:
+        part = func.setweight(func.to_tsvector(TS_CONFIG, func.coalesce(text, '')), weight)
+        vector = part if vector is None else vector.op('||')(part)
+    return vector
+
+
+def question_vector_values():
+    """Extra Core insert values for the importer; needs a ``search_text`` bind per row"""
+    if db.engine.dialect.name != 'postgresql':
+        return {}
+    return {'search_vector': ts_vector((bindparam('search_text'), 'A'))}
+
+
+def wiki_vector_values():
+    """Extra Core insert values for bulk wiki inserts; needs ``search_title``/``search_content`` binds"""
+    if db.engine.dialect.name != 'postgresql':
+        return {}
+    return {'search_vector': ts_vector((bindparam('search_title'), 'A'), (bindparam('search_content'), 'B'))}
+
+
+@event.listens_for(WikiPage, 'before_insert')
+@event.listens_for(WikiPage, 'before_update')
+def _set_wiki_vector(mapper, connection, target):
+    if connection.dialect.name == 'postgresql':
+        target.search_vector = ts_vector((target.title, 'A'), (target.content, 'B'))
+
+
+@event.listens_for(Question, 'before_insert')
+@event.listens_for(Question, 'before_update')
+def _set_question_vector(mapper, connection, target):
+    if connection.dialect.name == 'postgresql':
+        target.search_vector = ts_vector((target.question_text, 'A'))
+
+
+class PostgresSearch:
+    """tsvector/GIN backed search, used when the database is PostgreSQL"""
+
+    def is_ready(self):
+        return True
+
+    def start(self, app):
+        pass
+
+    def search(self, query, doc_type=None, limit=DEFAULT_LIMIT):
+        tsquery = func.plainto_tsquery(TS_CONFIG, query)
+        selects = []
+        if doc_type in (None, 'wiki'):
+            selects.append(
+                db.select(
+                    literal('wiki').label('type'), WikiPage.id.label('id'),
+                    func.ts_rank_cd(WikiPage.search_vector, tsquery).label('score')
+                ).where(WikiPage.search_vector.op('@@')(tsquery))
+            )
+        if doc_type in (None, 'question'):
+            selects.append(
+                db.select(
+                    literal('question').label('type'), Question.id.label('id'),
+                    func.ts_rank_cd(Question.search_vector, tsquery).label('score')
+                ).where(Question.search_vector.op('@@')(tsquery))
+            )
+        ranked = union_all(*selects).subquery()
+        hits = db.session.execute(
+            db.select(ranked.c.type, ranked.c.id, ranked.c.score)
+            .order_by(ranked.c.score.desc(), ranked.c.id)
+            .limit(limit)
+        ).all()
+
+        # Headlines are the expensive part, so only build them for the page being returned
+        options = f'StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords={SNIPPET_WORDS}, MinWords=10'
+        headline = lambda column: func.ts_headline(TS_CONFIG, column, tsquery, options)
+        wiki_ids = [hit.id for hit in hits if hit.type == 'wiki']
+        question_ids = [hit.id for hit in hits if hit.type == 'question']
+        docs = {}
+        if wiki_ids:
+            for row in db.session.query(WikiPage.id, WikiPage.slug, WikiPage.title, WikiPage.category,
+                                        headline(WikiPage.content)).filter(WikiPage.id.in_(wiki_ids)):
+                docs[('wiki', row[0])] = _wiki_result(row[0], row[1], row[2], row[3], row[4])
+        if question_ids:
+            for row in db.session.query(Question.id, Question.topic_id, Question.question_text,
+                                        headline(Question.question_text)).filter(Question.id.in_(question_ids)):
+                docs[('question', row[0])] = _question_result(row[0], row[1], row[2], row[3])
+
+        results = []
+        for hit in hits:
+            doc = docs.get((hit.type, hit.id))
+            if doc:
+                doc['score'] = round(float(hit.score), 6)
+                results.append(doc)
+        return results
+
+    # Writes are indexed by the mapper events / importer, nothing to do here
+    def index_wiki_page(self, page):
+        pass
+
+    def remove_wiki_page(self, page_id):
+        pass
+
+    def index_question(self, question):
+        pass
+
+
+def _wiki_result(page_id, slug, title, category, marked_snippet):
+    return {
+        'type': 'wiki', 'id': page_id, 'slug': slug, 'title': title,
+        'category': category, 'snippet': _finish_snippet(marked_snippet)
+    }
+
+
+def _question_result(question_id, topic_id, question_text, marked_snippet):
+    return {
+        'type': 'question', 'id': question_id, 'topic_id': topic_id, 'title': question_text,
+        'snippet': _finish_snippet(marked_snippet)
+    }
+
+
+class InvertedIndex:
+    """Term -> {doc: term frequency} postings with BM25 ranking"""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.doc_terms = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def add(self, key, *weighted_texts):
+        """Index ``key`` from (text, weight) pairs; weight repeats the terms"""
+        self.remove(key)
+        counts = defaultdict(int)
+        for text, weight in weighted_texts:
+            for term in tokenize(text):
+                counts[term] += weight
+        length = sum(counts.values())
+        self.doc_terms[key] = (dict(counts), length)
+        self.total_length += length
+        for term, count in counts.items():
+            self.postings[term][key] = count
+
+    def remove(self, key):
+        entry = self.doc_terms.pop(key, None)
+        if entry is None:
+            return
+        counts, length = entry
+        self.total_length -= length
+        for term in counts:
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(key, None)
+                if not docs:
+                    del self.postings[term]
+
+    def search(self, terms, limit, accept=None):
+        """Docs containing every term, best BM25 score first"""
+        terms = list(dict.fromkeys(terms))
+        if not terms or not self.doc_terms:
+            return []
+        postings = [self.postings.get(term) for term in terms]
+        if any(not docs for docs in postings):
+            return []
+
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for docs in postings[1:]:
+            candidates.intersection_update(docs)
+            if not candidates:
+                return []
+
+        n_docs = len(self.doc_terms)
+        avg_length = self.total_length / n_docs
+        scored = []
+        for key in candidates:
+            if accept and not accept(key):
+                continue
+            length = self.doc_terms[key][1]
+            norm = self.K1 * (1 - self.B + self.B * length / avg_length)
+            score = 0.0
+            for docs in postings:
+                tf = docs[key]
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                score += idf * tf * (self.K1 + 1) / (tf + norm)
+            scored.append((score, key))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored[:limit]
+
+
+class IndexNotReady(Exception):
+    """The in-process index is still being built"""
+
+
+class MemorySearch:
+    """In-process inverted index used when PostgreSQL full-text search isn't available"""
+
+    TITLE_WEIGHT = 3
+    WEIGHTS = {'question': (1,), 'wiki': (TITLE_WEIGHT, 1)}
+    SYNC_BATCH_SIZE = 5000
+    # Every sync reads rows stamped at or after the newest one seen. At most once per SYNC_RECHECK_SECONDS
+    # it reads back SYNC_LOOKBACK further, so a row committed after a later-stamped one is still picked up
+    SYNC_LOOKBACK = timedelta(seconds=60)
+    SYNC_RECHECK_SECONDS = 1.0
+
+    def __init__(self):
+        self.index = InvertedIndex()
+        self.lock = threading.RLock()
+        self.ready = threading.Event()
+        self.builder = None
+        self.newest = {}  # doc type -> newest updated_at indexed
+        self.versions = {}  # doc type -> {id: updated_at of the indexed text} for rows within the lookback
+        self.rechecked_at = 0.0
+
+    def start(self, app):
+        """Build the index on a background thread, unless it is built or being built"""
+        with self.lock:
+            if self.ready.is_set() or (self.builder and self.builder.is_alive()):
+                return
+            self.builder = threading.Thread(target=self._build_in, args=(app,), name='search-index', daemon=True)
+            self.builder.start()
+
+    def _build_in(self, app):
+        with app.app_context():
+            try:
+                self.build()
+            except Exception:
+                app.logger.warning("Search index build failed; retried on the next search", exc_info=True)
+            finally:
+                db.session.remove()
+
+    def build(self):
+        """Index every row into a fresh index, then swap it in; searches get IndexNotReady until then"""
+        index = InvertedIndex()
+        state = {'newest': {}, 'versions': {}}
+        self._apply(index, state, self._changes(state))
+        with self.lock:
+            self.index = index
+            self.newest = state['newest']
+            self.versions = state['versions']
+            self.rechecked_at = time.monotonic()
+            self.ready.set()
+
+    @staticmethod
+    def _sources():
+        return {
+            'question': (Question, (Question.question_text,)),
+            'wiki': (WikiPage, (WikiPage.title, WikiPage.content)),
+        }
+
+    def _window_start(self, newest):
+        return newest - self.SYNC_LOOKBACK if newest > datetime.min + self.SYNC_LOOKBACK else datetime.min
+
+    def _changes(self, state, recheck=False):
+        """Rows written since ``state`` was synced (all rows the first time), as doc type -> rows
+
+        Picks up writes from bulk uploads and other processes, and edits. Only
+        reads the database, so it runs without the lock.
+        """
+        changes = {}
+        for doc_type, (model, texts) in self._sources().items():
+            columns = (model.id, model.updated_at, *texts)
+            newest = state['newest'].get(doc_type)
+            if newest is None:
+                changes[doc_type] = self._all_rows(model, columns)
+                continue
+            since = self._window_start(newest) if recheck else newest
+            known = state['versions'].get(doc_type, {})
+            stamps = db.session.query(model.id, model.updated_at).filter(model.updated_at >= since)
+            changed = [row_id for row_id, updated_at in stamps if row_id not in known or known[row_id] != updated_at]
+            rows = []
+            for start in range(0, len(changed), self.SYNC_BATCH_SIZE):
+                batch = changed[start:start + self.SYNC_BATCH_SIZE]
+                rows.extend(db.session.query(*columns).filter(model.id.in_(batch)))
+            changes[doc_type] = rows
+        return changes
+
+    def _all_rows(self, model, columns):
+        rows = []
+        after = 0
+        while True:
+            batch = (
+                db.session.query(*columns)
+                .filter(model.id > after)
+                .order_by(model.id)
+                .limit(self.SYNC_BATCH_SIZE)
+                .all()
+            )
+            rows.extend(batch)
+            if len(batch) < self.SYNC_BATCH_SIZE:
+                return rows
+            after = batch[-1][0]
+
+    def _apply(self, index, state, changes):
+        for doc_type, rows in changes.items():
+            newest = state['newest'].get(doc_type) or datetime.min
+            versions = state['versions'].setdefault(doc_type, {})
+            for row_id, updated_at, *texts in rows:
+                known = versions.get(row_id)
+                if known and updated_at and known > updated_at:
+                    continue  # a concurrent sync or write already indexed a newer edit
+                index.add((doc_type, row_id), *zip(texts, self.WEIGHTS[doc_type]))
+                versions[row_id] = updated_at
+                if updated_at and updated_at > newest:
+                    newest = updated_at
+            state['newest'][doc_type] = newest
+            # Rows older than the window are never checked again, so their versions aren't needed
+            since = self._window_start(newest)
+            for row_id in [row_id for row_id, updated_at in versions.items() if not updated_at or updated_at < since]:
+                del versions[row_id]
+
+    def _sync(self):
+        """Pull rows written since the last sync; only applying them takes the lock"""
+        with self.lock:
+            state = {'newest': dict(self.newest), 'versions': {key: dict(rows) for key, rows in self.versions.items()}}
+            recheck = time.monotonic() - self.rechecked_at >= self.SYNC_RECHECK_SECONDS
+            if recheck:
+                self.rechecked_at = time.monotonic()
+        changes = self._changes(state, recheck)
+        if not any(changes.values()):
+            return
+        with self.lock:
+            state = {'newest': self.newest, 'versions': self.versions}
+            self._apply(self.index, state, changes)
+
+    def search(self, query, doc_type=None, limit=DEFAULT_LIMIT):
+        if not self.ready.is_set():
+            self.start(current_app._get_current_object())
+            raise IndexNotReady()
+        terms = tokenize(query)
+        accept = (lambda key: key[0] == doc_type) if doc_type else None
+        self._sync()
+        with self.lock:
+            hits = self.index.search(terms, limit, accept)
+
+        wiki_ids = [key[1] for _, key in hits if key[0] == 'wiki']
+        question_ids = [key[1] for _, key in hits if key[0] == 'question']
+        docs = {}
+        if wiki_ids:
+            for page_id, slug, title, category, content in db.session.query(
+                    WikiPage.id, WikiPage.slug, WikiPage.title, WikiPage.category, WikiPage.content
+            ).filter(WikiPage.id.in_(wiki_ids)):
+                docs[('wiki', page_id)] = _wiki_result(page_id, slug, title, category, _mark(content, terms))
+        if question_ids:
+            for question_id, topic_id, text in db.session.query(
+                    Question.id, Question.topic_id, Question.question_text
+            ).filter(Question.id.in_(question_ids)):
+                docs[('question', question_id)] = _question_result(question_id, topic_id, text, _mark(text, terms))
+
+        results = []
+        with self.lock:
+            for score, key in hits:
+                doc = docs.get(key)
+                if doc is None:
+                    # Deleted elsewhere (e.g. with its topic); forget it
+                    self.index.remove(key)
+                    continue
+                doc['score'] = round(score, 6)
+                results.append(doc)
+        return results
+
+    def is_ready(self):
+        return self.ready.is_set()
+
+    def index_wiki_page(self, page):
+        with self.lock:
+            if self.ready.is_set():
+                self.index.add(('wiki', page.id), (page.title, self.TITLE_WEIGHT), (page.content, 1))
+                self.versions['wiki'][page.id] = page.updated_at
+
+    def remove_wiki_page(self, page_id):
+        with self.lock:
+            self.index.remove(('wiki', page_id))
+
+    def index_question(self, question):
+        with self.lock:
+            if self.ready.is_set():
+                self.index.add(('question', question.id), (question.question_text, 1))
+                self.versions['question'][question.id] = question.updated_at
+
+
+def _mark(text, terms, words=SNIPPET_WORDS):
+    """Window of ``words`` words around the first match, with matches marked"""
+    tokens = (text or '').split()
+    wanted = set(terms)
+    first = next((i for i, token in enumerate(tokens) if set(tokenize(token)) & wanted), 0)
+    start = max(0, first - words // 3)
+    window = tokens[start:start + words]
+    marked = [f'{_MARK_START}{token}{_MARK_END}' if set(tokenize(token)) & wanted else token for token in window]
+    prefix = '... ' if start > 0 else ''
+    suffix = ' ...' if start + words < len(tokens) else ''
+    return prefix + ' '.join(marked) + suffix
+
+
+def get_backend(app=None):
+    app = app or current_app
+    backend = app.extensions.get('search')
+    if backend is None:
+        choice = app.config.get('SEARCH_BACKEND', 'auto')
+        if choice == 'auto':
+            choice = 'postgres' if db.engine.dialect.name == 'postgresql' else 'memory'
+        backend = PostgresSearch() if choice == 'postgres' else MemorySearch()
+        app.extensions['search'] = backend
+    return backend
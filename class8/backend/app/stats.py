@@ -0,0 +1,238 @@
+"""Incremental quiz statistics.
+
+Every submission is recorded once as a QuizAttempt with one QuestionOutcome
+per answered question, and the running counters in QuestionStats, TopicStats
+and LeaderboardEntry are bumped in the same transaction. Reads only ever touch
+the counter rows, so they cost the same no matter how many attempts exist.
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, bindparam, case, func, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db
+from app.models.models import (
+    QuizAttempt, QuestionOutcome, QuestionStats, TopicStats, LeaderboardEntry
+)
+
+OPTION_COLUMNS = ('option_0', 'option_1', 'option_2', 'option_3')
+LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 100
+
+
+def _ensure_rows(model, key_column, keys, **identity):
+    """Insert zeroed counter rows for any keys that don't have one yet.
+
+    Missing rows only happen the first time a question/topic/player is seen.
+    They are written with one multi-row insert under a savepoint; if a
+    concurrent request inserted one of them first, each row is retried under
+    its own savepoint and the ones that already exist are simply ignored.
+    """
+    column = getattr(model, key_column)
+    query = db.session.query(column).filter(column.in_(keys))
+    for name, value in identity.items():
+        query = query.filter(getattr(model, name) == value)
+    existing = {row[0] for row in query}
+
+    missing = [dict(identity, **{key_column: key}) for key in dict.fromkeys(keys) if key not in existing]
+    if not missing:
+        return
+    table = model.__table__
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert(), missing)
+    except IntegrityError:
+        for row in missing:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert(), [row])
+            except IntegrityError:
+                pass
+
+
+def record_submission(topic, questions, answers, player=None):
+    """Store a graded submission and update the running counters.
+
+    ``answers`` maps question id (as string) to the submitted option index.
+    Returns the QuizAttempt; the caller owns the commit.
+    """
+    outcomes = []
+    for question in questions:
+        submitted = answers.get(str(question.id))
+        selected = submitted if isinstance(submitted, int) and not isinstance(submitted, bool) else None
+        outcomes.append({
+            'question_id': question.id,
+            'selected_answer': selected,
+            'is_correct': selected is not None and selected == question.correct_answer
+        })
+
+    correct = sum(1 for outcome in outcomes if outcome['is_correct'])
+    total = len(outcomes)
+    score = (correct / total * 100) if total > 0 else 0
+
+    attempt = QuizAttempt(topic_id=topic.id, player=player, correct=correct, total=total, score=score)
+    db.session.add(attempt)
+    db.session.flush()
+
+    if outcomes:
+        db.session.execute(
+            QuestionOutcome.__table__.insert(),
+            [dict(outcome, attempt_id=attempt.id) for outcome in outcomes]
+        )
+        _update_question_stats(outcomes)
+
+    _update_topic_stats(topic.id, total, correct, score)
+    if player:
+        _update_leaderboard(topic.id, player, score)
+
+    return attempt
+
+
+def _update_question_stats(outcomes):
+    _ensure_rows(QuestionStats, 'question_id', [outcome['question_id'] for outcome in outcomes])
+
+    table = QuestionStats.__table__
+    values = {
+        'attempts': table.c.attempts + 1,
+        'correct': table.c.correct + bindparam('inc_correct')
+    }
+    for index, name in enumerate(OPTION_COLUMNS):
+        values[name] = table.c[name] + bindparam(f'inc_{index}')
+
+    params = []
+    for outcome in outcomes:
+        row = {'qid': outcome['question_id'], 'inc_correct': int(outcome['is_correct'])}
+        for index in range(len(OPTION_COLUMNS)):
+            row[f'inc_{index}'] = int(outcome['selected_answer'] == index)
+        params.append(row)
+
+    db.session.execute(
+        table.update().where(table.c.question_id == bindparam('qid')).values(**values),
+        params
+    )
+
+
+def _update_topic_stats(topic_id, total, correct, score):
+    _ensure_rows(TopicStats, 'topic_id', [topic_id])
+
+    table = TopicStats.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.topic_id == topic_id)
+        .values(
+            submissions=table.c.submissions + 1,
+            answered=table.c.answered + total,
+            correct=table.c.correct + correct,
+            score_total=table.c.score_total + score
+        )
+    )
+
+
+def _update_leaderboard(topic_id, player, score):
+    _ensure_rows(LeaderboardEntry, 'player', [player], topic_id=topic_id)
+
+    table = LeaderboardEntry.__table__
+    improved = or_(table.c.best_score < score, table.c.best_score_at.is_(None))
+    db.session.execute(
+        table.update()
+        .where(table.c.topic_id == topic_id, table.c.player == player)
+        .values(
+            attempts=table.c.attempts + 1,
+            best_score=case((table.c.best_score < score, score), else_=table.c.best_score),
+            best_score_at=case((improved, datetime.utcnow()), else_=table.c.best_score_at)
+        )
+    )
+
+
+def rebuild_counters():
+    """Recompute every counter table from quiz_attempts/question_outcomes.
+
+    For data written around ``record_submission`` (e.g. the synthetic seed
+    generator); the caller owns the commit.
+    """
+    for model in (QuestionStats, TopicStats, LeaderboardEntry):
+        db.session.execute(model.__table__.delete())
+
+    outcome = QuestionOutcome.__table__
+    option_counts = [
+        func.sum(case((outcome.c.selected_answer == index, 1), else_=0))
+        for index in range(len(OPTION_COLUMNS))
+    ]
+    db.session.execute(QuestionStats.__table__.insert().from_select(
+        ['question_id', 'attempts', 'correct', *OPTION_COLUMNS],
+        select(
+            outcome.c.question_id,
+            func.count(),
+            func.sum(case((outcome.c.is_correct, 1), else_=0)),
+            *option_counts
+        ).group_by(outcome.c.question_id)
+    ))
+
+    attempt = QuizAttempt.__table__
+    db.session.execute(TopicStats.__table__.insert().from_select(
+        ['topic_id', 'submissions', 'answered', 'correct', 'score_total'],
+        select(
+            attempt.c.topic_id,
+            func.count(),
+            func.sum(attempt.c.total),
+            func.sum(attempt.c.correct),
+            func.sum(attempt.c.score)
+        ).group_by(attempt.c.topic_id)
+    ))
+    players = select(
+        attempt.c.topic_id,
+        attempt.c.player,
+        func.max(attempt.c.score).label('best_score'),
+        func.count().label('attempts'),
+        func.max(attempt.c.created_at).label('updated_at')
+    ).where(attempt.c.player.isnot(None)).group_by(attempt.c.topic_id, attempt.c.player).subquery()
+    # best_score_at is the first attempt that reached the best score
+    db.session.execute(LeaderboardEntry.__table__.insert().from_select(
+        ['topic_id', 'player', 'best_score', 'attempts', 'updated_at', 'best_score_at'],
+        select(
+            players.c.topic_id,
+            players.c.player,
+            players.c.best_score,
+            players.c.attempts,
+            players.c.updated_at,
+            func.min(attempt.c.created_at)
+        ).join(attempt, and_(
+            attempt.c.topic_id == players.c.topic_id,
+            attempt.c.player == players.c.player,
+            attempt.c.score == players.c.best_score
+        )).group_by(
+            players.c.topic_id, players.c.player, players.c.best_score, players.c.attempts, players.c.updated_at
+        )
+    ))
+
+
+def get_question_stats(question_id):
+    stats = db.session.get(QuestionStats, question_id)
+    if stats is None:
+        stats = QuestionStats(question_id=question_id, attempts=0, correct=0,
+                              option_0=0, option_1=0, option_2=0, option_3=0)
+    return stats.to_dict()
+
+
+def get_topic_stats(topic, limit=LEADERBOARD_SIZE):
+    stats = db.session.get(TopicStats, topic.id)
+    if stats is None:
+        stats = TopicStats(topic_id=topic.id, submissions=0, answered=0, correct=0, score_total=0)
+
+    leaders = (
+        LeaderboardEntry.query
+        .filter_by(topic_id=topic.id)
+        # Ties go to whoever reached the score first; rows from before best_score_at existed fall back to
+        # updated_at until rebuild_counters() fills it in
+        .order_by(
+            LeaderboardEntry.best_score.desc(),
+            func.coalesce(LeaderboardEntry.best_score_at, LeaderboardEntry.updated_at)
+        )
+        .limit(min(limit, MAX_LEADERBOARD_SIZE))
+        .all()
+    )
+
+    result = stats.to_dict()
+    result['topic'] = topic.slug
+    result['leaderboard'] = [entry.to_dict() for entry in leaders]
+    return result
@@ -0,0 +1,35 @@
+"""Helpers for streaming large JSON listings without building them in memory."""
+from flask import Response, stream_with_context
+
+from app.json_provider import dumps_bytes
+
+FLUSH_BYTES = 64 * 1024
+
+
+def iter_json_array(items):
+    """Yield a JSON array as UTF-8 chunks of roughly FLUSH_BYTES"""
+    buffer = [b'[']
+    size = 1
+    first = True
+    for item in items:
+        encoded = dumps_bytes(item)
+        if not first:
+            encoded = b',' + encoded
+        first = False
+        buffer.append(encoded)
+        size += len(encoded)
+        if size >= FLUSH_BYTES:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    buffer.append(b']')
+    yield b''.join(buffer)
+
+
+def json_array_response(items, headers=None):
+    """Stream ``items`` as a JSON array response, keeping the request context alive"""
+    return Response(
+        stream_with_context(iter_json_array(items)),
+        mimetype='application/json',
+        headers=headers
+    )
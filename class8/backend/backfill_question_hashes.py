@@ -0,0 +1,83 @@
+import argparse
+
+from sqlalchemy import bindparam
+
+from app import create_app
+from app.importer import find_existing_hashes
+from app.models import db
+from app.models.models import Question, question_content_hash
+
+
+def backfill_question_hashes(batch_size=1000, delete_duplicates=False):
+    """Fill content_hash for questions stored before the column existed.
+
+    Rows are walked in id order so the oldest copy of a duplicated question
+    keeps the hash; later copies are left unhashed and reported, or deleted
+    with ``delete_duplicates``.
+    """
+    app = create_app()
+
+    with app.app_context():
+        table = Question.__table__
+        update = (
+            table.update()
+            .where(table.c.id == bindparam('q_id'))
+            .values(content_hash=bindparam('content_hash'))
+        )
+        last_id = 0
+        hashed = 0
+        duplicate_ids = []
+
+        while True:
+            rows = (
+                db.session.query(Question.id, Question.topic_id, Question.question_text, Question.options)
+                .filter(Question.content_hash.is_(None), Question.id > last_id)
+                .order_by(Question.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            batch = {}
+            batch_duplicates = []
+            for row in rows:
+                key = (row.topic_id, question_content_hash(row.question_text, row.options))
+                if key in batch:
+                    batch_duplicates.append(row.id)
+                else:
+                    batch[key] = row.id
+
+            existing = find_existing_hashes(batch.keys())
+            batch_duplicates.extend(question_id for key, question_id in batch.items() if key in existing)
+
+            params = [{'q_id': question_id, 'content_hash': key[1]}
+                      for key, question_id in batch.items() if key not in existing]
+            if params:
+                db.session.execute(update, params)
+            if delete_duplicates and batch_duplicates:
+                db.session.execute(table.delete().where(table.c.id.in_(batch_duplicates)))
+            db.session.commit()
+
+            hashed += len(params)
+            duplicate_ids.extend(batch_duplicates)
+            print(f"Hashed {hashed} questions (up to id {last_id})")
+
+        print("\nBackfill Summary:")
+        print(f"Hashed: {hashed}")
+        print(f"Duplicates {'Deleted' if delete_duplicates else 'Left Unhashed'}: {len(duplicate_ids)}")
+        if duplicate_ids and not delete_duplicates:
+            print(f"Duplicate question ids: {', '.join(map(str, duplicate_ids[:100]))}"
+                  f"{' ...' if len(duplicate_ids) > 100 else ''}")
+        return hashed, duplicate_ids
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill question content hashes used for deduplication')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--delete-duplicates', action='store_true',
+                        help='delete later copies of duplicated questions instead of leaving them unhashed')
+    args = parser.parse_args()
+
+    backfill_question_hashes(batch_size=args.batch_size, delete_duplicates=args.delete_duplicates)
@@ -0,0 +1,48 @@
+import argparse
+
+from sqlalchemy import func
+
+from app import create_app
+from app.models import db
+from app.models.models import Question, WikiPage
+from app.search import ts_vector
+
+
+def backfill_search_vectors(batch_size=5000):
+    """Fill the PostgreSQL search_vector columns for rows written before search existed"""
+    app = create_app()
+
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print("Not a PostgreSQL database; search uses the in-process index, nothing to backfill")
+            return 0
+
+        targets = [
+            (WikiPage, ts_vector((WikiPage.title, 'A'), (WikiPage.content, 'B'))),
+            (Question, ts_vector((Question.question_text, 'A')))
+        ]
+        total = 0
+        for model, vector in targets:
+            table = model.__table__
+            max_id = db.session.query(func.max(model.id)).scalar() or 0
+            updated = 0
+            # Walk the primary key in ranges so each batch is an index range scan
+            for low in range(0, max_id, batch_size):
+                result = db.session.execute(
+                    table.update()
+                    .where(table.c.id > low, table.c.id <= low + batch_size, table.c.search_vector.is_(None))
+                    .values(search_vector=vector)
+                )
+                db.session.commit()
+                updated += result.rowcount
+            print(f"{table.name}: indexed {updated} rows")
+            total += updated
+        return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill full-text search vectors')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    backfill_search_vectors(batch_size=args.batch_size)
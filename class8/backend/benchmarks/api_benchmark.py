@@ -0,0 +1,265 @@
+"""Benchmark the quiz/wiki API endpoints with the Flask test client on SQLite.
+
+Usage (from class8/backend):
+    python -m benchmarks.api_benchmark --sizes 1000,10000 --requests 200 --output results.json
+    python -m benchmarks.api_benchmark --baseline results.json
+
+For every data size (number of questions) a fresh SQLite database is filled
+with generate_seed_data and each endpoint is timed in-process, so the numbers
+measure application and query cost without network or server overhead.
+Every request's SQL statements are counted. An endpoint is reported as a
+violation, and the exit status is 1, when any request exceeds its budget
+or when its steady-state (minimum) count grows with the data size. That
+catches N+1 regressions.
+
+Prints one JSON document; --baseline adds the p50 change against an
+earlier run.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import create_app, stats
+from app.config import Config, engine_options
+from app.logging_config import setup_logging
+from app.models import db
+import generate_seed_data as seed
+
+PREFIX = 'bench'
+
+# Most SQL statements one request may issue, independent of data size and
+# of how many questions a submission or upload contains
+STATEMENT_BUDGETS = {
+    'topics': 2,
+    'get_quiz': 2,
+    'submit_quiz': 20,  # 11, plus savepoint/insert/release per counter table with first-seen rows
+    'bulk_questions': 6,
+    'wiki_list': 2,
+    'wiki_detail': 2,
+    'wiki_detail_html': 4
+}
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+    def close(self):
+        event.remove(Engine, 'before_cursor_execute', self._count)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_app(database_path):
+    uri = f"sqlite:///{database_path}"
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options(uri)
+
+    return create_app(BenchmarkConfig)
+
+
+def populate(size, rng_seed, batch_size=5000):
+    data = seed.SyntheticData(rng_seed)
+    topics = max(5, size // 500)
+    topic_rows = seed.generate_topics(data, topics, PREFIX)
+    questions_by_topic = seed.generate_questions(data, topic_rows, size // topics, batch_size)
+    seed.generate_wiki_pages(data, max(10, size // 10), PREFIX, batch_size)
+    seed.generate_attempts(data, questions_by_topic, size, max(10, size // 20), batch_size)
+    stats.rebuild_counters()
+    db.session.commit()
+    return questions_by_topic
+
+
+def request_plans(app, rng, questions_by_topic, bulk_rows):
+    """Return {endpoint: callable(client) -> response} for the benchmarked requests"""
+    with app.app_context():
+        from app.models.models import Topic, WikiPage
+        topic_slugs = [slug for (slug,) in db.session.query(Topic.slug).filter(Topic.slug.like(f"{PREFIX}-%"))]
+        topic_ids = dict(db.session.query(Topic.slug, Topic.id))
+        wiki_slugs = [slug for (slug,) in db.session.query(WikiPage.slug)]
+    bulk_counter = iter(range(10 ** 9))
+
+    def submit(client):
+        slug = rng.choice(topic_slugs)
+        questions = questions_by_topic[topic_ids[slug]]
+        sampled = rng.sample(questions, min(15, len(questions)))
+        return client.post('/api/quiz/submit', json={
+            'topic': slug,
+            'player': f"bench-player-{rng.randrange(100)}",
+            'answers': {str(question_id): rng.randrange(4) for question_id, _, _ in sampled}
+        })
+
+    def bulk(client):
+        batch = next(bulk_counter)
+        return client.post('/api/quiz/questions/bulk', json=[
+            {
+                'topic_slug': rng.choice(topic_slugs),
+                'question_text': f"Benchmark bulk question {batch}-{i}?",
+                'options': ['a', 'b', 'c', 'd'],
+                'correct_answer': i % 4
+            }
+            for i in range(bulk_rows)
+        ])
+
+    return {
+        'topics': lambda client: client.get('/api/topics'),
+        'get_quiz': lambda client: client.get(f"/api/quiz/{rng.choice(topic_slugs)}"),
+        'submit_quiz': submit,
+        'bulk_questions': bulk,
+        'wiki_list': lambda client: client.get('/api/wiki?view=summary'),
+        'wiki_detail': lambda client: client.get(f"/api/wiki/{rng.choice(wiki_slugs)}"),
+        'wiki_detail_html': lambda client: client.get(f"/api/wiki/{rng.choice(wiki_slugs)}?format=html")
+    }
+
+
+def run_endpoint(client, counter, plan, requests, warmup):
+    for _ in range(warmup):
+        plan(client).close()
+
+    latencies = []
+    statements = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        counter.count = 0
+        request_started = time.perf_counter()
+        response = plan(client)
+        response.get_data()
+        latencies.append((time.perf_counter() - request_started) * 1000)
+        statements.append(counter.count)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.status_code}: {response.get_data(as_text=True)[:200]}")
+        response.close()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': requests,
+        'throughput_rps': round(requests / elapsed, 1),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3)
+        },
+        'statements': {'min': min(statements), 'max': max(statements)}
+    }
+
+
+def check_statements(results):
+    violations = []
+    steady_state = {}
+    for result in results:
+        endpoint = result['endpoint']
+        budget = STATEMENT_BUDGETS.get(endpoint)
+        observed = result['statements']
+        observed['budget'] = budget
+        if budget is not None and observed['max'] > budget:
+            violations.append(f"{endpoint} at size {result['size']}: {observed['max']} statements (budget {budget})")
+        # First-time counter rows make the max vary; the min is the steady-state path
+        previous = steady_state.get(endpoint)
+        if previous is not None and observed['min'] > previous[1]:
+            violations.append(f"{endpoint}: statements grew from {previous[1]} at size {previous[0]} "
+                              f"to {observed['min']} at size {result['size']}")
+        steady_state[endpoint] = (result['size'], observed['min'])
+    return violations
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['size'], r['endpoint']): r for r in json.load(f)['results']}
+    for result in results:
+        before = baseline.get((result['size'], result['endpoint']))
+        if before:
+            result['baseline_p50_ms'] = before['latency_ms']['p50']
+            result['p50_change_pct'] = round(
+                (result['latency_ms']['p50'] / before['latency_ms']['p50'] - 1) * 100, 1
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000', help='comma-separated question counts')
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per endpoint and size')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--bulk-rows', type=int, default=100, help='questions per bulk upload request')
+    parser.add_argument('--endpoints', help='comma-separated subset of: ' + ', '.join(STATEMENT_BUDGETS))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='also write the JSON results to this file')
+    parser.add_argument('--baseline', help='earlier --output file to compare p50 latency against')
+    args = parser.parse_args()
+    # Installed before create_app so per-request JSON logs neither skew timings nor mix with the output
+    setup_logging(logging.WARNING)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    endpoints = args.endpoints.split(',') if args.endpoints else list(STATEMENT_BUDGETS)
+    workdir = tempfile.mkdtemp(prefix='class8-bench-')
+    results = []
+
+    for size in sizes:
+        app = build_app(os.path.join(workdir, f"bench-{size}.db"))
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            questions_by_topic = populate(size, args.seed)
+            print(f"size {size}: seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        plans = request_plans(app, random.Random(args.seed), questions_by_topic, args.bulk_rows)
+        client = app.test_client()
+        counter = StatementCounter()
+        try:
+            for endpoint in endpoints:
+                result = run_endpoint(client, counter, plans[endpoint], args.requests, args.warmup)
+                results.append(dict(size=size, endpoint=endpoint, **result))
+                print(f"size {size} {endpoint}: p50 {result['latency_ms']['p50']}ms", file=sys.stderr)
+        finally:
+            counter.close()
+
+    violations = check_statements(results)
+    if args.baseline:
+        compare(results, args.baseline)
+
+    output = json.dumps({
+        'benchmark': 'api',
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'database': 'sqlite',
+        'sizes': sizes,
+        'results': results,
+        'violations': violations
+    }, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""Compare sync (WSGI) and async (ASGI) serving under rising concurrency.
+
+Usage (from class8/backend, against PostgreSQL):
+    DATABASE_URL=postgresql://... python -m benchmarks.asgi_load_test --seed-size 10000 --db-delay-ms 5
+
+Both modes are started with gunicorn and the same --workers count: sync
+workers on run:app, and uvicorn workers on asgi:app (SERVER_MODE=asgi). Each
+mode is hit with a closed loop of GET requests mixing the quiz, topic list,
+wiki list and wiki page endpoints, at every --concurrency level.
+
+--db-delay-ms routes the servers' database traffic through an in-process TCP
+proxy that delays every response from the database. It simulates the network
+round trip to a managed database, which is where a sync worker sits idle.
+--seed-size first resets the database with generate_seed_data.
+
+Prints one JSON object with throughput and latency percentiles per mode and
+concurrency.
+"""
+import argparse
+import asyncio
+import contextlib
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.engine import make_url
+
+MODES = ('wsgi', 'asgi')
+
+
+class LatencyProxy(multiprocessing.Process):
+    """TCP proxy that holds every chunk coming back from the database for ``delay`` seconds.
+
+    Runs in its own process so it never competes with the load generator's
+    threads for the GIL.
+    """
+
+    def __init__(self, upstream, delay):
+        super().__init__(daemon=True)
+        self.upstream = upstream  # ('unix', path) or ('tcp', host, port)
+        self.delay = delay
+        self.port_reader, self.port_writer = multiprocessing.Pipe(duplex=False)
+
+    def run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port_writer.send(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, client_reader, client_writer):
+        if self.upstream[0] == 'unix':
+            db_reader, db_writer = await asyncio.open_unix_connection(self.upstream[1])
+        else:
+            db_reader, db_writer = await asyncio.open_connection(self.upstream[1], self.upstream[2])
+        await asyncio.gather(
+            self._pipe(client_reader, db_writer, 0),
+            self._pipe(db_reader, client_writer, self.delay)
+        )
+
+    @staticmethod
+    async def _pipe(reader, writer, delay):
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                if delay:
+                    await asyncio.sleep(delay)
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def proxied_url(database_url, delay):
+    url = make_url(database_url)
+    if url.get_backend_name() != 'postgresql':
+        raise SystemExit('--db-delay-ms needs a PostgreSQL DATABASE_URL')
+    socket_dir = url.query.get('host')
+    if socket_dir:
+        upstream = ('unix', os.path.join(socket_dir, f".s.PGSQL.{url.port or 5432}"))
+    else:
+        upstream = ('tcp', url.host or 'localhost', url.port or 5432)
+    proxy = LatencyProxy(upstream, delay)
+    proxy.start()
+    port = proxy.port_reader.recv()
+    query = {key: value for key, value in url.query.items() if key != 'host'}
+    return str(url.set(host='127.0.0.1', port=port, query=query))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, database_url, workers, port):
+    env = dict(os.environ, DATABASE_URL=database_url, SERVER_MODE=mode,
+               PROMETHEUS_MULTIPROC_DIR=f"/tmp/prometheus_multiproc_{port}")
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--bind', f"127.0.0.1:{port}", '--workers', str(workers),
+         '--log-level', 'warning'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health/live')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start: {process.stderr.read().decode()[-2000:]}")
+
+
+def request_paths(database_url, rng, count=500):
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app
+    from app.models import db
+    from app.models.models import Topic, WikiPage
+
+    app = create_app()
+    with app.app_context():
+        topics = [slug for (slug,) in db.session.query(Topic.slug)]
+        pages = [slug for (slug,) in db.session.query(WikiPage.slug).limit(1000)]
+    if not topics or not pages:
+        raise SystemExit('No data to request; pass --seed-size')
+
+    paths = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.5:
+            paths.append(f"/api/quiz/{rng.choice(topics)}")
+        elif roll < 0.7:
+            paths.append(f"/api/wiki/{rng.choice(pages)}")
+        elif roll < 0.85:
+            paths.append('/api/wiki?view=summary')
+        else:
+            paths.append('/api/topics')
+    return paths
+
+
+def run_level(port, paths, concurrency, duration):
+    """Closed loop: ``concurrency`` clients each send the next request as soon as one completes"""
+    deadline = time.monotonic() + duration
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def client(offset):
+        nonlocal errors
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        index = offset
+        local = []
+        local_errors = 0
+        while time.monotonic() < deadline:
+            path = paths[index % len(paths)]
+            index += concurrency
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    elapsed = time.monotonic() - started
+
+    ordered = sorted(latencies) or [0]
+
+    def percentile(pct):
+        return round(ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))], 2)
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'mean': round(statistics.mean(ordered), 2),
+            'p50': percentile(50),
+            'p95': percentile(95),
+            'p99': percentile(99)
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers for both modes')
+    parser.add_argument('--concurrency', default='1,8,32,64', help='comma-separated client counts')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per concurrency level')
+    parser.add_argument('--db-delay-ms', type=float, default=0, help='added database round-trip latency')
+    parser.add_argument('--seed-size', type=int, help='reset and seed this many questions first')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        raise SystemExit('Set DATABASE_URL')
+    from app.logging_config import setup_logging
+    setup_logging(logging.WARNING)  # keep stdout for the JSON result
+    if args.seed_size:
+        from generate_seed_data import generate_seed_data
+        topics = max(5, args.seed_size // 500)
+        with contextlib.redirect_stdout(sys.stderr):
+            generate_seed_data(topics=topics, questions_per_topic=args.seed_size // topics,
+                               wiki_pages=max(10, args.seed_size // 10), attempts=args.seed_size, reset=True)
+
+    paths = request_paths(database_url, random.Random(args.seed))
+    server_url = proxied_url(database_url, args.db_delay_ms / 1000) if args.db_delay_ms else database_url
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    results = {}
+    for mode in args.modes.split(','):
+        port = free_port()
+        process = start_server(mode, server_url, args.workers, port)
+        try:
+            run_level(port, paths, levels[0], min(2, args.duration))  # warm up pools and caches
+            results[mode] = []
+            for level in levels:
+                result = run_level(port, paths, level, args.duration)
+                results[mode].append(result)
+                print(f"{mode} c={level}: {result['throughput_rps']} req/s, p50 {result['latency_ms']['p50']}ms",
+                      file=sys.stderr)
+        finally:
+            process.terminate()
+            process.wait()
+
+    print(json.dumps({
+        'benchmark': 'asgi_load_test',
+        'database': make_url(database_url).get_backend_name(),
+        'workers': args.workers,
+        'db_delay_ms': args.db_delay_ms,
+        'duration_seconds': args.duration,
+        'results': results
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Measure bytes on the wire and JSON serialization CPU for the large listings.
+
+Usage (from class8/backend):
+    python -m benchmarks.payload_benchmark --size 10000 --requests 50
+
+Seeds a fresh SQLite database with generate_seed_data, then compares a
+"before" app (standard library JSON, no compression) with an "after" app
+(JSON_ENCODER=auto, compression on) on the full wiki list, the wiki summary
+list and a page of the questions list. For each endpoint it reports:
+
+* bytes on the wire without compression, with gzip and with brotli;
+* serialization CPU: process time to encode the endpoint's payload, per
+  encoder;
+* request CPU: process time per request through the Flask test client,
+  including compression in the "after" app.
+
+Prints one JSON document.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from app import create_app
+from app.config import Config
+from app.json_provider import orjson
+from app.logging_config import setup_logging
+from app.models import db
+from benchmarks.api_benchmark import git_revision, populate
+
+ENDPOINTS = {
+    'wiki_list': '/api/wiki',
+    'wiki_list_summary': '/api/wiki?view=summary',
+    'questions_list': '/api/quiz/questions?limit=5000'
+}
+ACCEPT = {'identity': 'identity', 'gzip': 'gzip', 'br': 'br'}
+
+
+def build_app(database_path, **settings):
+    uri = f"sqlite:///{database_path}"
+
+    class PayloadConfig(Config):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+
+    for name, value in settings.items():
+        setattr(PayloadConfig, name, value)
+    return create_app(PayloadConfig)
+
+
+def cpu_ms(func, repeat):
+    """Median process time of ``func()`` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.process_time()
+        func()
+        samples.append((time.process_time() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def wire_bytes(client, path):
+    sizes = {}
+    for name, accept in ACCEPT.items():
+        response = client.get(path, headers={'Accept-Encoding': accept})
+        encoding = response.headers.get('Content-Encoding', 'identity')
+        sizes[name] = len(response.get_data()) if encoding == name else None
+    return sizes
+
+
+def serialization_ms(apps, payload, repeat):
+    timings = {}
+    for encoder, app in apps.items():
+        with app.app_context():
+            timings[encoder] = cpu_ms(lambda app=app: app.json.dumps_bytes(payload), repeat)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000, help='questions to seed (wiki pages: size / 10)')
+    parser.add_argument('--requests', type=int, default=50, help='timed repetitions per measurement')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    setup_logging(logging.WARNING)
+
+    database_path = os.path.join(tempfile.mkdtemp(prefix='class8-payload-'), 'payload.db')
+    before = build_app(database_path, JSON_ENCODER='stdlib', COMPRESS_RESPONSES=False)
+    after = build_app(database_path, JSON_ENCODER='auto', COMPRESS_RESPONSES=True)
+    with before.app_context():
+        db.create_all()
+        populate(args.size, args.seed)
+    encoders = {'stdlib': before}
+    if orjson is not None:
+        encoders['orjson'] = after
+
+    results = []
+    before_client, after_client = before.test_client(), after.test_client()
+    for endpoint, path in ENDPOINTS.items():
+        payload = json.loads(before_client.get(path).get_data())
+        result = {
+            'endpoint': endpoint,
+            'path': path,
+            'items': len(payload),
+            'bytes': wire_bytes(after_client, path),
+            'serialization_cpu_ms': serialization_ms(encoders, payload, args.requests),
+            'request_cpu_ms': {
+                'before': cpu_ms(lambda path=path: before_client.get(path).get_data(), args.requests),
+                'after_gzip': cpu_ms(
+                    lambda path=path: after_client.get(path, headers={'Accept-Encoding': 'gzip'}).get_data(),
+                    args.requests
+                ),
+                'after_br': cpu_ms(
+                    lambda path=path: after_client.get(path, headers={'Accept-Encoding': 'br'}).get_data(),
+                    args.requests
+                )
+            }
+        }
+        results.append(result)
+        print(f"{endpoint}: {result['bytes']} bytes, serialization {result['serialization_cpu_ms']} ms",
+              file=sys.stderr)
+
+    print(json.dumps({
+        'benchmark': 'payload',
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'size': args.size,
+        'orjson': orjson is not None,
+        'results': results
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Measure /api/search latency over a synthetic corpus.
+
+Usage (from class8/backend):
+    python -m benchmarks.search_benchmark --documents 100000
+    DATABASE_URL=postgresql://... python -m benchmarks.search_benchmark --documents 100000
+
+Without DATABASE_URL a temporary SQLite file is used, which exercises the
+in-process index; against PostgreSQL the tsvector/GIN path is measured.
+Prints one JSON object with build time and latency percentiles.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+WORDS = (
+    'kubernetes docker container pod deployment service ingress helm chart volume secret configmap '
+    'namespace node cluster jenkins pipeline agent build artifact terraform module state provider '
+    'network policy scaling replica probe readiness liveness image registry layer cache runtime '
+    'monitoring prometheus grafana alert logging tracing rollout rollback canary blue green'
+).split()
+QUERIES = ['kubernetes pod', 'docker image layer', 'jenkins pipeline', 'helm chart', 'readiness probe',
+           'terraform state', 'canary rollout', 'network policy', 'prometheus alert', 'secret volume']
+
+
+def sentence(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length)).capitalize()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=100000, help='total wiki pages + questions')
+    parser.add_argument('--wiki-share', type=float, default=0.1, help='fraction of documents that are wiki pages')
+    parser.add_argument('--iterations', type=int, default=20, help='runs per query')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if not os.getenv('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/search_benchmark.db"
+
+    from app import create_app, search
+    from app.importer import TopicResolver, insert_questions
+    from app.models import db
+    from app.models.models import Topic, WikiPage
+
+    rng = random.Random(args.seed)
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        n_wiki = int(args.documents * args.wiki_share)
+        n_questions = args.documents - n_wiki
+        db.session.add(Topic(name='Benchmark', slug='benchmark', description='Synthetic questions'))
+        db.session.flush()
+        for start in range(0, n_wiki, 1000):
+            db.session.add_all([
+                WikiPage(slug=f'page-{i}', title=sentence(rng, 5), category='guides',
+                         content='\n\n'.join(sentence(rng, 40) for _ in range(5)))
+                for i in range(start, min(start + 1000, n_wiki))
+            ])
+            db.session.flush()
+        importer_rows = [
+            {'topic_slug': 'benchmark', 'question_text': f'{sentence(rng, 15)}? #{i}',
+             'options': ['a', 'b', 'c', 'd'], 'correct_answer': i % 4}
+            for i in range(n_questions)
+        ]
+        resolver = TopicResolver()
+        for start in range(0, n_questions, 5000):
+            insert_questions(resolver, importer_rows[start:start + 5000])
+        db.session.commit()
+        del importer_rows
+
+        backend = search.get_backend()
+        started = time.perf_counter()
+        if isinstance(backend, search.MemorySearch):
+            backend.build()  # in the foreground, so the build itself is timed
+        backend.search('warmup')
+        build_seconds = time.perf_counter() - started
+
+        client = app.test_client()
+        samples = []
+        for _ in range(args.iterations):
+            for query in QUERIES:
+                started = time.perf_counter()
+                response = client.get('/api/search', query_string={'q': query})
+                samples.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200
+
+        print(json.dumps({
+            'benchmark': 'search',
+            'backend': type(backend).__name__,
+            'database': db.engine.dialect.name,
+            'documents': args.documents,
+            'wiki_pages': n_wiki,
+            'questions': n_questions,
+            'index_build_seconds': round(build_seconds, 3),
+            'requests': len(samples),
+            'latency_ms': {
+                'mean': round(statistics.mean(samples), 3),
+                'p50': round(percentile(samples, 50), 3),
+                'p95': round(percentile(samples, 95), 3),
+                'p99': round(percentile(samples, 99), 3)
+            }
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
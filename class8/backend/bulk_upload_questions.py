@@ -1,112 +1,223 @@
-import csv
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+from contextlib import closing
+from multiprocessing import Pool
+
 from app import create_app
-from app.models import db, Topic, Question
-from sqlalchemy.exc import IntegrityError
+from app.importer import (
+    ON_DUPLICATE_CHOICES, RowError, TopicResolver, insert_questions, iter_csv_rows, validate_question
+)
+from app.models import db
+
+
+def read_batches(csv_file_path, batch_size, start_row=0):
+    """Stream (row_number, row) batches from the CSV, skipping rows up to start_row"""
+    with open(csv_file_path, 'r', newline='') as file:
+        batch = []
+        for row_number, row in enumerate(iter_csv_rows(file), 1):
+            if row_number <= start_row:
+                continue
+            batch.append((row_number, row))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def validate_batch(batch):
+    """Validate a batch in a worker; returns (row_number, question, error) tuples"""
+    results = []
+    for row_number, row in batch:
+        try:
+            results.append((row_number, validate_question(row), None))
+        except RowError as e:
+            results.append((row_number, None, str(e)))
+    return results
+
+
+def _ignore_sigint():
+    # Ctrl-C is handled by the parent, which tears the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def validated_batches(batches, workers):
+    """Validate batches on a process pool, keeping input order and a bounded backlog"""
+    if workers <= 1:
+        for batch in batches:
+            yield validate_batch(batch)
+        return
+
+    with Pool(workers, initializer=_ignore_sigint) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.apply_async(validate_batch, (batch,)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+class Checkpoint:
+    """Remembers the last committed CSV row so an interrupted import can resume"""
+
+    def __init__(self, path, csv_file_path):
+        self.path = path
+        self.csv_file_path = os.path.abspath(csv_file_path)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return None
+        with open(self.path) as file:
+            state = json.load(file)
+        if state.get('file') != self.csv_file_path:
+            print(f"Ignoring checkpoint {self.path}: it belongs to {state.get('file')}")
+            return None
+        return state
+
+    def save(self, offset, totals):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump({'file': self.csv_file_path, 'offset': offset, **totals}, file)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
 
-def bulk_upload_questions(csv_file_path, batch_size=100):
+def write_batch(resolver, rows, on_duplicate='skip'):
+    """Commit a batch of (row_number, question); bisect on failure to isolate bad rows.
+
+    Returns (success_count, duplicate_count, [(row_number, error), ...]).
+    """
+    try:
+        success, duplicates = insert_questions(resolver, [question for _, question in rows], on_duplicate)
+        db.session.commit()
+        return success, duplicates, []
+    except Exception as e:
+        db.session.rollback()
+        if len(rows) == 1:
+            return 0, 0, [(rows[0][0], str(e).splitlines()[0])]
+
+    middle = len(rows) // 2
+    left = write_batch(resolver, rows[:middle], on_duplicate)
+    right = write_batch(resolver, rows[middle:], on_duplicate)
+    return left[0] + right[0], left[1] + right[1], left[2] + right[2]
+
+
+def bulk_upload_questions(csv_file_path, batch_size=100, workers=1, dry_run=False, checkpoint_path=None,
+                          on_duplicate='skip'):
     app = create_app()
-    
+
     with app.app_context():
-        with open(csv_file_path, 'r') as file:
-            csv_reader = csv.DictReader(file)
-            questions_batch = []
-            total_processed = 0
-            total_success = 0
-            total_failed = 0
-            topics_created = 0
-            
-            for row in csv_reader:
-                try:
-                    topic_slug = row['topic_slug'].strip()
-                    
-                    # Find or create the topic
-                    topic = Topic.query.filter_by(slug=topic_slug).first()
-                    if not topic:
-                        # Create a new topic with default values based on slug
-                        topic_name = topic_slug.replace('-', ' ').title()
-                        topic = Topic(
-                            name=topic_name,
-                            description=f"Questions about {topic_name}",
-                            slug=topic_slug
-                        )
-                        db.session.add(topic)
-                        db.session.commit()  # Commit immediately to get the ID
-                        topics_created += 1
-                        print(f"Created new topic: {topic_name} ({topic_slug})")
-                    
-                    # Parse options from CSV format
-                    options = []
-                    for i in range(1, 5):
-                        option_key = f'option{i}'
-                        if option_key in row and row[option_key]:
-                            options.append(row[option_key])
-                    
-                    # If CSV has a single options column instead of option1, option2, etc.
-                    if 'options' in row and not options:
-                        # Try to parse options as a list
-                        try:
-                            import json
-                            options = json.loads(row['options'])
-                        except:
-                            # Fallback: assume comma-separated values
-                            options = [opt.strip() for opt in row['options'].split(',')]
-                    
-                    # Validate options
-                    if len(options) != 4:
-                        print(f"Error: Question must have exactly 4 options (row has {len(options)})")
-                        total_failed += 1
-                        continue
-                    
-                    # Create question object
-                    question = Question(
-                        topic_id=topic.id,
-                        question_text=row['question_text'],
-                        options=options,
-                        correct_answer=int(row['correct_answer'])
-                    )
-                    
-                    questions_batch.append(question)
-                    total_processed += 1
-                    
-                    # Commit in batches
-                    if len(questions_batch) >= batch_size:
-                        try:
-                            db.session.bulk_save_objects(questions_batch)
-                            db.session.commit()
-                            total_success += len(questions_batch)
-                            print(f"Committed batch of {len(questions_batch)} questions")
-                            questions_batch = []
-                        except IntegrityError as e:
-                            db.session.rollback()
-                            print(f"Error in batch: {str(e)}")
-                            total_failed += len(questions_batch)
-                            questions_batch = []
-                
-                except Exception as e:
-                    print(f"Error processing row: {str(e)}")
-                    total_failed += 1
-            
-            # Commit any remaining questions
-            if questions_batch:
-                try:
-                    db.session.bulk_save_objects(questions_batch)
+        checkpoint = Checkpoint(None if dry_run else checkpoint_path, csv_file_path)
+        state = checkpoint.load() or {}
+        start_row = state.get('offset', 0)
+        totals = {
+            'processed': state.get('processed', 0),
+            'success': state.get('success', 0),
+            'duplicates': state.get('duplicates', 0),
+            'failed': state.get('failed', 0),
+            'topics_created': state.get('topics_created', 0)
+        }
+        if start_row:
+            print(f"Resuming after row {start_row} from checkpoint {checkpoint_path}")
+
+        resolver = TopicResolver()
+        started = time.monotonic()
+        rows_this_run = 0
+
+        pipeline = validated_batches(read_batches(csv_file_path, batch_size, start_row), workers)
+        with closing(pipeline):
+            for results in pipeline:
+                valid_rows = []
+                for row_number, question, error in results:
+                    if error:
+                        print(f"Row {row_number}: {error}")
+                        totals['failed'] += 1
+                    elif question is not None:
+                        valid_rows.append((row_number, question))
+                totals['processed'] += len(results)
+                rows_this_run += len(results)
+
+                if not dry_run and valid_rows:
+                    # Commit new topics on their own so a failed question batch can't roll them back
+                    created_before = len(resolver.created)
+                    resolver.resolve(question['topic_slug'] for _, question in valid_rows)
                     db.session.commit()
-                    total_success += len(questions_batch)
-                except IntegrityError as e:
-                    db.session.rollback()
-                    print(f"Error in final batch: {str(e)}")
-                    total_failed += len(questions_batch)
-            
-            print(f"\nUpload Summary:")
-            print(f"Total Processed: {total_processed}")
-            print(f"Successfully Uploaded: {total_success}")
-            print(f"Failed: {total_failed}")
-            print(f"Topics Created: {topics_created}")
+                    for slug in resolver.created[created_before:]:
+                        print(f"Created new topic: {slug}")
+                    totals['topics_created'] += len(resolver.created) - created_before
+
+                    success, duplicates, failures = write_batch(resolver, valid_rows, on_duplicate)
+                    totals['success'] += success
+                    totals['duplicates'] += duplicates
+                    totals['failed'] += len(failures)
+                    for row_number, error in failures:
+                        print(f"Row {row_number}: {error}")
+                    print(f"Committed batch of {success} questions")
+                elif dry_run:
+                    totals['success'] += len(valid_rows)
+
+                if not dry_run:
+                    checkpoint.save(results[-1][0], totals)
+
+        elapsed = time.monotonic() - started
+        checkpoint.clear()
+
+        print(f"\nUpload Summary{' (dry run)' if dry_run else ''}:")
+        print(f"Total Processed: {totals['processed']}")
+        print(f"{'Valid' if dry_run else 'Successfully Uploaded'}: {totals['success']}")
+        if not dry_run:
+            print(f"Duplicates {'Updated' if on_duplicate == 'update' else 'Skipped'}: {totals['duplicates']}")
+        print(f"Failed: {totals['failed']}")
+        print(f"Topics Created: {totals['topics_created']}")
+        print(f"Throughput: {rows_this_run / elapsed if elapsed else 0:.0f} rows/s "
+              f"({rows_this_run} rows in {elapsed:.2f}s, {workers} worker(s))")
+        return totals
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk upload quiz questions from a CSV file')
+    parser.add_argument('csv_file_path')
+    parser.add_argument('--batch-size', type=int, default=100, help='rows per validation/commit batch')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='validation worker processes; the default 1 validates inline, more only pays off '
+                             'for very large files')
+    parser.add_argument('--dry-run', action='store_true', help='validate only, write nothing')
+    parser.add_argument('--on-duplicate', choices=ON_DUPLICATE_CHOICES, default='skip',
+                        help='skip questions already stored for the topic, or update their options/answer')
+    parser.add_argument('--checkpoint', help='checkpoint file (default: <csv_file_path>.checkpoint)')
+    parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint and start over')
+    args = parser.parse_args(argv)
+    if args.batch_size < 1 or args.workers < 1:
+        parser.error('--batch-size and --workers must be at least 1')
+    if not args.checkpoint:
+        args.checkpoint = f"{args.csv_file_path}.checkpoint"
+    return args
+
 
 if __name__ == '__main__':
-    import sys
-    if len(sys.argv) != 2:
-        print("Usage: python bulk_upload_questions.py <csv_file_path>")
+    args = parse_args()
+    if not os.path.exists(args.csv_file_path):
+        print(f"File not found: {args.csv_file_path}")
         sys.exit(1)
-    
-    bulk_upload_questions(sys.argv[1])
\ No newline at end of file
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    bulk_upload_questions(
+        args.csv_file_path,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        dry_run=args.dry_run,
+        checkpoint_path=args.checkpoint,
+        on_duplicate=args.on_duplicate
+    )
@@ -0,0 +1,320 @@
+"""Generate synthetic topics, questions, wiki pages and quiz attempts for load testing.
+
+Usage (from class8/backend):
+    python generate_seed_data.py --topics 50 --questions-per-topic 2000 --wiki-pages 5000 --attempts 200000
+
+The same --seed always produces the same content. Rows are written with
+multi-row Core inserts in --batch-size chunks, and the statistics/leaderboard
+counters are rebuilt from the generated attempts at the end. --reset deletes
+ALL rows from every table first; only use it on a benchmark database.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, text
+
+from app import cache, create_app, search, stats
+from app.models import db
+from app.models.models import Topic, Question, WikiPage, QuizAttempt, QuestionOutcome, question_content_hash
+from app.routes.quiz_routes import MAX_QUIZ_QUESTIONS
+
+TOOLS = [
+    'Docker', 'Kubernetes', 'Jenkins', 'Terraform', 'Ansible', 'Helm', 'Prometheus', 'Grafana', 'Git',
+    'Linux', 'AWS', 'Nginx', 'PostgreSQL', 'Redis', 'ArgoCD', 'GitHub Actions', 'Istio', 'Vault'
+]
+LEVELS = ['Fundamentals', 'Advanced', 'Operations', 'Security', 'Networking', 'Troubleshooting']
+CONCEPTS = [
+    'container', 'image', 'volume', 'pod', 'deployment', 'service', 'ingress', 'namespace', 'node',
+    'cluster', 'pipeline', 'agent', 'artifact', 'module', 'state file', 'provider', 'network policy',
+    'replica set', 'readiness probe', 'liveness probe', 'registry', 'layer cache', 'secret', 'config map',
+    'rolling update', 'load balancer', 'health check', 'service account', 'role binding', 'cron job'
+]
+VERBS = ['create', 'inspect', 'delete', 'scale', 'restart', 'update', 'list', 'debug', 'expose', 'roll back']
+FILLER = (
+    'the application the cluster a new version the default configuration multiple environments production '
+    'traffic is running the node fails a user deploys the build breaks resources are limited the image is '
+    'rebuilt logs are rotated the pipeline retries a rollout is paused the network is partitioned'
+).split()
+QUESTION_TEMPLATES = [
+    'What is the purpose of a {concept} in {tool}?',
+    'Which command is used to {verb} a {concept} in {tool}?',
+    'How does {tool} handle a {concept} when {clause}?',
+    'What happens to the {concept} if {clause}?',
+    'Which of the following best describes a {concept} in {tool} when {clause}?',
+    'You need to {verb} a {concept} in {tool} while {clause}. What should you do first?'
+]
+WIKI_CATEGORIES = ['roadmap', 'guides', 'links', 'cheatsheets', 'interview', 'troubleshooting']
+AUTHORS = ['akhilesh', 'devops-team', 'guest', None]
+BASE_TIME = datetime(2024, 1, 1)
+SPAN_SECONDS = 365 * 24 * 3600
+
+
+class SyntheticData:
+    """Deterministic text and values drawn from one seeded RNG"""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def timestamp(self):
+        return BASE_TIME + timedelta(seconds=self.rng.randrange(SPAN_SECONDS))
+
+    def clause(self, low=3, high=9):
+        return ' '.join(self.rng.choice(FILLER) for _ in range(self.rng.randint(low, high)))
+
+    def question_text(self, tool):
+        template = self.rng.choice(QUESTION_TEMPLATES)
+        return template.format(tool=tool, concept=self.rng.choice(CONCEPTS), verb=self.rng.choice(VERBS),
+                               clause=self.clause())
+
+    def options(self, tool):
+        options = set()
+        while len(options) < 4:
+            kind = self.rng.random()
+            if kind < 0.4:
+                option = f"{tool.split()[0].lower()} {self.rng.choice(VERBS)} {self.rng.choice(CONCEPTS)}"
+            elif kind < 0.7:
+                option = f"It {self.rng.choice(VERBS)}s the {self.rng.choice(CONCEPTS)} {self.clause(1, 5)}"
+            else:
+                option = ' '.join(self.rng.choice(CONCEPTS + FILLER) for _ in range(self.rng.randint(1, 6)))
+            options.add(option.capitalize())
+        options = sorted(options)
+        self.rng.shuffle(options)
+        return options
+
+    def wiki_content(self, title):
+        sections = [f"# {title}"]
+        for _ in range(self.rng.randint(2, 6)):
+            sections.append(f"## {self.rng.choice(CONCEPTS).title()} {self.rng.choice(LEVELS).lower()}")
+            for _ in range(self.rng.randint(1, 3)):
+                sentences = [self.question_text(self.rng.choice(TOOLS)).rstrip('?') + '.'
+                             for _ in range(self.rng.randint(3, 8))]
+                sections.append(' '.join(sentences))
+            if self.rng.random() < 0.5:
+                sections.append('\n'.join(f"- {self.rng.choice(VERBS)} the {self.rng.choice(CONCEPTS)}"
+                                          for _ in range(self.rng.randint(2, 6))))
+            if self.rng.random() < 0.3:
+                sections.append(f"```bash\nkubectl {self.rng.choice(VERBS)} {self.rng.choice(CONCEPTS)}\n```")
+        return '\n\n'.join(sections)
+
+
+def _insert_in_batches(table, rows, batch_size, values=None):
+    statement = table.insert().values(**values) if values else table.insert()
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(statement, rows[start:start + batch_size])
+        db.session.commit()
+
+
+def _reset_database():
+    for table in reversed(db.metadata.sorted_tables):
+        db.session.execute(table.delete())
+    db.session.commit()
+
+
+def generate_topics(data, count, prefix):
+    """Insert topics and return [(topic_id, tool), ...]"""
+    rows = []
+    tools = {}
+    for i in range(count):
+        tool = TOOLS[i % len(TOOLS)]
+        level = LEVELS[(i // len(TOOLS)) % len(LEVELS)]
+        rounds = i // (len(TOOLS) * len(LEVELS))
+        name = f"{tool} {level}" + (f" {rounds + 1}" if rounds else '')
+        tools[f"{prefix}-{i + 1:04d}"] = tool
+        rows.append({
+            'name': name,
+            'slug': f"{prefix}-{i + 1:04d}",
+            'description': f"Synthetic {level.lower()} questions about {tool}",
+            'created_at': data.timestamp()
+        })
+    db.session.execute(Topic.__table__.insert(), rows)
+    db.session.commit()
+    stored = db.session.query(Topic.id, Topic.slug).filter(Topic.slug.like(f"{prefix}-%")).order_by(Topic.id)
+    return [(topic_id, tools[slug]) for topic_id, slug in stored]
+
+
+def generate_questions(data, topics, per_topic, batch_size):
+    """Insert questions and return {topic_id: [(question_id, correct_answer, ease), ...]}"""
+    vector_values = search.question_vector_values()
+    by_topic = {}
+    for topic_id, tool in topics:
+        rows = {}
+        ease = {}
+        while len(rows) < per_topic:
+            question_text = data.question_text(tool)
+            options = data.options(tool)
+            content_hash = question_content_hash(question_text, options)
+            if content_hash in rows:
+                continue
+            rows[content_hash] = {
+                'topic_id': topic_id,
+                'question_text': question_text,
+                'options': options,
+                'correct_answer': data.rng.randrange(4),
+                'content_hash': content_hash,
+                'created_at': data.timestamp()
+            }
+            ease[content_hash] = data.rng.uniform(0.2, 0.95)
+            if vector_values:
+                rows[content_hash]['search_text'] = question_text
+        _insert_in_batches(Question.__table__, list(rows.values()), batch_size, vector_values)
+
+        # The topic is new, so every question in it is one of ours
+        stored = db.session.query(Question.id, Question.correct_answer, Question.content_hash).filter(
+            Question.topic_id == topic_id
+        )
+        by_topic[topic_id] = sorted((q_id, correct, ease[content_hash]) for q_id, correct, content_hash in stored)
+    return by_topic
+
+
+def generate_wiki_pages(data, count, prefix, batch_size):
+    vector_values = search.wiki_vector_values()
+    rows = []
+    for i in range(count):
+        title = f"{data.rng.choice(TOOLS)} {data.rng.choice(CONCEPTS)} {data.rng.choice(LEVELS).lower()}"
+        content = data.wiki_content(title)
+        created_at = data.timestamp()
+        row = {
+            'slug': f"{prefix}-page-{i + 1:06d}",
+            'title': title.title(),
+            'content': content,
+            'category': data.rng.choice(WIKI_CATEGORIES),
+            'created_at': created_at,
+            'updated_at': created_at + timedelta(seconds=data.rng.randrange(30 * 24 * 3600)),
+            'author': data.rng.choice(AUTHORS),
+            'is_published': data.rng.random() < 0.95
+        }
+        if vector_values:
+            row['search_title'] = row['title']
+            row['search_content'] = content
+        rows.append(row)
+    _insert_in_batches(WikiPage.__table__, rows, batch_size, vector_values)
+
+
+def generate_attempts(data, questions_by_topic, count, players, batch_size):
+    """Insert graded attempts and their per-question outcomes.
+
+    Attempt ids are assigned here so outcomes can reference them without a
+    round trip per attempt; the PostgreSQL sequence is moved past them after.
+    """
+    topic_ids = [topic_id for topic_id, questions in questions_by_topic.items() if questions]
+    if not topic_ids or count <= 0:
+        return 0
+    # A few popular topics get most of the traffic
+    weights = [1 / (rank + 1) for rank in range(len(topic_ids))]
+    skills = {f"player-{i + 1:05d}": data.rng.uniform(0.3, 0.95) for i in range(players)}
+    names = list(skills)
+
+    next_id = (db.session.query(func.max(QuizAttempt.id)).scalar() or 0) + 1
+    outcome_total = 0
+    for start in range(0, count, batch_size):
+        attempts = []
+        outcomes = []
+        for attempt_id in range(next_id + start, next_id + min(start + batch_size, count)):
+            topic_id = data.rng.choices(topic_ids, weights)[0]
+            questions = questions_by_topic[topic_id]
+            player = data.rng.choice(names) if names and data.rng.random() < 0.7 else None
+            skill = skills[player] if player else 0.6
+
+            correct = 0
+            sampled = data.rng.sample(questions, min(MAX_QUIZ_QUESTIONS, len(questions)))
+            for question_id, correct_answer, ease in sampled:
+                roll = data.rng.random()
+                if roll < 0.03:
+                    selected = None
+                elif roll < min(0.98, skill * ease + 0.1):
+                    selected = correct_answer
+                else:
+                    selected = data.rng.choice([i for i in range(4) if i != correct_answer])
+                is_correct = selected == correct_answer
+                correct += is_correct
+                outcomes.append({
+                    'attempt_id': attempt_id,
+                    'question_id': question_id,
+                    'selected_answer': selected,
+                    'is_correct': is_correct
+                })
+
+            attempts.append({
+                'id': attempt_id,
+                'topic_id': topic_id,
+                'player': player,
+                'correct': correct,
+                'total': len(sampled),
+                'score': correct / len(sampled) * 100,
+                'created_at': data.timestamp()
+            })
+        db.session.execute(QuizAttempt.__table__.insert(), attempts)
+        db.session.execute(QuestionOutcome.__table__.insert(), outcomes)
+        db.session.commit()
+        outcome_total += len(outcomes)
+
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text(
+            "SELECT setval(pg_get_serial_sequence('quiz_attempts', 'id'), (SELECT MAX(id) FROM quiz_attempts))"
+        ))
+        db.session.commit()
+    return outcome_total
+
+
+def generate_seed_data(topics=20, questions_per_topic=500, wiki_pages=1000, attempts=10000, players=500,
+                       seed=42, batch_size=5000, prefix='synthetic', reset=False):
+    app = create_app()
+
+    with app.app_context():
+        if reset:
+            _reset_database()
+        elif db.session.query(Topic.id).filter(Topic.slug.like(f"{prefix}-%")).first():
+            raise SystemExit(f"Topics with prefix '{prefix}' already exist; use --reset or another --prefix")
+
+        data = SyntheticData(seed)
+        timings = {}
+
+        started = time.perf_counter()
+        topic_rows = generate_topics(data, topics, prefix)
+        questions_by_topic = generate_questions(data, topic_rows, questions_per_topic, batch_size)
+        timings['questions'] = time.perf_counter() - started
+        print(f"Created {len(topic_rows)} topics and {len(topic_rows) * questions_per_topic} questions "
+              f"in {timings['questions']:.1f}s")
+
+        started = time.perf_counter()
+        generate_wiki_pages(data, wiki_pages, prefix, batch_size)
+        timings['wiki_pages'] = time.perf_counter() - started
+        print(f"Created {wiki_pages} wiki pages in {timings['wiki_pages']:.1f}s")
+
+        started = time.perf_counter()
+        outcomes = generate_attempts(data, questions_by_topic, attempts, players, batch_size)
+        stats.rebuild_counters()
+        cache.invalidate(cache.TOPICS, cache.WIKI_CATEGORIES)
+        db.session.commit()
+        timings['attempts'] = time.perf_counter() - started
+        print(f"Created {attempts} quiz attempts ({outcomes} answers) and rebuilt statistics "
+              f"in {timings['attempts']:.1f}s")
+        return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic data for load and performance testing')
+    parser.add_argument('--topics', type=int, default=20)
+    parser.add_argument('--questions-per-topic', type=int, default=500)
+    parser.add_argument('--wiki-pages', type=int, default=1000)
+    parser.add_argument('--attempts', type=int, default=10000, help='quiz submissions to generate')
+    parser.add_argument('--players', type=int, default=500, help='distinct leaderboard players')
+    parser.add_argument('--seed', type=int, default=42, help='same seed, same data')
+    parser.add_argument('--batch-size', type=int, default=5000, help='rows per insert statement')
+    parser.add_argument('--prefix', default='synthetic', help='slug prefix for generated topics and pages')
+    parser.add_argument('--reset', action='store_true', help='delete ALL existing rows first')
+    args = parser.parse_args()
+
+    generate_seed_data(
+        topics=args.topics,
+        questions_per_topic=args.questions_per_topic,
+        wiki_pages=args.wiki_pages,
+        attempts=args.attempts,
+        players=args.players,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        prefix=args.prefix,
+        reset=args.reset
+    )
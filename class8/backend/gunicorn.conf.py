@@ -0,0 +1,23 @@
+# Loaded automatically by gunicorn from the working directory.
+import os
+import shutil
+
+# SERVER_MODE=asgi serves asgi:app (async reads for the hot GET endpoints, see
+# app/asgi.py) with uvicorn workers; the default serves the Flask app directly.
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'asgi:app'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'run:app'
+
+# Workers share Prometheus samples through PROMETHEUS_MULTIPROC_DIR so /metrics
+# reports totals for the whole pod, whichever worker serves the scrape. The
+# variable must be set before the workers import prometheus_client.
+multiproc_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+shutil.rmtree(multiproc_dir, ignore_errors=True)
+os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -57,6 +57,12 @@ else
     }
 fi
 
+echo "Backfilling question content hashes..."
+python backfill_question_hashes.py
+
+echo "Backfilling full-text search vectors..."
+python backfill_search_vectors.py
+
 echo "Checking if seed data is needed..."
 # Only run seed data if topics table is empty
 PGPASSWORD="$DB_PASSWORD" psql -h "$DB_HOST" -p "$DB_PORT" -U "$DB_USERNAME" -d "$DB_NAME" -t -c "SELECT COUNT(*) FROM topics" 2>/dev/null | grep -q "0" && {
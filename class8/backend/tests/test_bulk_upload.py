@@ -0,0 +1,77 @@
+import json
+
+from sqlalchemy import event
+
+from app import importer
+from app.models.models import Question, Topic
+
+
+def question(i, slug='docker', **fields):
+    return dict({'topic_slug': slug, 'question_text': f'Question {i}?', 'options': ['a', 'b', 'c', 'd'],
+                 'correct_answer': i % 4}, **fields)
+
+
+def upload(client, body, content_type='application/json', **query):
+    return client.post('/api/quiz/questions/bulk', data=body, content_type=content_type, query_string=query)
+
+
+def test_json_upload_reports_failed_rows_and_creates_topics(client, db):
+    rows = [question(0), question(1, slug='helm'), {'topic_slug': 'docker'}, question(2, options=['a']), {}]
+
+    response = upload(client, json.dumps(rows))
+
+    assert response.status_code == 200
+    assert response.json == {
+        'success': 2, 'duplicates': 0, 'failed': 2, 'topics_created': 2,
+        'errors': ['Row 3: Missing required fields', 'Row 4: Invalid options format']
+    }
+    assert sorted(topic.slug for topic in Topic.query) == ['docker', 'helm']
+
+
+def test_ndjson_upload_skips_blank_lines(client, db):
+    body = '\n'.join([json.dumps(question(0)), '', '{not json', json.dumps(question(1))]) + '\n'
+
+    response = upload(client, body, 'application/x-ndjson')
+
+    assert (response.json['success'], response.json['failed']) == (2, 1)
+    assert response.json['errors'] == ['Row 3: Invalid JSON']
+
+
+def test_csv_upload_reads_option_columns(client, db):
+    body = (
+        'topic_slug,question_text,option1,option2,option3,option4,correct_answer\n'
+        'docker,What is a layer?,a,b,c,d,2\n'
+        'docker,What is a volume?,a,b,c,,1\n'
+    )
+
+    response = upload(client, body, 'text/csv')
+
+    assert (response.json['success'], response.json['failed']) == (1, 1)
+    stored = Question.query.one()
+    assert (stored.question_text, stored.options, stored.correct_answer) == ('What is a layer?', list('abcd'), 2)
+
+
+def test_rows_are_written_one_insert_per_chunk(client, db, monkeypatch):
+    monkeypatch.setattr(importer, 'CHUNK_SIZE', 2)
+    inserts = []
+
+    def count_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO questions'):
+            inserts.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count_inserts)
+    try:
+        response = upload(client, json.dumps([question(i) for i in range(5)]))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_inserts)
+
+    assert response.json['success'] == 5
+    assert len(inserts) == 3
+
+
+def test_bad_uploads_are_rejected(client, db):
+    assert upload(client, '{}').status_code == 400
+    assert upload(client, 'a,b', 'text/plain').status_code == 400
+    assert upload(client, '[]', on_duplicate='replace').status_code == 400
+    assert upload(client, b'topic_slug\n\xff\xfe', 'text/csv').status_code == 400
+    assert Question.query.count() == 0
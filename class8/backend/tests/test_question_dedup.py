@@ -0,0 +1,65 @@
+import json
+
+from app.models.models import Question
+
+
+def post_question(client, on_duplicate=None, **fields):
+    body = dict({'topic_slug': 'docker', 'question_text': 'What is an image?', 'options': ['a', 'b', 'c', 'd'],
+                 'correct_answer': 1}, **fields)
+    query = {'on_duplicate': on_duplicate} if on_duplicate else {}
+    return client.post('/api/quiz/questions', json=body, query_string=query)
+
+
+def test_duplicate_post_returns_the_stored_question(client, db):
+    created = post_question(client)
+    # Same text and options up to whitespace, case and option order; this is the path a
+    # concurrent post takes when it loses the insert race on the unique constraint
+    duplicate = post_question(client, question_text='  what is an   IMAGE? ', options=['d', 'c', 'b', 'a'],
+                              correct_answer=3)
+
+    assert created.status_code == 201
+    assert duplicate.status_code == 200
+    assert duplicate.json['id'] == created.json['id']
+    assert duplicate.json['correct_answer'] == 1
+    assert Question.query.count() == 1
+
+
+def test_duplicate_post_can_update_the_stored_question(client, db):
+    created = post_question(client)
+
+    updated = post_question(client, on_duplicate='update', correct_answer=2)
+
+    assert (updated.status_code, updated.json['id']) == (200, created.json['id'])
+    assert Question.query.one().correct_answer == 2
+
+
+def test_different_topics_keep_their_own_copy(client, db):
+    assert post_question(client).status_code == 201
+    assert post_question(client, topic_slug='kubernetes').status_code == 201
+    assert Question.query.count() == 2
+
+
+def test_bulk_upload_skips_or_updates_duplicates(client, db):
+    post_question(client)
+    rows = [
+        {'topic_slug': 'docker', 'question_text': 'What is an image?', 'options': ['a', 'b', 'c', 'd'],
+         'correct_answer': 3},
+        {'topic_slug': 'docker', 'question_text': 'What is a tag?', 'options': ['a', 'b', 'c', 'd'],
+         'correct_answer': 0},
+        {'topic_slug': 'docker', 'question_text': 'what is a TAG?', 'options': ['a', 'b', 'c', 'd'],
+         'correct_answer': 2},
+    ]
+
+    skipped = client.post('/api/quiz/questions/bulk', data=json.dumps(rows), content_type='application/json')
+    answers = {question.question_text: question.correct_answer for question in Question.query}
+
+    assert (skipped.json['success'], skipped.json['duplicates']) == (1, 2)
+    assert answers == {'What is an image?': 1, 'What is a tag?': 0}
+
+    updated = client.post('/api/quiz/questions/bulk?on_duplicate=update', data=json.dumps(rows),
+                          content_type='application/json')
+    answers = {question.question_text: question.correct_answer for question in Question.query}
+
+    assert (updated.json['success'], updated.json['duplicates']) == (0, 3)
+    assert answers == {'What is an image?': 3, 'What is a tag?': 2}
+
@@ -0,0 +1,89 @@
+import json
+import tracemalloc
+
+from app.models.models import Question, Topic, question_content_hash
+
+ROWS = 200_000
+PAGE_SIZE = 5000
+# Each page is streamed in FLUSH_BYTES chunks, so the peak covers one batch of rows, not the table
+PEAK_BYTES = 8 * 1024 * 1024
+
+
+def seed_questions(db, count):
+    topic = Topic(name='Listing', slug='listing', description='Paged questions')
+    db.session.add(topic)
+    db.session.flush()
+    for start in range(0, count, 10_000):
+        rows = []
+        for i in range(start, min(start + 10_000, count)):
+            text, options = f'Question {i}?', ['a', 'b', 'c', 'd']
+            rows.append({
+                'topic_id': topic.id, 'question_text': text, 'options': options, 'correct_answer': i % 4,
+                'content_hash': question_content_hash(text, options)
+            })
+        db.session.execute(Question.__table__.insert(), rows)
+    db.session.commit()
+
+
+def test_walking_200k_questions_keeps_memory_flat(client, db):
+    seed_questions(db, ROWS)
+
+    seen = 0
+    last_id = 0
+    pages = 0
+    cursor = None
+    tracemalloc.start()
+    try:
+        while True:
+            query = {'limit': PAGE_SIZE}
+            if cursor:
+                query['cursor'] = cursor
+            response = client.get('/api/quiz/questions', query_string=query, buffered=False)
+            assert response.status_code == 200
+            body = b''.join(response.response)
+            response.close()
+            page = json.loads(body)
+            assert page and page[0]['id'] > last_id
+            seen += len(page)
+            last_id = page[-1]['id']
+            pages += 1
+            del body, page
+            cursor = response.headers.get('X-Next-Cursor')
+            if cursor is None:
+                assert 'Link' not in response.headers
+                break
+            assert response.headers['Link'].endswith('; rel="next"')
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert seen == ROWS
+    assert pages == ROWS // PAGE_SIZE
+    assert peak < PEAK_BYTES, f'peak {peak / 2**20:.1f} MiB'
+
+
+def get_page(client, **query):
+    """Read a streamed page and close it, which ends its request context"""
+    with client.get('/api/quiz/questions', query_string=query) as response:
+        assert response.status_code == 200
+        return response.json, response.headers
+
+
+def test_last_page_has_no_next_link(client, db):
+    seed_questions(db, 3)
+
+    first, first_headers = get_page(client, limit=2)
+    last, last_headers = get_page(client, limit=2, cursor=first_headers['X-Next-Cursor'])
+
+    assert [row['question'] for row in first] == ['Question 0?', 'Question 1?']
+    assert 'cursor=' in first_headers['Link']
+    assert [row['question'] for row in last] == ['Question 2?']
+    assert 'X-Next-Cursor' not in last_headers
+    assert 'Link' not in last_headers
+
+
+def test_invalid_fields_and_limits_are_rejected(client, db):
+    assert client.get('/api/quiz/questions?fields=id,password').status_code == 400
+    assert client.get('/api/quiz/questions?limit=0').status_code == 400
+    assert client.get('/api/quiz/questions?limit=5001').status_code == 400
+    assert client.get('/api/quiz/questions?created_after=yesterday').status_code == 400
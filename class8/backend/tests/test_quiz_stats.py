@@ -0,0 +1,109 @@
+from app import stats
+from app.models.models import LeaderboardEntry, QuizAttempt, Question, Topic, TopicStats
+
+
+def add_topic(db, slug='docker', answers=(1, 2)):
+    topic = Topic(name=slug.title(), slug=slug, description='')
+    db.session.add(topic)
+    db.session.flush()
+    questions = [
+        Question(topic_id=topic.id, question_text=f'{slug} question {i}?', options=['a', 'b', 'c', 'd'],
+                 correct_answer=answer)
+        for i, answer in enumerate(answers)
+    ]
+    db.session.add_all(questions)
+    db.session.commit()
+    return topic, questions
+
+
+def submit(client, topic, answers, player=None):
+    return client.post('/api/quiz/submit', json={'topic': topic.slug, 'answers': answers, 'player': player})
+
+
+def test_submission_with_bad_answer_keys_is_rejected(client, db):
+    topic, questions = add_topic(db)
+
+    assert submit(client, topic, {'abc': 1}).status_code == 400
+    assert submit(client, topic, [1, 2]).status_code == 400
+    assert QuizAttempt.query.count() == 0
+
+
+def test_submission_without_questions_of_the_topic_is_not_recorded(client, db):
+    topic, _ = add_topic(db)
+    _, others = add_topic(db, 'helm')
+
+    response = submit(client, topic, {str(others[0].id): others[0].correct_answer, '999': 0}, player='ann')
+
+    assert response.status_code == 400
+    assert QuizAttempt.query.count() == 0
+    assert db.session.get(TopicStats, topic.id) is None
+    assert LeaderboardEntry.query.count() == 0
+
+
+def test_grading_counts_only_integer_answers(client, db):
+    topic, (first, second) = add_topic(db, answers=(1, 2))
+
+    # JSON true equals 1 in Python but is not an option index
+    response = submit(client, topic, {str(first.id): True, str(second.id): 2})
+
+    assert response.status_code == 200
+    assert response.json == {'score': 50.0, 'correct': 1, 'total': 2}
+    assert client.get(f'/api/quiz/questions/{first.id}/stats').json == {
+        'question_id': first.id, 'attempts': 1, 'correct': 0, 'percent_correct': 0.0,
+        'option_distribution': [0, 0, 0, 0]
+    }
+    assert client.get(f'/api/quiz/questions/{second.id}/stats').json['option_distribution'] == [0, 0, 1, 0]
+
+
+def test_topic_counters_follow_submissions(client, db):
+    topic, (first, second) = add_topic(db, answers=(1, 2))
+
+    submit(client, topic, {str(first.id): 1, str(second.id): 2})
+    submit(client, topic, {str(first.id): 0})
+
+    topic_stats = client.get(f'/api/topics/{topic.slug}/stats').json
+    assert topic_stats['submissions'] == 2
+    assert (topic_stats['answered'], topic_stats['correct']) == (3, 2)
+    assert topic_stats['average_score'] == 50.0
+    assert client.get(f'/api/quiz/questions/{first.id}/stats').json['option_distribution'] == [1, 1, 0, 0]
+
+
+def test_leaderboard_ties_go_to_whoever_reached_the_score_first(client, db):
+    topic, (question, _) = add_topic(db)
+    perfect = {str(question.id): question.correct_answer}
+
+    submit(client, topic, perfect, player='ann')
+    submit(client, topic, perfect, player='bob')
+    # A later, worse attempt bumps ann's row but not the time she first scored 100
+    submit(client, topic, {str(question.id): 3}, player='ann')
+
+    leaderboard = client.get(f'/api/topics/{topic.slug}/stats').json['leaderboard']
+    assert [(entry['player'], entry['best_score'], entry['attempts']) for entry in leaderboard] == [
+        ('ann', 100.0, 2), ('bob', 100.0, 1)
+    ]
+
+
+def test_rebuild_counters_matches_the_running_counters(client, db):
+    topic, (first, second) = add_topic(db, answers=(1, 2))
+    submit(client, topic, {str(first.id): 1, str(second.id): 0}, player='ann')
+    submit(client, topic, {str(first.id): 1, str(second.id): 2}, player='bob')
+    submit(client, topic, {str(first.id): 1, str(second.id): 2}, player='ann')
+    submit(client, topic, {str(first.id): 3})
+
+    def snapshot():
+        return (
+            client.get(f'/api/topics/{topic.slug}/stats').json,
+            client.get(f'/api/quiz/questions/{first.id}/stats').json,
+            client.get(f'/api/quiz/questions/{second.id}/stats').json,
+        )
+
+    running = snapshot()
+    stats.rebuild_counters()
+    db.session.commit()
+    rebuilt = snapshot()
+
+    for entries in (running[0]['leaderboard'], rebuilt[0]['leaderboard']):
+        for entry in entries:
+            del entry['updated_at'], entry['best_score_at']  # stamped by the app vs read from the attempts
+    assert rebuilt == running
+    assert [entry['player'] for entry in rebuilt[0]['leaderboard']] == ['bob', 'ann']
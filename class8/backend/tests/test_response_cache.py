@@ -0,0 +1,107 @@
+import json
+
+from sqlalchemy import event
+
+from app import cache
+from app.models.models import CacheVersion, Topic
+
+
+def topic_slugs(client, path='/api/topics'):
+    response = client.get(path)
+    assert response.status_code == 200
+    return sorted(topic['id'] for topic in response.json)  # a topic's public id is its slug
+
+
+def count_selects(db):
+    selects = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT'):
+            selects.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    return selects, lambda: event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def test_cached_listing_follows_every_topic_write(client, db):
+    assert topic_slugs(client) == []
+
+    client.post('/api/topics', json={'name': 'Docker', 'description': '', 'slug': 'docker'})
+    assert topic_slugs(client) == ['docker']
+    topic_id = Topic.query.filter_by(slug='docker').one().id
+
+    client.put(f'/api/topics/{topic_id}', json={'slug': 'containers'})
+    assert topic_slugs(client) == ['containers']
+
+    client.post('/api/quiz/questions', json={'topic_slug': 'helm', 'question_text': 'Chart?',
+                                             'options': ['a', 'b', 'c', 'd'], 'correct_answer': 0})
+    assert topic_slugs(client) == ['containers', 'helm']
+
+    rows = [{'topic_slug': 'terraform', 'question_text': 'State?', 'options': ['a', 'b', 'c', 'd'],
+             'correct_answer': 0}]
+    client.post('/api/quiz/questions/bulk', data=json.dumps(rows), content_type='application/json')
+    assert topic_slugs(client) == ['containers', 'helm', 'terraform']
+
+    client.delete(f'/api/topics/{topic_id}')
+    assert topic_slugs(client) == ['helm', 'terraform']
+
+
+def test_cache_hits_skip_the_view_and_ignore_unknown_query_args(client, db):
+    topic_slugs(client)
+    selects, stop = count_selects(db)
+    try:
+        topic_slugs(client, '/api/topics?utm=1')
+        topic_slugs(client, '/api/topics?utm=2')
+    finally:
+        stop()
+
+    assert not any('FROM topics' in statement for statement in selects)
+    assert len(cache._get_cache().entries) == 1
+
+
+def test_other_processes_writes_show_after_the_version_ttl(app, client, db):
+    response_cache = cache._get_cache()
+    assert topic_slugs(client) == []
+
+    # Another worker adds a topic and bumps the version; this one still trusts the version it read
+    db.session.add(Topic(name='Docker', description='', slug='docker'))
+    db.session.add(CacheVersion(namespace=cache.TOPICS, version=1))
+    db.session.commit()
+    assert topic_slugs(client) == []
+
+    response_cache.version_ttl = 0
+    assert topic_slugs(client) == ['docker']
+
+
+def test_rolled_back_write_keeps_the_cached_version(client, db):
+    topic_slugs(client)
+    response_cache = cache._get_cache()
+    read = response_cache.versions[cache.TOPICS]
+
+    cache.invalidate(cache.TOPICS)
+    db.session.rollback()
+
+    assert response_cache.versions[cache.TOPICS] == read
+    assert cache._PENDING not in db.session.info
+
+
+def test_entries_are_bounded_least_recently_used_first(app, db):
+    response_cache = cache._get_cache()
+    response_cache.max_entries = 2
+    entry = (b'[]', 'application/json', 'etag', {})
+
+    response_cache.put(cache.TOPICS, 0, 'a', entry)
+    response_cache.put(cache.TOPICS, 0, 'b', entry)
+    response_cache.get(cache.TOPICS, 0, 'a')
+    response_cache.put(cache.TOPICS, 0, 'c', entry)
+
+    assert [key for _, _, key in response_cache.entries] == ['a', 'c']
+
+
+def test_etag_revalidation(client, db):
+    etag = client.get('/api/topics').headers['ETag']
+
+    response = client.get('/api/topics', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert 'max-age' in response.headers['Cache-Control']
@@ -0,0 +1,69 @@
+import threading
+from datetime import datetime, timedelta
+
+from app import search
+from app.models.models import Question, Topic, WikiPage
+
+
+def search_keys(client, query):
+    response = client.get('/api/search', query_string={'q': query})
+    assert response.status_code == 200
+    return [(result['type'], result['id']) for result in response.json['results']]
+
+
+def built_backend(db):
+    topic = Topic(name='Search', slug='search', description='')
+    db.session.add(topic)
+    db.session.commit()
+    backend = search.get_backend()
+    backend.SYNC_RECHECK_SECONDS = 0  # read back over the lookback window on every search
+    backend.build()
+    return backend, topic
+
+
+def test_create_app_does_not_build_the_index(app, client):
+    assert not any(thread.name == 'search-index' for thread in threading.enumerate())
+
+    response = client.get('/api/search?q=anything')
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    search.get_backend().builder.join()
+    assert client.get('/api/search?q=anything').status_code == 200
+
+
+def test_rows_written_elsewhere_are_picked_up(client, db):
+    _, topic = built_backend(db)
+    newest = datetime.utcnow()
+    table = Question.__table__
+    db.session.execute(table.insert(), [
+        {'id': 10, 'topic_id': topic.id, 'question_text': 'Newest kubernetes', 'options': ['a'],
+         'correct_answer': 0, 'updated_at': newest}
+    ])
+    db.session.commit()
+    assert search_keys(client, 'kubernetes') == [('question', 10)]
+
+    # Committed after id 10, with a lower id and an earlier timestamp
+    db.session.execute(table.insert(), [
+        {'id': 5, 'topic_id': topic.id, 'question_text': 'Late helm', 'options': ['a'],
+         'correct_answer': 0, 'updated_at': newest - timedelta(seconds=5)}
+    ])
+    db.session.add(WikiPage(slug='same', title='Helm charts', category='k8s', content='x', updated_at=newest))
+    db.session.commit()
+    assert sorted(search_keys(client, 'helm')) == [('question', 5), ('wiki', 1)]
+
+
+def test_edited_questions_are_reindexed(client, db):
+    _, topic = built_backend(db)
+    question = Question(topic_id=topic.id, question_text='What is terraform?', options=['a'], correct_answer=0)
+    db.session.add(question)
+    db.session.commit()
+    assert search_keys(client, 'terraform') == [('question', question.id)]
+
+    db.session.execute(
+        Question.__table__.update().where(Question.id == question.id).values(question_text='What is ansible?')
+    )
+    db.session.commit()
+
+    assert search_keys(client, 'terraform') == []
+    assert search_keys(client, 'ansible') == [('question', question.id)]
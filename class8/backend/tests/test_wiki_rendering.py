@@ -0,0 +1,55 @@
+from unittest import mock
+
+from app import rendering
+from app.models.models import WikiRenderedPage
+
+
+def create_page(client, content):
+    response = client.post('/api/wiki', json={'title': 'Compose', 'content': content, 'category': 'docker'})
+    assert response.status_code == 201
+    return response.json
+
+
+def get_html(client, slug='compose', **headers):
+    return client.get(f'/api/wiki/{slug}?format=html', headers=headers)
+
+
+def test_html_is_sanitized_and_rendered_once_per_version(client, db):
+    create_page(client, '# Compose\n\n<script>alert(1)</script>[x](javascript:alert(1))')
+
+    with mock.patch.object(rendering, 'render_markdown', wraps=rendering.render_markdown) as render:
+        first = get_html(client)
+        second = get_html(client)
+
+    assert render.call_count == 1
+    assert first.json['content_html'] == second.json['content_html']
+    assert '<h1>Compose</h1>' in first.json['content_html']
+    assert '<script' not in first.json['content_html']
+    assert 'javascript:' not in first.json['content_html']
+    assert 'content' not in first.json
+
+
+def test_editing_a_page_replaces_its_render(client, db):
+    create_page(client, 'old text')
+    before = get_html(client)
+
+    client.put('/api/wiki/compose', json={'content': 'new **text**'})
+    after = get_html(client)
+
+    assert before.headers['ETag'] != after.headers['ETag']
+    assert after.json['content_html'] == '<p>new <strong>text</strong></p>'
+    assert WikiRenderedPage.query.count() == 1
+
+    client.delete('/api/wiki/compose')
+    assert WikiRenderedPage.query.count() == 0
+
+
+def test_matching_etag_gets_304_without_rendering(client, db):
+    create_page(client, 'text')
+    etag = get_html(client).headers['ETag']
+
+    with mock.patch.object(rendering, 'get_rendered_html') as render:
+        response = get_html(client, **{'If-None-Match': etag})
+
+    assert response.status_code == 304
+    render.assert_not_called()
@@ -3,8 +3,8 @@ import API_URL from '../config/api';
 export const fetchAllWikiPages = async (category = null) => {
   try {
     const url = category 
-      ? `${API_URL}/api/wiki?category=${encodeURIComponent(category)}`
-      : `${API_URL}/api/wiki`;
+      ? `${API_URL}/api/wiki?view=summary&category=${encodeURIComponent(category)}`
+      : `${API_URL}/api/wiki?view=summary`;
       
     const response = await fetch(url);
     if (!response.ok) {
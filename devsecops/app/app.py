@@ -1,16 +1,37 @@
 from datetime import datetime
 
-from flask import Flask, jsonify, request
+from flask import Flask, abort, jsonify, request, url_for
 from flask_migrate import Migrate
-
+from sqlalchemy import false, func, true, update
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.exc import StaleDataError
+
+import batch
+import pagination
+import search
+import summary
+import tagging
 from config import Config
-from models import Comment, Tag, Task, User, db
+from models import (
+    Comment,
+    Tag,
+    Task,
+    User,
+    bump_versions,
+    db,
+    insert_unique,
+    prefetch_comment_counts,
+    prefetch_tags,
+    task_tags,
+)
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
 db.init_app(app)
-migrate = Migrate(app, db)
+migrate = Migrate(app, db, include_object=search.include_object)
+
+FILTER_PARAMS = ("status", "priority", "completed", "user_id")
 
 
 @app.route("/health", methods=["GET"])
@@ -27,17 +48,18 @@ def create_user():
     if not data or "username" not in data or "email" not in data:
         return jsonify({"error": "Username and email are required"}), 400
 
-    if User.query.filter_by(username=data["username"]).first():
+    user = User(username=data["username"], email=data["email"])
+    taken = insert_unique(user, ("username", "email"))
+    if taken == "username":
         return jsonify({"error": "Username already exists"}), 409
-
-    if User.query.filter_by(email=data["email"]).first():
+    if taken == "email":
         return jsonify({"error": "Email already exists"}), 409
 
-    user = User(username=data["username"], email=data["email"])
-    db.session.add(user)
+    # Serialize before committing, which would expire the attributes and re-read the row
+    body = user.to_dict()
     db.session.commit()
 
-    return jsonify(user.to_dict()), 201
+    return jsonify(body), 201
 
 
 @app.route("/users", methods=["GET"])
@@ -54,6 +76,18 @@ def get_user(user_id):
     return jsonify(user.to_dict()), 200
 
 
+@app.route("/users/<int:user_id>/summary", methods=["GET"])
+def get_user_summary(user_id):
+    """Task counts of a user: total, completed, open, overdue, by status and by priority
+
+    Served from a short-lived cache that the task endpoints invalidate; see summary.py.
+    """
+    counts = summary.get_summary(user_id)
+    if counts is None:
+        abort(404)
+    return jsonify(counts), 200
+
+
 # Task endpoints
 @app.route("/tasks", methods=["POST"])
 def create_task():
@@ -79,13 +113,80 @@ def create_task():
 
     db.session.add(task)
     db.session.commit()
+    summary.invalidate(task.user_id)
+
+    return _task_response(task.to_dict(), 201)
+
+
+def _task_response(body, status=200):
+    """Respond with a serialized task, with its version as the ETag"""
+    response = jsonify(body)
+    response.status_code = status
+    response.set_etag(str(body["version"]))
+    return response
+
+
+def _if_match_versions():
+    """The task versions listed in If-Match, or None if any version will do (no header, or ``*``)"""
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    return [int(etag) for etag in request.if_match.as_set() if etag.isdigit()]
+
 
-    return jsonify(task.to_dict()), 201
+def _precondition_failed(version=None):
+    response = jsonify({"error": "Task has been modified; fetch it again for its current ETag"})
+    response.status_code = 412
+    if version is not None:
+        response.set_etag(str(version))
+    return response
+
+
+def _page_args():
+    """Parse the sort, fields, limit and cursor parameters of a task listing"""
+    sort = request.args.get("sort", "created_at")
+    cursor = request.args.get("cursor")
+    pagination.parse_sort(sort)
+    fields = pagination.parse_fields(request.args.get("fields"))
+    limit = pagination.parse_limit(request.args.get("limit"))
+    after = pagination.decode_cursor(cursor, sort) if cursor is not None else None
+    return sort, fields, limit, after
+
+
+def _task_page(query, page, headers=None):
+    """Respond with one page of ``query``, with the next page's cursor in ``X-Next-Cursor`` and ``Link``"""
+    sort, fields, limit, after = page
+    headers = headers or {}
+    if fields is not None:
+        query = query.options(load_only(*pagination.column_options(fields, pagination.parse_sort(sort)[0])))
+    tasks, next_cursor = pagination.paginate(query, sort, limit, after)
+    if fields is None or "tags" in fields:
+        prefetch_tags(tasks)
+    if fields is None or "comment_count" in fields:
+        prefetch_comment_counts(tasks)
+
+    if next_cursor:
+        next_url = url_for(request.endpoint, **request.view_args, **dict(request.args.to_dict(), cursor=next_cursor))
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return jsonify([task.to_dict(fields) for task in tasks]), 200, headers
 
 
 @app.route("/tasks", methods=["GET"])
 def get_tasks():
-    """Feature 5: List all tasks with optional filters"""
+    """Feature 5: List tasks with optional filters, one keyset page at a time
+
+    The body is a JSON array. The cursor for the next page is returned in the
+    ``X-Next-Cursor`` and ``Link`` headers, and ``?count=exact|estimate`` adds
+    ``X-Total-Count``.
+    """
+    count_mode = request.args.get("count")
+    try:
+        page = _page_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if count_mode is not None and count_mode not in pagination.COUNT_MODES:
+        return jsonify({"error": f"count must be one of: {', '.join(pagination.COUNT_MODES)}"}), 400
+
     query = Task.query
 
     # Filter by status
@@ -101,28 +202,51 @@ def get_tasks():
     # Filter by completion status
     completed = request.args.get("completed")
     if completed is not None:
-        query = query.filter_by(completed=completed.lower() == "true")
+        # A literal rather than a bound parameter, so the planner can match the partial index on open tasks
+        query = query.filter(Task.completed == (true() if completed.lower() == "true" else false()))
 
     # Filter by user
     user_id = request.args.get("user_id")
     if user_id:
         query = query.filter_by(user_id=int(user_id))
 
-    tasks = query.all()
-    return jsonify([task.to_dict() for task in tasks]), 200
+    headers = {}
+    if count_mode:
+        filters = tuple(sorted((key, value) for key, value in request.args.items() if key in FILTER_PARAMS))
+        total, exact = pagination.count_tasks(query, count_mode, filters)
+        headers["X-Total-Count"] = str(total)
+        headers["X-Total-Count-Type"] = "exact" if exact else "estimate"
+    return _task_page(query, page, headers)
 
 
 @app.route("/tasks/<int:task_id>", methods=["GET"])
 def get_task(task_id):
-    """Feature 6: Get task by ID"""
+    """Feature 6: Get task by ID
+
+    The ETag is the task's version; with a matching ``If-None-Match`` the
+    response is an empty 304.
+    """
     task = Task.query.get_or_404(task_id)
-    return jsonify(task.to_dict()), 200
+    etag = str(task.version)
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return _task_response(task.to_dict())
 
 
 @app.route("/tasks/<int:task_id>", methods=["PUT"])
 def update_task(task_id):
-    """Feature 7: Update a task"""
+    """Feature 7: Update a task
+
+    With ``If-Match``, the update is only applied if the task still has one of
+    the listed ETags, including against a concurrent update; otherwise 412.
+    """
     task = Task.query.get_or_404(task_id)
+    versions = _if_match_versions()
+    if versions is not None and task.version not in versions:
+        return _precondition_failed(task.version)
+    previous_user_id = task.user_id
     data = request.get_json()
 
     if "title" in data:
@@ -143,44 +267,160 @@ def update_task(task_id):
         except ValueError:
             return jsonify({"error": "Invalid due_date format. Use ISO format"}), 400
 
-    db.session.commit()
-    return jsonify(task.to_dict()), 200
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        if versions is None:
+            raise
+        return _precondition_failed()
+    summary.invalidate(previous_user_id, task.user_id)
+    return _task_response(task.to_dict())
 
 
 @app.route("/tasks/<int:task_id>", methods=["DELETE"])
 def delete_task(task_id):
     """Feature 8: Delete a task"""
     task = Task.query.get_or_404(task_id)
+    user_id = task.user_id
     db.session.delete(task)
     db.session.commit()
+    summary.invalidate(user_id)
     return jsonify({"message": "Task deleted successfully"}), 200
 
 
 @app.route("/tasks/<int:task_id>/complete", methods=["PATCH"])
 def toggle_task_completion(task_id):
-    """Feature 9: Mark task as complete/incomplete"""
-    task = Task.query.get_or_404(task_id)
-    task.completed = not task.completed
+    """Feature 9: Mark task as complete/incomplete
+
+    One UPDATE flips ``completed`` in the database, so concurrent toggles never
+    undo each other. Honours ``If-Match`` like PUT.
+    """
+    statement = (
+        update(Task)
+        .where(Task.id == task_id)
+        .values(completed=~func.coalesce(Task.completed, false()), version=Task.version + 1)
+        .returning(Task)
+    )
+    versions = _if_match_versions()
+    if versions is not None:
+        statement = statement.where(Task.version.in_(versions))
+    task = db.session.execute(statement, execution_options={"synchronize_session": False}).scalar_one_or_none()
+    if task is None:
+        current = db.session.get(Task, task_id)
+        if current is None:
+            abort(404)
+        return _precondition_failed(current.version)
+
+    body = task.to_dict()
+    db.session.commit()
+    summary.invalidate(body["user_id"])
+    return _task_response(body)
+
+
+def _invalid_batch(errors):
+    return jsonify({"error": "Invalid items; nothing was written", "results": errors}), 400
+
+
+def _batch_results(ids, found, status):
+    """Per-item results, in item order; ids not in ``found`` are reported as not found"""
+    return [
+        {"index": i, "status": status, "id": task_id}
+        if task_id in found
+        else {"index": i, "status": 404, "id": task_id, "error": "Task not found"}
+        for i, task_id in enumerate(ids)
+    ]
+
+
+@app.route("/tasks/batch", methods=["POST"])
+def create_tasks_batch():
+    """Create many tasks in one transaction
+
+    The body is a JSON array of tasks, or NDJSON (``application/x-ndjson``).
+    Returns ``{"results": [{"index", "status", "id"}, ...]}`` in item order.
+    """
+    try:
+        items = batch.parse_items(request)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rows, errors = batch.validate_creates(items)
+    if errors:
+        return _invalid_batch(errors)
+
+    ids = batch.create_tasks(rows)
+    db.session.commit()
+    summary.invalidate(*{row["user_id"] for row in rows})
+    return jsonify({"results": _batch_results(ids, set(ids), 201)}), 201
+
+
+@app.route("/tasks/batch", methods=["PATCH"])
+def update_tasks_batch():
+    """Update many tasks in one transaction
+
+    Each item has an ``id`` and the fields to change. Items for tasks that do
+    not exist get status 404; the others are applied.
+    """
+    try:
+        items = batch.parse_items(request)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rows, errors = batch.validate_updates(items)
+    if errors:
+        return _invalid_batch(errors)
+
+    updated = batch.update_tasks(rows)
     db.session.commit()
-    return jsonify(task.to_dict()), 200
+    summary.invalidate_all()  # the previous owners of the tasks are not known
+    return jsonify({"results": _batch_results([row["id"] for row in rows], updated, 200)}), 200
+
+
+@app.route("/tasks/batch", methods=["DELETE"])
+def delete_tasks_batch():
+    """Delete many tasks, with their comments, in one transaction
+
+    Each item is a task id or ``{"id": ...}``. Ids that do not exist get status 404.
+    """
+    try:
+        items = batch.parse_items(request)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    ids, errors = batch.validate_deletes(items)
+    if errors:
+        return _invalid_batch(errors)
+
+    deleted = batch.delete_tasks(ids)
+    db.session.commit()
+    summary.invalidate_all()
+    return jsonify({"results": _batch_results(ids, deleted, 200)}), 200
 
 
 @app.route("/tasks/search", methods=["GET"])
 def search_tasks():
-    """Feature 10: Search tasks by title or description"""
+    """Feature 10: Search tasks by title or description, best matches first
+
+    Paginated with ``?limit=`` and ``?offset=``; the next page's URL is in the
+    ``Link`` header.
+    """
     query_text = request.args.get("q", "")
 
     if not query_text:
         return jsonify({"error": 'Query parameter "q" is required'}), 400
 
-    tasks = Task.query.filter(
-        db.or_(
-            Task.title.ilike(f"%{query_text}%"),
-            Task.description.ilike(f"%{query_text}%"),
-        )
-    ).all()
+    try:
+        limit = pagination.parse_limit(request.args.get("limit"))
+        offset = pagination.parse_offset(request.args.get("offset"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    tasks, has_more = search.search_tasks(query_text, limit, offset)
+    prefetch_tags(tasks)
+    prefetch_comment_counts(tasks)
 
-    return jsonify([task.to_dict() for task in tasks]), 200
+    headers = {}
+    if has_more:
+        next_url = url_for("search_tasks", **dict(request.args.to_dict(), offset=offset + limit))
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return jsonify([task.to_dict() for task in tasks]), 200, headers
 
 
 # Tag endpoints
@@ -192,15 +432,15 @@ def create_tag():
     if not data or "name" not in data:
         return jsonify({"error": "Tag name is required"}), 400
 
-    existing_tag = Tag.query.filter_by(name=data["name"]).first()
-    if existing_tag:
+    tag = Tag(name=data["name"])
+    if insert_unique(tag, ("name",)):
         return jsonify({"error": "Tag already exists"}), 409
 
-    tag = Tag(name=data["name"])
-    db.session.add(tag)
+    body = tag.to_dict()
     db.session.commit()
+    tagging.cache_tag(body["name"], body["id"])
 
-    return jsonify(tag.to_dict()), 201
+    return jsonify(body), 201
 
 
 @app.route("/tags", methods=["GET"])
@@ -221,13 +461,11 @@ def add_tag_to_task(task_id):
 
     tag = Tag.query.get_or_404(data["tag_id"])
 
-    if tag in task.tags:
+    if not tagging.attach_tags([task.id], [tag.id]):
         return jsonify({"error": "Tag already added to this task"}), 409
 
-    task.tags.append(tag)
     db.session.commit()
-
-    return jsonify(task.to_dict()), 200
+    return _task_response(task.to_dict())
 
 
 @app.route("/tasks/<int:task_id>/tags/<int:tag_id>", methods=["DELETE"])
@@ -236,13 +474,60 @@ def remove_tag_from_task(task_id, tag_id):
     task = Task.query.get_or_404(task_id)
     tag = Tag.query.get_or_404(tag_id)
 
-    if tag not in task.tags:
+    if not tagging.detach_tags([task.id], [tag.id]):
         return jsonify({"error": "Tag not found on this task"}), 404
 
-    task.tags.remove(tag)
     db.session.commit()
+    return _task_response(task.to_dict())
+
+
+def _resolve_tag_links():
+    """Parse a bulk tag link body; returns (task ids, tag ids, error response or None)"""
+    try:
+        task_ids, tag_ids, not_found = tagging.resolve_links(request.get_json(silent=True))
+    except ValueError as e:
+        return None, None, (jsonify({"error": str(e)}), 400)
+    if not_found:
+        return None, None, (jsonify({"error": "Tasks or tags not found", **not_found}), 404)
+    return task_ids, tag_ids, None
+
+
+@app.route("/tasks/batch/tags", methods=["POST"])
+def attach_tags_batch():
+    """Add tags to many tasks at once
+
+    The body is ``{"task_ids": [...], "tags": [names], "tag_ids": [...]}``.
+    Links that already exist are skipped; ``attached`` counts the new ones.
+    """
+    task_ids, tag_ids, error = _resolve_tag_links()
+    if error:
+        return error
+    attached = tagging.attach_tags(task_ids, tag_ids)
+    db.session.commit()
+    return jsonify({"attached": attached}), 200
+
+
+@app.route("/tasks/batch/tags", methods=["DELETE"])
+def detach_tags_batch():
+    """Remove tags from many tasks at once; same body as attaching"""
+    task_ids, tag_ids, error = _resolve_tag_links()
+    if error:
+        return error
+    detached = tagging.detach_tags(task_ids, tag_ids)
+    db.session.commit()
+    return jsonify({"detached": detached}), 200
 
-    return jsonify(task.to_dict()), 200
+
+@app.route("/tags/<int:tag_id>/tasks", methods=["GET"])
+def get_tag_tasks(tag_id):
+    """List the tasks with a tag, paginated like GET /tasks"""
+    Tag.query.get_or_404(tag_id)
+    try:
+        page = _page_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    query = Task.query.join(task_tags, task_tags.c.task_id == Task.id).filter(task_tags.c.tag_id == tag_id)
+    return _task_page(query, page)
 
 
 # Comment endpoints
@@ -257,6 +542,7 @@ def add_comment(task_id):
 
     comment = Comment(content=data["content"], task_id=task_id)
     db.session.add(comment)
+    bump_versions([task_id])  # comment_count is part of the task's JSON
     db.session.commit()
 
     return jsonify(comment.to_dict()), 201
@@ -264,9 +550,26 @@ def add_comment(task_id):
 
 @app.route("/tasks/<int:task_id>/comments", methods=["GET"])
 def get_task_comments(task_id):
-    """Get all comments for a task"""
-    task = Task.query.get_or_404(task_id)
-    return jsonify([comment.to_dict() for comment in task.comments]), 200
+    """List a task's comments, oldest first, one keyset page at a time
+
+    Takes ``?limit=`` and ``?cursor=``; the next page's cursor is in the
+    ``X-Next-Cursor`` and ``Link`` headers, as for GET /tasks.
+    """
+    Task.query.get_or_404(task_id)
+    cursor = request.args.get("cursor")
+    try:
+        limit = pagination.parse_limit(request.args.get("limit"))
+        after = pagination.decode_cursor(cursor, "created_at") if cursor is not None else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    comments, next_cursor = pagination.paginate_comments(task_id, limit, after)
+    headers = {}
+    if next_cursor:
+        next_url = url_for("get_task_comments", task_id=task_id, **dict(request.args.to_dict(), cursor=next_cursor))
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return jsonify([comment.to_dict() for comment in comments]), 200, headers
 
 
 @app.errorhandler(404)
@@ -274,6 +577,12 @@ def not_found(error):
     return jsonify({"error": "Resource not found"}), 404
 
 
+@app.errorhandler(StaleDataError)
+def concurrent_change(error):
+    db.session.rollback()
+    return jsonify({"error": "Task was changed by another request; retry"}), 409
+
+
 @app.errorhandler(500)
 def internal_error(error):
     db.session.rollback()
@@ -0,0 +1,193 @@
+"""Bulk create, update and delete of tasks for /tasks/batch.
+
+A batch is a JSON array, or NDJSON (one JSON value per line). Every item is
+validated before anything is written: one invalid item rejects the whole
+batch. The writes are set-based, one statement per TASKS_BATCH_CHUNK_SIZE
+items, and run in the caller's transaction.
+"""
+
+import json
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, delete, insert, update
+
+from models import TASK_PRIORITIES, TASK_STATUSES, Comment, Task, User, db, task_tags
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonlines")
+# Task columns a batch item may set, and their defaults on create
+TASK_DEFAULTS = {
+    "title": None,
+    "description": None,
+    "status": "pending",
+    "priority": "medium",
+    "due_date": None,
+    "completed": False,
+    "user_id": None,
+}
+# The session holds none of the rows a bulk statement touches, so skip syncing it
+BULK_OPTIONS = {"synchronize_session": False}
+
+
+def parse_items(request):
+    """The list of items in a JSON array or NDJSON body"""
+    if request.mimetype in NDJSON_TYPES:
+        items = []
+        for number, line in enumerate(request.get_data(as_text=True).splitlines(), start=1):
+            if line.strip():
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    raise ValueError(f"Invalid JSON on line {number}") from None
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            raise ValueError("Body must be a JSON array, or NDJSON with Content-Type application/x-ndjson")
+    if not items:
+        raise ValueError("Batch is empty")
+    maximum = current_app.config["TASKS_BATCH_MAX_ITEMS"]
+    if len(items) > maximum:
+        raise ValueError(f"Batch has {len(items)} items; the maximum is {maximum}")
+    return items
+
+
+def chunks(items, size=None):
+    size = size or current_app.config["TASKS_BATCH_CHUNK_SIZE"]
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _validate_fields(item):
+    """Task column values from one item; raises ValueError on the first invalid field"""
+    values = {name: item[name] for name in TASK_DEFAULTS if name in item}
+    if "title" in values and (not isinstance(values["title"], str) or not values["title"]):
+        raise ValueError("Title must be a non-empty string")
+    if "completed" in values and not isinstance(values["completed"], bool):
+        raise ValueError("completed must be true or false")
+    if values.get("status") not in (None, *TASK_STATUSES):
+        raise ValueError(f"status must be one of {', '.join(TASK_STATUSES)}")
+    if values.get("priority") not in (None, *TASK_PRIORITIES):
+        raise ValueError(f"priority must be one of {', '.join(TASK_PRIORITIES)}")
+    if "user_id" in values and values["user_id"] is not None and not is_id(values["user_id"]):
+        raise ValueError("user_id must be an integer")
+    if values.get("due_date") is not None:
+        try:
+            values["due_date"] = datetime.fromisoformat(values["due_date"])
+        except (TypeError, ValueError):
+            raise ValueError("Invalid due_date format. Use ISO format") from None
+    return values
+
+
+def _error(index, message):
+    return {"index": index, "status": 400, "error": message}
+
+
+def _check_users(rows, errors):
+    """Report items assigned to users that do not exist, with one query for the whole batch"""
+    user_ids = {row["user_id"] for _, row in rows if row.get("user_id") is not None}
+    if not user_ids:
+        return
+    existing = set()
+    for chunk in chunks(sorted(user_ids)):
+        existing.update(db.session.execute(db.select(User.id).where(User.id.in_(chunk))).scalars())
+    errors.extend(
+        _error(index, f"User {row['user_id']} not found")
+        for index, row in rows
+        if row.get("user_id") is not None and row["user_id"] not in existing
+    )
+
+
+def validate_creates(items):
+    """Return (rows to insert, errors); a row holds every column in TASK_DEFAULTS"""
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or "title" not in item:
+            errors.append(_error(index, "Title is required"))
+            continue
+        try:
+            rows.append((index, dict(TASK_DEFAULTS, **_validate_fields(item))))
+        except ValueError as e:
+            errors.append(_error(index, str(e)))
+    _check_users(rows, errors)
+    return [row for _, row in rows], sorted(errors, key=lambda error: error["index"])
+
+
+def validate_updates(items):
+    """Return (rows to update, errors); a row holds the id and the columns the item sets"""
+    rows, errors, seen = [], [], set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not is_id(item.get("id")):
+            errors.append(_error(index, "id is required and must be an integer"))
+            continue
+        if item["id"] in seen:
+            errors.append(_error(index, f"Task {item['id']} appears more than once"))
+            continue
+        seen.add(item["id"])
+        try:
+            rows.append((index, dict(_validate_fields(item), id=item["id"])))
+        except ValueError as e:
+            errors.append(_error(index, str(e)))
+    _check_users(rows, errors)
+    return [row for _, row in rows], sorted(errors, key=lambda error: error["index"])
+
+
+def validate_deletes(items):
+    """Return (task ids, errors); an item is an id or an object with an id"""
+    ids, errors = [], []
+    for index, item in enumerate(items):
+        task_id = item.get("id") if isinstance(item, dict) else item
+        if not is_id(task_id):
+            errors.append(_error(index, "id is required and must be an integer"))
+        else:
+            ids.append(task_id)
+    return ids, errors
+
+
+def create_tasks(rows):
+    """Insert ``rows``; returns the new ids in row order"""
+    ids = []
+    for chunk in chunks(rows):
+        if db.engine.dialect.name == "postgresql":
+            # The serial id is the sentinel SQLAlchemy matches RETURNING rows to parameters by
+            statement = insert(Task).returning(Task.id, sort_by_parameter_order=True)
+            ids.extend(db.session.execute(statement, chunk).scalars())
+        else:
+            # SQLite would return rows in order only one INSERT per row. Within one INSERT it gives each
+            # row max(rowid) + 1 in VALUES order under the database write lock, so sorted ids line up
+            ids.extend(sorted(db.session.execute(insert(Task).returning(Task.id), chunk).scalars()))
+    return ids
+
+
+def update_tasks(rows):
+    """Apply ``rows``, one UPDATE per chunk; returns the ids of the tasks that exist"""
+    updated = set()
+    for chunk in chunks(rows):
+        ids = [row["id"] for row in chunk]
+        values = {}
+        for name in TASK_DEFAULTS:
+            changes = {row["id"]: row[name] for row in chunk if name in row}
+            if changes:
+                column = getattr(Task, name)
+                values[name] = case(changes, value=Task.id, else_=column)
+        if values:
+            values["version"] = Task.version + 1
+            statement = update(Task).where(Task.id.in_(ids)).values(values).returning(Task.id)
+            updated.update(db.session.execute(statement, execution_options=BULK_OPTIONS).scalars())
+        else:
+            updated.update(db.session.execute(db.select(Task.id).where(Task.id.in_(ids))).scalars())
+    return updated
+
+
+def delete_tasks(ids):
+    """Delete the tasks, their comments and tag links; returns the ids of the tasks that existed"""
+    deleted = set()
+    for chunk in chunks(ids):
+        db.session.execute(delete(task_tags).where(task_tags.c.task_id.in_(chunk)))
+        db.session.execute(delete(Comment).where(Comment.task_id.in_(chunk)), execution_options=BULK_OPTIONS)
+        statement = delete(Task).where(Task.id.in_(chunk)).returning(Task.id)
+        deleted.update(db.session.execute(statement, execution_options=BULK_OPTIONS).scalars())
+    return deleted
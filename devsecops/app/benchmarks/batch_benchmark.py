@@ -0,0 +1,129 @@
+"""Benchmark task throughput of the single-task endpoints against /tasks/batch.
+
+Usage (from devsecops/app):
+    python benchmarks/batch_benchmark.py --tasks 5000
+    DATABASE_URL=postgresql://... python benchmarks/batch_benchmark.py --tasks 5000
+
+Without DATABASE_URL a fresh SQLite file is used. The tables are recreated,
+then --tasks tasks are created, updated and deleted through the Flask test
+client: once with one request per task (POST /tasks, PUT /tasks/<id>,
+DELETE /tasks/<id>), once with /tasks/batch requests of --batch-size items.
+Prints one JSON document with tasks per second per operation and mode.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def task_payload(i):
+    return {
+        "title": f"Automation task {i}",
+        "description": "Created by the batch benchmark",
+        "priority": ("low", "medium", "high")[i % 3],
+        "due_date": "2025-01-01T00:00:00",
+    }
+
+
+def timed(run, count):
+    started = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - started
+    return {"seconds": round(seconds, 3), "tasks_per_second": round(count / seconds, 1)}
+
+
+def check(response, status):
+    assert response.status_code == status, response.data
+    return response
+
+
+def run_single(client, count):
+    ids = []
+
+    def create():
+        for i in range(count):
+            response = check(client.post("/tasks", json=task_payload(i)), 201)
+            ids.append(response.get_json()["id"])
+
+    def update():
+        for task_id in ids:
+            check(client.put(f"/tasks/{task_id}", json={"status": "in_progress", "completed": True}), 200)
+
+    def delete():
+        for task_id in ids:
+            check(client.delete(f"/tasks/{task_id}"), 200)
+
+    return {"create": timed(create, count), "update": timed(update, count), "delete": timed(delete, count)}
+
+
+def run_batch(client, count, batch_size):
+    ids = []
+
+    def create():
+        for start in range(0, count, batch_size):
+            items = [task_payload(i) for i in range(start, min(start + batch_size, count))]
+            response = check(client.post("/tasks/batch", json=items), 201)
+            ids.extend(result["id"] for result in response.get_json()["results"])
+
+    def update():
+        for start in range(0, count, batch_size):
+            items = [
+                {"id": task_id, "status": "in_progress", "completed": True}
+                for task_id in ids[start : start + batch_size]
+            ]
+            check(client.patch("/tasks/batch", json=items), 200)
+
+    def delete():
+        for start in range(0, count, batch_size):
+            check(client.delete("/tasks/batch", json=ids[start : start + batch_size]), 200)
+
+    return {"create": timed(create, count), "update": timed(update, count), "delete": timed(delete, count)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1000, help="items per /tasks/batch request")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'batch.db')}"
+
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        client = app.test_client()
+        single = run_single(client, args.tasks)
+        print(f"single: {single}", file=sys.stderr)
+        batched = run_batch(client, args.tasks, args.batch_size)
+        print(f"batch: {batched}", file=sys.stderr)
+        database = db.engine.dialect.name
+
+    speedup = {
+        operation: round(batched[operation]["tasks_per_second"] / single[operation]["tasks_per_second"], 1)
+        for operation in single
+    }
+    print(
+        json.dumps(
+            {
+                "benchmark": "batch",
+                "database": database,
+                "tasks": args.tasks,
+                "batch_size": args.batch_size,
+                "results": {"single": single, "batch": batched, "speedup": speedup},
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
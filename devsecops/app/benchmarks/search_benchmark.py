@@ -0,0 +1,129 @@
+"""Benchmark /tasks/search latency on a large tasks table.
+
+Usage (from devsecops/app):
+    python benchmarks/search_benchmark.py --tasks 1000000
+    DATABASE_URL=postgresql://... python benchmarks/search_benchmark.py --tasks 1000000
+
+Without DATABASE_URL a fresh SQLite file is used. The tasks table is
+recreated and filled with synthetic tasks (--reuse keeps the existing
+rows). Each query is then timed through the Flask test client, with the
+indexed backend and with the old ILIKE scan (SEARCH_BACKEND=like). Prints
+one JSON document with p50/p95 latency per backend and query.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "deploy release pipeline docker kubernetes terraform ansible monitoring alert dashboard backup restore "
+    "database migration schema index cache queue worker scheduler api gateway auth token secret vault "
+    "certificate network firewall subnet cluster node pod service ingress logging metrics tracing review "
+    "refactor upgrade patch hotfix incident postmortem runbook oncall capacity budget report"
+).split()
+QUERIES = {
+    "common_word": "deploy",
+    "prefix": "kube",
+    "two_words": "backup restore",
+    "rare_word": "zanzibar",
+}
+
+
+def populate(db, Task, count, rng, batch_size=10000):
+    from sqlalchemy import insert
+
+    for start in range(0, count, batch_size):
+        rows = []
+        for i in range(start, min(start + batch_size, count)):
+            title = " ".join(rng.choices(WORDS, k=4))
+            description = " ".join(rng.choices(WORDS, k=20))
+            if i % 100000 == 0:
+                description += " zanzibar"
+            rows.append({"title": title.capitalize(), "description": description})
+        db.session.execute(insert(Task), rows)
+        db.session.commit()
+        print(f"inserted {min(start + batch_size, count)}/{count}", file=sys.stderr)
+
+
+def time_queries(app, client, backend, requests, limit):
+    app.config["SEARCH_BACKEND"] = backend
+    app.extensions.pop("task_search_backend", None)
+    results = {}
+    for name, text in QUERIES.items():
+        client.get("/tasks/search", query_string={"q": text, "limit": limit})  # warm up
+        latencies = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = client.get("/tasks/search", query_string={"q": text, "limit": limit})
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.data
+        latencies.sort()
+        results[name] = {
+            "query": text,
+            "results": len(response.get_json()),
+            "p50_ms": round(statistics.median(latencies), 2),
+            "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+        }
+        print(f"{backend} {name}: p50 {results[name]['p50_ms']}ms", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000000)
+    parser.add_argument("--requests", type=int, default=20, help="timed requests per query and backend")
+    parser.add_argument("--limit", type=int, default=20, help="page size requested")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reuse", action="store_true", help="keep the tasks already in the database")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'search.db')}"
+    from sqlalchemy import text
+
+    from app import app
+    from models import Task, db
+
+    with app.app_context():
+        started = time.perf_counter()
+        if args.reuse:
+            args.tasks = db.session.query(Task).count()
+        else:
+            db.drop_all()
+            db.create_all()
+            populate(db, Task, args.tasks, random.Random(args.seed))
+        load_seconds = time.perf_counter() - started
+        if db.engine.dialect.name == "postgresql":
+            db.session.execute(text("ANALYZE tasks"))
+            db.session.commit()
+        client = app.test_client()
+        backend = app.config.get("SEARCH_BACKEND", "auto")
+        if backend == "auto":
+            backend = "postgresql" if db.engine.dialect.name == "postgresql" else "sqlite"
+        results = {name: time_queries(app, client, name, args.requests, args.limit) for name in (backend, "like")}
+        database = db.engine.dialect.name
+
+    print(
+        json.dumps(
+            {
+                "benchmark": "search",
+                "database": database,
+                "tasks": args.tasks,
+                "load_seconds": round(load_seconds, 1),
+                "limit": args.limit,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,3 +9,18 @@ class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
     SQLALCHEMY_DATABASE_URI = os.getenv( "DATABASE_URL", "postgresql://postgres:postgres@db:5432/taskdb")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # GET /tasks page sizes
+    TASKS_PAGE_SIZE = int(os.getenv("TASKS_PAGE_SIZE", "100"))
+    TASKS_MAX_PAGE_SIZE = int(os.getenv("TASKS_MAX_PAGE_SIZE", "1000"))
+    # GET /tasks?count=estimate: how long counts are cached, and the planner estimate
+    # (PostgreSQL) above which the estimate is returned instead of running COUNT(*)
+    TASK_COUNT_CACHE_SECONDS = float(os.getenv("TASK_COUNT_CACHE_SECONDS", "60"))
+    TASK_COUNT_EXACT_THRESHOLD = int(os.getenv("TASK_COUNT_EXACT_THRESHOLD", "100000"))
+    # Task search: auto, postgresql (tsvector GIN index), sqlite (FTS5 table) or like (unindexed scan)
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+    SEARCH_RANK_LIMIT = int(os.getenv("SEARCH_RANK_LIMIT", "10000"))  # PostgreSQL: matches ranked per search
+    # /tasks/batch: items accepted per request, and items per INSERT/UPDATE/DELETE statement
+    TASKS_BATCH_MAX_ITEMS = int(os.getenv("TASKS_BATCH_MAX_ITEMS", "10000"))
+    TASKS_BATCH_CHUNK_SIZE = int(os.getenv("TASKS_BATCH_CHUNK_SIZE", "500"))
+    # GET /users/<id>/summary: how long a user's task counts are cached
+    USER_SUMMARY_CACHE_SECONDS = float(os.getenv("USER_SUMMARY_CACHE_SECONDS", "60"))
@@ -1,5 +1,7 @@
 import pytest
 
+import summary
+import tagging
 from app import app as flask_app
 from models import db as _db
 
@@ -20,10 +22,15 @@ def app():
 def db(app):
     """Create database for the tests."""
     with app.app_context():
-        _db.session.begin_nested()
         yield _db
+        # Views commit, so a rollback cannot undo their writes; empty the tables instead
         _db.session.rollback()
+        for table in reversed(_db.metadata.sorted_tables):
+            _db.session.execute(table.delete())
+        _db.session.commit()
         _db.session.remove()
+        tagging.clear_cache()
+        summary.invalidate_all()
 
 
 @pytest.fixture
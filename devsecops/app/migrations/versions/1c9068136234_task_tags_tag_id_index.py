@@ -0,0 +1,31 @@
+"""Index task_tags by tag, for the tasks of a tag
+
+Revision ID: 1c9068136234
+Revises: 82573dfcc619
+Create Date: 2026-10-19 13:41:08.204716
+
+Built CONCURRENTLY on PostgreSQL; see 82573dfcc619.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '1c9068136234'
+down_revision = '82573dfcc619'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'ix_task_tags_tag_id_task_id', 'task_tags', ['tag_id', 'task_id'],
+                postgresql_concurrently=True
+            )
+        return
+    op.create_index('ix_task_tags_tag_id_task_id', 'task_tags', ['tag_id', 'task_id'])
+
+
+def downgrade():
+    op.drop_index('ix_task_tags_tag_id_task_id', table_name='task_tags')
@@ -0,0 +1,43 @@
+"""Index tasks by (status, created_at) instead of (status, priority, created_at)
+
+Revision ID: 3c207ab032b8
+Revises: 1c9068136234
+Create Date: 2026-10-19 15:22:54.610293
+
+A status filter alone could not read (status, priority, created_at, id) in
+created_at order, so every matching task was sorted for each page.
+(status, created_at, id) serves status alone in order, and status with
+priority by filtering the rows it reads. Built CONCURRENTLY on PostgreSQL;
+see 82573dfcc619.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3c207ab032b8'
+down_revision = '1c9068136234'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'ix_tasks_status_created_at', 'tasks', ['status', 'created_at', 'id'],
+                postgresql_concurrently=True
+            )
+            op.drop_index(
+                'ix_tasks_status_priority_created_at', table_name='tasks',
+                postgresql_concurrently=True
+            )
+        return
+    op.create_index('ix_tasks_status_created_at', 'tasks', ['status', 'created_at', 'id'])
+    op.drop_index('ix_tasks_status_priority_created_at', table_name='tasks')
+
+
+def downgrade():
+    op.create_index(
+        'ix_tasks_status_priority_created_at', 'tasks', ['status', 'priority', 'created_at', 'id']
+    )
+    op.drop_index('ix_tasks_status_created_at', table_name='tasks')
@@ -0,0 +1,118 @@
+"""Initial schema: users, tasks, tags, comments and the task search index
+
+Revision ID: 4324ad36cacb
+Revises:
+Create Date: 2026-10-19 09:12:41.318054
+
+Databases created before migrations existed (with db.create_all()) already
+have this schema: run `flask db stamp 4324ad36cacb` on them once, then
+`flask db upgrade`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4324ad36cacb'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Frozen copies of the DDL in search.py
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A')"
+    " || setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+POSTGRESQL_SEARCH_DDL = (
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector"
+    f" GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING gin (search_vector)",
+)
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts"
+    " USING fts5(title, description, content='tasks', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN"
+    " INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN"
+    " INSERT INTO tasks_fts(tasks_fts, rowid, title, description)"
+    " VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN"
+    " INSERT INTO tasks_fts(tasks_fts, rowid, title, description)"
+    " VALUES ('delete', old.id, old.title, old.description);"
+    " INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+
+def search_ddl():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        return POSTGRESQL_SEARCH_DDL
+    if bind.dialect.name == 'sqlite':
+        options = bind.exec_driver_sql("PRAGMA compile_options").scalars().all()
+        if "ENABLE_FTS5" in options:
+            return SQLITE_SEARCH_DDL
+    return ()
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_table(
+        'tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_table(
+        'tasks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('priority', sa.String(length=20), nullable=True),
+        sa.Column('due_date', sa.DateTime(), nullable=True),
+        sa.Column('completed', sa.Boolean(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'comments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'task_tags',
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id']),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id']),
+        sa.PrimaryKeyConstraint('task_id', 'tag_id')
+    )
+    for statement in search_ddl():
+        op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS tasks_fts")
+    op.drop_table('task_tags')
+    op.drop_table('comments')
+    op.drop_table('tasks')
+    op.drop_table('tags')
+    op.drop_table('users')
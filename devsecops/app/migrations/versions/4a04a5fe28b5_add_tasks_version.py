@@ -0,0 +1,27 @@
+"""Add tasks.version, for ETags and optimistic concurrency
+
+Revision ID: 4a04a5fe28b5
+Revises: e37ee491f4f6
+Create Date: 2026-10-19 15:11:05.800778
+
+Existing tasks start at version 1. On PostgreSQL 11+ adding a NOT NULL
+column with a constant default does not rewrite the table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a04a5fe28b5'
+down_revision = 'e37ee491f4f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('tasks', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('version')
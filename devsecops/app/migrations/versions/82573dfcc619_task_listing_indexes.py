@@ -0,0 +1,51 @@
+"""Indexes for the GET /tasks filter patterns and for comments by task
+
+Revision ID: 82573dfcc619
+Revises: 4324ad36cacb
+Create Date: 2026-10-19 10:03:27.551872
+
+On PostgreSQL the indexes are built CONCURRENTLY, outside a transaction, so
+writes to a large tasks table are not blocked while they build. If a build
+fails it leaves an INVALID index behind: drop it and run the upgrade again.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '82573dfcc619'
+down_revision = '4324ad36cacb'
+branch_labels = None
+depends_on = None
+
+OPEN_TASKS = sa.column('completed', sa.Boolean()) == sa.false()
+
+# (name, table, columns, partial index predicate)
+INDEXES = (
+    ('ix_tasks_created_at', 'tasks', ['created_at', 'id'], None),
+    ('ix_tasks_due_date', 'tasks', ['due_date', 'id'], None),
+    ('ix_tasks_user_id_created_at', 'tasks', ['user_id', 'created_at', 'id'], None),
+    ('ix_tasks_user_id_due_date', 'tasks', ['user_id', 'due_date', 'id'], None),
+    ('ix_tasks_status_priority_created_at', 'tasks', ['status', 'priority', 'created_at', 'id'], None),
+    ('ix_tasks_priority_created_at', 'tasks', ['priority', 'created_at', 'id'], None),
+    ('ix_tasks_open_created_at', 'tasks', ['created_at', 'id'], OPEN_TASKS),
+    ('ix_comments_task_id_created_at', 'comments', ['task_id', 'created_at'], None),
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns, where in INDEXES:
+                op.create_index(
+                    name, table, columns, postgresql_where=where,
+                    postgresql_concurrently=True
+                )
+        return
+    for name, table, columns, where in INDEXES:
+        op.create_index(name, table, columns, sqlite_where=where)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,48 @@
+"""Require comments.created_at and add id to ix_comments_task_id_created_at
+
+Revision ID: e37ee491f4f6
+Revises: 3c207ab032b8
+Create Date: 2026-10-19 15:08:11.025068
+
+Comments are paged by (created_at, id). With both columns in the index
+after task_id, and created_at never NULL, the position of a page is a
+range condition on the index, so the 50th page of a busy task reads as
+few rows as the first. The index is rebuilt CONCURRENTLY on PostgreSQL
+under a temporary name, then renamed; see 82573dfcc619.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e37ee491f4f6'
+down_revision = '3c207ab032b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('UPDATE comments SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column('comments', 'created_at', existing_type=sa.DateTime(), nullable=False)
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'ix_comments_task_id_created_at_id', 'comments', ['task_id', 'created_at', 'id'],
+                postgresql_concurrently=True
+            )
+            op.drop_index(
+                'ix_comments_task_id_created_at', table_name='comments', postgresql_concurrently=True
+            )
+            op.execute('ALTER INDEX ix_comments_task_id_created_at_id RENAME TO ix_comments_task_id_created_at')
+        return
+    with op.batch_alter_table('comments') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+    op.drop_index('ix_comments_task_id_created_at', table_name='comments')
+    op.create_index('ix_comments_task_id_created_at', 'comments', ['task_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_comments_task_id_created_at', table_name='comments')
+    op.create_index('ix_comments_task_id_created_at', 'comments', ['task_id', 'created_at'])
+    with op.batch_alter_table('comments') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
@@ -1,9 +1,16 @@
+import re
 from datetime import datetime
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import false, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
 
 db = SQLAlchemy()
 
+TASK_STATUSES = ("pending", "in_progress", "completed")
+TASK_PRIORITIES = ("low", "medium", "high")
+
 
 class User(db.Model):
     __tablename__ = "users"
@@ -43,28 +50,66 @@ class Task(db.Model):
     updated_at = db.Column(
         db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
+    # Bumped by every change to the task's JSON, which is served with it as the ETag
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    # One index per filter pattern of GET /tasks: the equality filters first, then
+    # the sort column and id, so each page is a range read of one index. A filter
+    # without its own index (e.g. completed=true) is applied to the rows one of
+    # these finds. Keep in step with migrations/versions/.
+    __table_args__ = (
+        db.Index("ix_tasks_created_at", "created_at", "id"),
+        db.Index("ix_tasks_due_date", "due_date", "id"),
+        db.Index("ix_tasks_user_id_created_at", "user_id", "created_at", "id"),
+        db.Index("ix_tasks_user_id_due_date", "user_id", "due_date", "id"),
+        db.Index("ix_tasks_status_created_at", "status", "created_at", "id"),
+        db.Index("ix_tasks_priority_created_at", "priority", "created_at", "id"),
+        # Open tasks only: completed=false matches a small share of a long-lived table
+        db.Index(
+            "ix_tasks_open_created_at",
+            "created_at",
+            "id",
+            postgresql_where=completed == false(),
+            sqlite_where=completed == false(),
+        ),
+    )
+
+    # ORM updates and deletes of a task match its version too, and raise StaleDataError
+    # if another transaction changed the task since it was loaded
+    __mapper_args__ = {"version_id_col": version}
 
     tags = db.relationship("Tag", secondary="task_tags", backref="tasks", lazy=True)
     comments = db.relationship(
         "Comment", backref="task", lazy=True, cascade="all, delete-orphan"
     )
 
-    def to_dict(self):
+    def to_dict(self, fields=None):
+        """Serialize the task; ``fields`` limits the keys, and the attributes read, to that subset"""
         return {
-            "id": self.id,
-            "title": self.title,
-            "description": self.description,
-            "status": self.status,
-            "priority": self.priority,
-            "due_date": self.due_date.isoformat() if self.due_date else None,
-            "completed": self.completed,
-            "user_id": self.user_id,
-            "tags": [tag.name for tag in self.tags],
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
+            name: serialize(self)
+            for name, serialize in TASK_FIELDS.items()
+            if fields is None or name in fields
         }
 
 
+# Task.to_dict() keys, in output order
+TASK_FIELDS = {
+    "id": lambda task: task.id,
+    "title": lambda task: task.title,
+    "description": lambda task: task.description,
+    "status": lambda task: task.status,
+    "priority": lambda task: task.priority,
+    "due_date": lambda task: task.due_date.isoformat() if task.due_date else None,
+    "completed": lambda task: task.completed,
+    "user_id": lambda task: task.user_id,
+    "tags": lambda task: [tag.name for tag in task.tags],
+    "comment_count": lambda task: task.comment_count,
+    "created_at": lambda task: task.created_at.isoformat(),
+    "updated_at": lambda task: task.updated_at.isoformat(),
+    "version": lambda task: task.version,
+}
+
+
 class Tag(db.Model):
     __tablename__ = "tags"
 
@@ -79,6 +124,8 @@ task_tags = db.Table(
     "task_tags",
     db.Column("task_id", db.Integer, db.ForeignKey("tasks.id"), primary_key=True),
     db.Column("tag_id", db.Integer, db.ForeignKey("tags.id"), primary_key=True),
+    # The primary key serves lookups by task; this one serves the tasks of a tag
+    db.Index("ix_task_tags_tag_id_task_id", "tag_id", "task_id"),
 )
 
 
@@ -88,7 +135,10 @@ class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
     task_id = db.Column(db.Integer, db.ForeignKey("tasks.id"), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # A task's comments in page order, so a page is one range read however many it has
+    __table_args__ = (db.Index("ix_comments_task_id_created_at", "task_id", "created_at", "id"),)
 
     def to_dict(self):
         return {
@@ -97,3 +147,81 @@ class Comment(db.Model):
             "task_id": self.task_id,
             "created_at": self.created_at.isoformat(),
         }
+
+
+# Not loaded with the task: listings fill it for a whole page with prefetch_comment_counts()
+Task.comment_count = db.column_property(
+    select(func.count()).where(Comment.task_id == Task.id).correlate_except(Comment).scalar_subquery(),
+    deferred=True,
+)
+
+
+def prefetch_tags(tasks):
+    """Load the tags of all ``tasks`` in one query, so ``to_dict()`` issues none"""
+    tags_by_task = {task.id: [] for task in tasks}
+    if tags_by_task:
+        rows = db.session.execute(
+            db.select(task_tags.c.task_id, Tag)
+            .join(Tag, Tag.id == task_tags.c.tag_id)
+            .where(task_tags.c.task_id.in_(tags_by_task))
+        )
+        for task_id, tag in rows:
+            tags_by_task[task_id].append(tag)
+    for task in tasks:
+        set_committed_value(task, "tags", tags_by_task[task.id])
+    return tasks
+
+
+def prefetch_comment_counts(tasks):
+    """Count the comments of all ``tasks`` in one aggregated query, so ``to_dict()`` issues none"""
+    counts = dict.fromkeys((task.id for task in tasks), 0)
+    if counts:
+        rows = db.session.execute(
+            db.select(Comment.task_id, func.count()).where(Comment.task_id.in_(counts)).group_by(Comment.task_id)
+        )
+        counts.update(rows.all())
+    for task in tasks:
+        set_committed_value(task, "comment_count", counts[task.id])
+    return tasks
+
+
+def bump_versions(task_ids):
+    """Give ``task_ids`` new versions after a change to their tags or comments, outside the tasks table"""
+    db.session.execute(
+        db.update(Task).where(Task.id.in_(task_ids)).values(version=Task.version + 1),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def unique_violation(error, columns):
+    """The first of ``columns`` whose unique constraint raised ``error``, or None for any other error"""
+    orig = error.orig
+    if getattr(orig, "pgcode", None) == "23505":  # PostgreSQL unique_violation
+        # Constraints are named <table>_<column>_key
+        name = f"_{orig.diag.constraint_name}_"
+        violated = [column for column in columns if f"_{column}_" in name]
+    elif str(orig).startswith("UNIQUE constraint failed:"):  # SQLite: "... failed: users.email"
+        violated = re.findall(r"\.(\w+)", str(orig))
+    else:
+        return None
+    return next((column for column in columns if column in violated), None)
+
+
+def insert_unique(instance, columns, session=None):
+    """Insert ``instance`` with one INSERT, letting the unique constraints on ``columns`` catch duplicates
+
+    Unlike checking with SELECTs first, this is also correct when concurrent
+    requests insert the same value. Returns None once the row is flushed,
+    or the column that was already taken, after rolling back.
+    """
+    session = session or db.session
+    session.add(instance)
+    try:
+        session.flush()
+    except IntegrityError as e:
+        session.rollback()
+        column = unique_violation(e, columns)
+        if column is None:
+            raise
+        return column
+    return None
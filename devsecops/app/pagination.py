@@ -0,0 +1,174 @@
+"""Keyset pagination, sparse fields and row counts for task and comment listings."""
+
+import base64
+import binascii
+import json
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import and_, or_, tuple_
+
+from models import TASK_FIELDS, Comment, Task, db
+
+SORT_COLUMNS = {"created_at": Task.created_at, "due_date": Task.due_date}
+PREFETCHED_FIELDS = ("tags", "comment_count")  # loaded for the whole page after the tasks, not as columns
+COUNT_MODES = ("exact", "estimate")
+
+_count_cache = {}  # (database url, filters) -> (count, exact, expires at)
+_count_cache_lock = threading.Lock()
+
+
+def parse_sort(value):
+    """Parse ``created_at``/``-due_date`` style sort parameters into (name, descending)"""
+    descending = value.startswith("-")
+    name = value.lstrip("-")
+    if name not in SORT_COLUMNS:
+        raise ValueError(f"sort must be one of: {', '.join(SORT_COLUMNS)} (prefix with - for descending)")
+    return name, descending
+
+
+def parse_fields(value):
+    """Parse ``fields=a,b`` into a list of task fields, or None for all of them"""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def parse_limit(value):
+    default = current_app.config["TASKS_PAGE_SIZE"]
+    maximum = current_app.config["TASKS_MAX_PAGE_SIZE"]
+    try:
+        limit = int(value) if value is not None else default
+    except ValueError:
+        raise ValueError("limit must be an integer") from None
+    if not 1 <= limit <= maximum:
+        raise ValueError(f"limit must be between 1 and {maximum}")
+    return limit
+
+
+def parse_offset(value):
+    try:
+        offset = int(value) if value is not None else 0
+    except ValueError:
+        raise ValueError("offset must be an integer") from None
+    if offset < 0:
+        raise ValueError("offset must not be negative")
+    return offset
+
+
+def column_options(fields, sort_name):
+    """Columns to load for ``fields``; the sort key is always loaded to build the next cursor"""
+    names = {"id", sort_name}
+    names.update(field for field in fields if field not in PREFETCHED_FIELDS)
+    return [getattr(Task, name) for name in TASK_FIELDS if name in names]
+
+
+def encode_cursor(sort, task):
+    value = getattr(task, SORT_COLUMNS[sort.lstrip("-")].key)
+    payload = [sort, value.isoformat() if value else None, task.id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    """Return the (sort value, id) position a cursor points after"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        cursor_sort, value, last_id = payload
+        value = datetime.fromisoformat(value) if value is not None else None
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+    if cursor_sort != sort or not isinstance(last_id, int):
+        raise ValueError("Cursor does not match the requested sort")
+    return value, last_id
+
+
+def paginate(query, sort, limit, after=None):
+    """Return one page of ``query`` in ``sort`` order and the cursor for the next page (or None)
+
+    ``after`` is a decoded cursor. Rows are ordered by the sort column, then
+    id. Tasks without a value for the sort column (e.g. no due date) come
+    last in both directions.
+    """
+    name, descending = parse_sort(sort)
+    column = SORT_COLUMNS[name]
+    if after is not None:
+        value, last_id = after
+        id_after = Task.id < last_id if descending else Task.id > last_id
+        if value is None:
+            query = query.filter(column.is_(None), id_after)
+        else:
+            column_after = column < value if descending else column > value
+            query = query.filter(or_(column_after, and_(column == value, id_after), column.is_(None)))
+    if descending:
+        query = query.order_by(column.desc().nulls_last(), Task.id.desc())
+    else:
+        query = query.order_by(column.asc().nulls_last(), Task.id.asc())
+
+    tasks = query.limit(limit + 1).all()
+    if len(tasks) <= limit:
+        return tasks, None
+    tasks = tasks[:limit]
+    return tasks, encode_cursor(sort, tasks[-1])
+
+
+def paginate_comments(task_id, limit, after=None):
+    """Return one page of a task's comments, oldest first, and the cursor for the next page (or None)
+
+    Cursors are those of tasks sorted by ``created_at``. Comments always have
+    a created_at, so the position is a plain (created_at, id) row comparison:
+    a range of ix_comments_task_id_created_at, however deep the page.
+    """
+    query = Comment.query.filter(Comment.task_id == task_id)
+    if after is not None:
+        query = query.filter(tuple_(Comment.created_at, Comment.id) > tuple_(*after))
+    comments = query.order_by(Comment.created_at, Comment.id).limit(limit + 1).all()
+    if len(comments) <= limit:
+        return comments, None
+    comments = comments[:limit]
+    return comments, encode_cursor("created_at", comments[-1])
+
+
+def _planner_estimate(query):
+    """PostgreSQL's row estimate for ``query``, read from EXPLAIN without running it"""
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    plan = db.session.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_tasks(query, mode, cache_key):
+    """Return (count, exact) for the filtered ``query``
+
+    ``exact`` runs COUNT(*). ``estimate`` is cached for TASK_COUNT_CACHE_SECONDS
+    per filter combination; on PostgreSQL it uses the planner's estimate and
+    only runs COUNT(*) when that estimate is below TASK_COUNT_EXACT_THRESHOLD,
+    so large tenants never pay for a full count.
+    """
+    if mode == "exact":
+        return query.order_by(None).count(), True
+
+    key = (str(db.engine.url), cache_key)
+    now = time.monotonic()
+    with _count_cache_lock:
+        cached = _count_cache.get(key)
+    if cached and cached[2] > now:
+        return cached[0], cached[1]
+
+    count, exact = None, True
+    if db.engine.dialect.name == "postgresql":
+        estimate = _planner_estimate(query.order_by(None))
+        if estimate >= current_app.config["TASK_COUNT_EXACT_THRESHOLD"]:
+            count, exact = estimate, False
+    if count is None:
+        count = query.order_by(None).count()
+
+    with _count_cache_lock:
+        _count_cache[key] = (count, exact, now + current_app.config["TASK_COUNT_CACHE_SECONDS"])
+    return count, exact
@@ -0,0 +1,153 @@
+"""Indexed full-text search over task titles and descriptions.
+
+The query is split into words. A task matches when every word is a prefix of
+a word in its title or description. Results are ranked by relevance, and
+title matches weigh more than description matches.
+
+* ``postgresql``: a GIN index on ``tasks.search_vector``, a stored generated
+  ``tsvector`` column (the ``simple`` configuration: no stemming or stop
+  words), ranked with ``ts_rank``. PostgreSQL recomputes the column and
+  updates the index on every insert and update.
+* ``sqlite``: an FTS5 table (``tasks_fts``) over the tasks table, ranked
+  with ``bm25``. Triggers update it on every insert, update and delete,
+  including bulk statements.
+* ``like``: the unindexed ILIKE scan, used when neither index exists.
+
+On PostgreSQL only the first ``SEARCH_RANK_LIMIT`` matches are ranked and
+returned, which bounds the cost of words that appear in most tasks.
+
+``SEARCH_BACKEND`` picks one explicitly. The default, ``auto``, picks by
+database.
+"""
+
+import re
+
+from flask import current_app
+from sqlalchemy import DDL, column, event, func, inspect, literal_column, select, table
+
+from models import Task, db
+
+BACKENDS = ("auto", "postgresql", "sqlite", "like")
+WORD = re.compile(r"\w+")
+TITLE_WEIGHT = 10.0  # bm25 weight of a title match relative to a description match
+
+# A stored generated column, so ranking reads the vector instead of re-parsing every matching row
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A')"
+    " || setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+POSTGRESQL_DDL = (
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector"
+    f" GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING gin (search_vector)",
+)
+SEARCH_VECTOR = literal_column("tasks.search_vector")
+
+FTS_TABLE = table("tasks_fts", column("rowid"))
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts"
+    " USING fts5(title, description, content='tasks', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN"
+    " INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN"
+    " INSERT INTO tasks_fts(tasks_fts, rowid, title, description)"
+    " VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN"
+    " INSERT INTO tasks_fts(tasks_fts, rowid, title, description)"
+    " VALUES ('delete', old.id, old.title, old.description);"
+    " INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+
+def _fts5_available(ddl, target, bind, **kw):
+    options = bind.exec_driver_sql("PRAGMA compile_options").scalars().all()
+    return "ENABLE_FTS5" in options
+
+
+for _statement in POSTGRESQL_DDL:
+    event.listen(Task.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+for _statement in SQLITE_DDL:
+    event.listen(
+        Task.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite", callable_=_fts5_available)
+    )
+event.listen(Task.__table__, "before_drop", DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"))
+
+
+def include_object(object_, name, type_, reflected, compare_to):
+    """Alembic autogenerate filter: skip the objects created by the DDL above, which the models do not declare"""
+    if reflected and compare_to is None:
+        return name not in ("search_vector", "ix_tasks_search_vector") and not name.startswith("tasks_fts")
+    return True
+
+
+def get_backend():
+    """The backend in use for this app, resolved once"""
+    backend = current_app.extensions.get("task_search_backend")
+    if backend is None:
+        backend = current_app.config.get("SEARCH_BACKEND", "auto")
+        if backend not in BACKENDS:
+            raise ValueError(f"SEARCH_BACKEND must be one of: {', '.join(BACKENDS)}")
+        if backend == "auto":
+            dialect = db.engine.dialect.name
+            inspector = inspect(db.engine)
+            if dialect == "postgresql" and "search_vector" in {c["name"] for c in inspector.get_columns("tasks")}:
+                backend = "postgresql"
+            elif dialect == "sqlite" and inspector.has_table("tasks_fts"):
+                backend = "sqlite"
+            else:
+                backend = "like"
+        current_app.extensions["task_search_backend"] = backend
+    return backend
+
+
+def _search_query(backend, text, limit, offset):
+    """A select of one page of tasks matching ``text``, best match first; None when it has no words"""
+    if backend == "like":
+        return (
+            select(Task)
+            .where(db.or_(Task.title.ilike(f"%{text}%"), Task.description.ilike(f"%{text}%")))
+            .order_by(Task.id)
+            .limit(limit)
+            .offset(offset)
+        )
+
+    words = WORD.findall(text.lower())
+    if not words:
+        return None
+    if backend == "postgresql":
+        tsquery = func.to_tsquery("simple", " & ".join(f"{word}:*" for word in words))
+        # Rank at most SEARCH_RANK_LIMIT matches, so a word found in most tasks costs no more than a rare one
+        candidates = (
+            select(Task.id, SEARCH_VECTOR.label("search_vector"))
+            .where(SEARCH_VECTOR.op("@@")(tsquery))
+            .limit(current_app.config.get("SEARCH_RANK_LIMIT", 10000))
+            .subquery()
+        )
+        return (
+            select(Task)
+            .join(candidates, candidates.c.id == Task.id)
+            .order_by(func.ts_rank(candidates.c.search_vector, tsquery).desc(), Task.id)
+            .limit(limit)
+            .offset(offset)
+        )
+    # Rank and cut the page inside FTS5, then join only that page to tasks
+    fts = literal_column("tasks_fts")
+    score = func.bm25(fts, TITLE_WEIGHT, 1.0).label("score")
+    ranked = (
+        select(FTS_TABLE.c.rowid, score)
+        .where(fts.op("MATCH")(" ".join(f'"{word}"*' for word in words)))
+        .order_by(score, FTS_TABLE.c.rowid)
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+    return select(Task).join(ranked, ranked.c.rowid == Task.id).order_by(ranked.c.score, Task.id)
+
+
+def search_tasks(text, limit, offset=0):
+    """Return one page of matching tasks and whether another page follows"""
+    query = _search_query(get_backend(), text, limit + 1, offset)
+    if query is None:
+        return [], False
+    tasks = db.session.execute(query).scalars().all()
+    return tasks[:limit], len(tasks) > limit
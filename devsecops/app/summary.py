@@ -0,0 +1,98 @@
+"""Per-user task counts for /users/<id>/summary.
+
+A summary is computed with one GROUP BY over the user's tasks (found with
+the user_id indexes) and cached for USER_SUMMARY_CACHE_SECONDS. The task
+write paths call ``invalidate()`` after committing, so within a process
+the cached counts follow every change; other processes see a change once
+their copy expires. The overdue count also follows the clock, so it is at
+most that old too.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import and_, case, func, select
+
+from models import Task, User, db
+
+UNSET = "none"  # by_status/by_priority key for tasks whose status or priority is null
+
+_summaries = {}  # (database url, user id) -> (summary, expires at)
+_generations = {}  # (database url, user id) -> times invalidated
+_epoch = 0  # times invalidate_all() ran or _generations was reset
+# Past this many users, _generations starts over and _epoch moves on instead,
+# which only stops summaries being computed at that moment from being cached
+MAX_GENERATIONS = 10_000
+_summaries_lock = threading.Lock()
+
+
+def invalidate(*user_ids):
+    """Drop the cached summaries of ``user_ids`` (None, for unassigned tasks, is ignored)"""
+    global _epoch
+    url = str(db.engine.url)
+    with _summaries_lock:
+        for user_id in user_ids:
+            key = (url, user_id)
+            _summaries.pop(key, None)
+            if key not in _generations and len(_generations) >= MAX_GENERATIONS:
+                _generations.clear()
+                _epoch += 1
+            _generations[key] = _generations.get(key, 0) + 1
+
+
+def invalidate_all():
+    global _epoch
+    with _summaries_lock:
+        _summaries.clear()
+        _generations.clear()
+        _epoch += 1
+
+
+def _compute(user_id):
+    now = datetime.utcnow()
+    overdue = and_(Task.completed.is_not(True), Task.due_date < now)
+    rows = db.session.execute(
+        select(
+            Task.status,
+            Task.priority,
+            Task.completed,
+            func.count(),
+            func.sum(case((overdue, 1), else_=0)),
+        )
+        .where(Task.user_id == user_id)
+        .group_by(Task.status, Task.priority, Task.completed)
+    )
+    summary = {"user_id": user_id, "total": 0, "completed": 0, "overdue": 0, "by_status": {}, "by_priority": {}}
+    for status, priority, completed, count, overdue_count in rows:
+        status = UNSET if status is None else status
+        priority = UNSET if priority is None else priority
+        summary["total"] += count
+        summary["completed"] += count if completed else 0
+        summary["overdue"] += overdue_count or 0
+        summary["by_status"][status] = summary["by_status"].get(status, 0) + count
+        summary["by_priority"][priority] = summary["by_priority"].get(priority, 0) + count
+    summary["open"] = summary["total"] - summary["completed"]
+    summary["as_of"] = now.isoformat()
+    return summary
+
+
+def get_summary(user_id):
+    """The task counts of a user, from the cache when it holds a fresh copy; None if there is no such user"""
+    key = (str(db.engine.url), user_id)
+    now = time.monotonic()
+    with _summaries_lock:
+        cached = _summaries.get(key)
+        generation = (_epoch, _generations.get(key, 0))
+    if cached and cached[1] > now:
+        return cached[0]
+
+    if db.session.get(User, user_id) is None:
+        return None
+    summary = _compute(user_id)
+    with _summaries_lock:
+        # Counts read before a write that invalidated them in the meantime are returned, not cached
+        if (_epoch, _generations.get(key, 0)) == generation:
+            _summaries[key] = (summary, now + current_app.config["USER_SUMMARY_CACHE_SECONDS"])
+    return summary
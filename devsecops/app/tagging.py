@@ -0,0 +1,129 @@
+"""Set-based tag links, and a cache of tag ids by name.
+
+Links are written with INSERT ... SELECT ... ON CONFLICT DO NOTHING and
+removed with one DELETE per chunk of tasks, so neither a task's tag
+collection nor its existing links are ever loaded. Linking a tag twice is
+not an error; the result counts only the links that are new. A chunk of
+tasks whose links changed gets new versions, so their ETags change too.
+
+Tags are never renamed or deleted by the API, so a cached id stays valid
+for the life of the process. Names missing from the cache are resolved
+with one query per call.
+"""
+
+import threading
+
+from flask import current_app
+from sqlalchemy import delete, exists, insert, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+
+from batch import chunks, is_id
+from models import Tag, Task, bump_versions, db, task_tags
+
+CONFLICT_IGNORING_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+_tag_ids = {}  # (database url, tag name) -> tag id
+_tag_ids_lock = threading.Lock()
+
+
+def clear_cache():
+    with _tag_ids_lock:
+        _tag_ids.clear()
+
+
+def cache_tag(name, tag_id):
+    with _tag_ids_lock:
+        _tag_ids[(str(db.engine.url), name)] = tag_id
+
+
+def tag_ids_by_name(names):
+    """Map each of ``names`` to its tag id; names without a tag are left out"""
+    url = str(db.engine.url)
+    with _tag_ids_lock:
+        found = {name: _tag_ids[(url, name)] for name in names if (url, name) in _tag_ids}
+    missing = set(names) - set(found)
+    if missing:
+        rows = dict(db.session.execute(select(Tag.name, Tag.id).where(Tag.name.in_(missing))).all())
+        with _tag_ids_lock:
+            _tag_ids.update(((url, name), tag_id) for name, tag_id in rows.items())
+        found.update(rows)
+    return found
+
+
+def existing_ids(model, ids):
+    """The subset of ``ids`` that are primary keys of ``model``"""
+    found = set()
+    for chunk in chunks(sorted(set(ids))):
+        found.update(db.session.execute(select(model.id).where(model.id.in_(chunk))).scalars())
+    return found
+
+
+def _id_list(data, key):
+    values = data.get(key, [])
+    if not isinstance(values, list) or not all(is_id(value) for value in values):
+        raise ValueError(f"{key} must be a list of integers")
+    return list(dict.fromkeys(values))
+
+
+def resolve_links(data):
+    """Validate a bulk link body; returns (task ids, tag ids, not found)
+
+    The body is ``{"task_ids": [...], "tags": [names], "tag_ids": [...]}``, with
+    tags given by name, id or both. ``not found`` maps those keys to the
+    values that match no task or tag, and is empty when all of them exist.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Body must be a JSON object")
+    task_ids = _id_list(data, "task_ids")
+    tag_ids = _id_list(data, "tag_ids")
+    names = data.get("tags", [])
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise ValueError("tags must be a list of tag names")
+    if not task_ids or not (names or tag_ids):
+        raise ValueError("task_ids and at least one of tags or tag_ids are required")
+    maximum = current_app.config["TASKS_BATCH_MAX_ITEMS"]
+    if len(task_ids) > maximum:
+        raise ValueError(f"At most {maximum} task_ids are accepted")
+
+    not_found = {}
+    by_name = tag_ids_by_name(names)
+    if len(by_name) < len(set(names)):
+        not_found["tags"] = [name for name in dict.fromkeys(names) if name not in by_name]
+    existing_tags = existing_ids(Tag, tag_ids)
+    if len(existing_tags) < len(tag_ids):
+        not_found["tag_ids"] = [tag_id for tag_id in tag_ids if tag_id not in existing_tags]
+    existing_tasks = existing_ids(Task, task_ids)
+    if len(existing_tasks) < len(task_ids):
+        not_found["task_ids"] = [task_id for task_id in task_ids if task_id not in existing_tasks]
+    return task_ids, sorted(set(tag_ids) | set(by_name.values())), not_found
+
+
+def attach_tags(task_ids, tag_ids):
+    """Link every task to every tag, skipping links that exist; returns the number of new links"""
+    dialect = db.engine.dialect.name
+    attached = 0
+    for chunk in chunks(task_ids):
+        pairs = select(Task.id, Tag.id).join(Tag, true()).where(Task.id.in_(chunk), Tag.id.in_(tag_ids))
+        if dialect in CONFLICT_IGNORING_INSERTS:
+            statement = CONFLICT_IGNORING_INSERTS[dialect](task_tags).from_select(["task_id", "tag_id"], pairs)
+            statement = statement.on_conflict_do_nothing()
+        else:
+            linked = exists().where(task_tags.c.task_id == Task.id, task_tags.c.tag_id == Tag.id)
+            statement = insert(task_tags).from_select(["task_id", "tag_id"], pairs.where(~linked))
+        rowcount = db.session.execute(statement).rowcount
+        if rowcount:
+            bump_versions(chunk)
+        attached += rowcount
+    return attached
+
+
+def detach_tags(task_ids, tag_ids):
+    """Remove the links between the tasks and the tags; returns the number removed"""
+    detached = 0
+    for chunk in chunks(task_ids):
+        statement = delete(task_tags).where(task_tags.c.task_id.in_(chunk), task_tags.c.tag_id.in_(tag_ids))
+        rowcount = db.session.execute(statement).rowcount
+        if rowcount:
+            bump_versions(chunk)
+        detached += rowcount
+    return detached
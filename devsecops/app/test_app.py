@@ -1,8 +1,56 @@
+import itertools
 import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
 
 import pytest
-
-from models import Task, User
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, event, insert, inspect, text
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+import search
+import summary
+import tagging
+from models import Comment, Tag, Task, User, insert_unique, task_tags
+
+
+@contextmanager
+def count_statements(engine):
+    """Record the SQL statements, with their parameters, executed on ``engine`` inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed_tasks(db, count, start=0, title="Task"):
+    """Insert ``count`` tasks, each with two tags, without going through the API"""
+    tags = db.session.execute(db.select(Tag.id)).scalars().all()
+    if not tags:
+        db.session.add_all([Tag(name="backend"), Tag(name="urgent")])
+        db.session.flush()
+        tags = db.session.execute(db.select(Tag.id)).scalars().all()
+    task_ids = db.session.execute(
+        insert(Task).returning(Task.id),
+        [{"title": f"{title} {i}", "description": "seeded"} for i in range(start, start + count)],
+    ).scalars()
+    db.session.execute(
+        insert(task_tags),
+        [{"task_id": task_id, "tag_id": tag_id} for task_id in task_ids for tag_id in tags],
+    )
+    db.session.commit()
 
 
 class TestUsers:
@@ -40,6 +88,26 @@ class TestUsers:
         data = json.loads(response.data)
         assert "already exists" in data["error"]
 
+    def test_create_user_duplicate_email(self, client, db):
+        """Test creating user with duplicate email fails, with a single INSERT"""
+        client.post(
+            "/users",
+            data=json.dumps({"username": "first", "email": "test@example.com"}),
+            content_type="application/json",
+        )
+
+        with count_statements(db.engine) as statements:
+            response = client.post(
+                "/users",
+                data=json.dumps({"username": "second", "email": "test@example.com"}),
+                content_type="application/json",
+            )
+
+        assert response.status_code == 409
+        assert json.loads(response.data)["error"] == "Email already exists"
+        assert [sql.split()[0] for sql, _ in statements] == ["INSERT"]
+        assert User.query.count() == 1
+
     def test_create_user_missing_fields(self, client, db):
         """Test creating user without required fields fails"""
         response = client.post(
@@ -194,6 +262,87 @@ class TestTasks:
         assert response.status_code == 404
 
 
+class TestConditionalRequests:
+    """Test task ETags, If-None-Match, If-Match and version checks (Feature 6, 7, 9)"""
+
+    def create(self, client):
+        response = client.post("/tasks", data=json.dumps({"title": "Versioned"}), content_type="application/json")
+        return json.loads(response.data)["id"], response.headers["ETag"]
+
+    def put(self, client, task_id, body, **headers):
+        return client.put(f"/tasks/{task_id}", data=json.dumps(body), content_type="application/json", headers=headers)
+
+    def test_get_not_modified(self, client, db):
+        task_id, etag = self.create(client)
+        tag = client.post("/tags", data=json.dumps({"name": "ops"}), content_type="application/json")
+        changes = [
+            (client.put, f"/tasks/{task_id}", {"title": "Renamed"}),
+            (client.patch, "/tasks/batch", [{"id": task_id, "priority": "low"}]),
+            (client.post, f"/tasks/{task_id}/tags", {"tag_id": json.loads(tag.data)["id"]}),
+            (client.post, f"/tasks/{task_id}/comments", {"content": "Hi"}),
+        ]
+
+        response = client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.data == b""
+        assert response.headers["ETag"] == etag
+        seen = {etag}
+        for method, url, body in changes:
+            assert method(url, data=json.dumps(body), content_type="application/json").status_code in (200, 201)
+            response = client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+            assert response.status_code == 200
+            etag = response.headers["ETag"]
+            assert etag not in seen
+            seen.add(etag)
+
+    def test_update_if_match(self, client, db):
+        task_id, etag = self.create(client)
+        current = self.put(client, task_id, {"status": "in_progress"}).headers["ETag"]
+
+        stale = self.put(client, task_id, {"title": "Lost update"}, **{"If-Match": etag})
+
+        assert stale.status_code == 412
+        assert stale.headers["ETag"] == current
+        assert Task.query.one().title == "Versioned"
+        assert self.put(client, task_id, {"title": "Fresh"}, **{"If-Match": current}).status_code == 200
+        assert self.put(client, task_id, {"title": "Any"}, **{"If-Match": "*"}).status_code == 200
+        assert self.put(client, 9999, {"title": "Missing"}, **{"If-Match": current}).status_code == 404
+
+    def test_toggle_is_one_atomic_update(self, client, db):
+        task_id, etag = self.create(client)
+
+        with count_statements(db.engine) as statements:
+            response = client.patch(f"/tasks/{task_id}/complete", headers={"If-Match": etag})
+
+        assert response.status_code == 200
+        assert json.loads(response.data)["completed"] is True
+        task_statements = [sql for sql, _ in statements if "tasks" in sql.split("WHERE")[0]]
+        assert len(task_statements) == 1
+        assert task_statements[0].startswith("UPDATE tasks")
+        assert client.patch(f"/tasks/{task_id}/complete", headers={"If-Match": etag}).status_code == 412
+        assert json.loads(client.patch(f"/tasks/{task_id}/complete").data)["completed"] is False
+        assert client.patch("/tasks/9999/complete").status_code == 404
+
+    def test_concurrent_update_is_detected(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'versions.db'}")
+        Task.__table__.create(engine)
+        with Session(engine) as session:
+            session.add(Task(title="Shared"))
+            session.commit()
+
+        with Session(engine) as first, Session(engine) as second:
+            first.get(Task, 1).title = "First"
+            second.get(Task, 1).title = "Second"
+            first.commit()
+            with pytest.raises(StaleDataError):
+                second.commit()
+
+        with Session(engine) as session:
+            task = session.get(Task, 1)
+            assert (task.title, task.version) == ("First", 2)
+
+
 class TestTaskSearch:
     """Test task search functionality (Feature 10)"""
 
@@ -258,3 +407,583 @@ class TestTaskSearch:
         assert response.status_code == 200
         data = json.loads(response.data)
         assert len(data) == 1
+
+    def test_search_ranks_title_matches_first(self, client, db):
+        """Test tasks matching in the title rank above description-only matches"""
+        for payload in (
+            {"title": "Write docs", "description": "Deploy notes"},
+            {"title": "Deploy service", "description": "Release"},
+        ):
+            client.post("/tasks", data=json.dumps(payload), content_type="application/json")
+
+        response = client.get("/tasks/search?q=deploy")
+
+        assert [task["title"] for task in json.loads(response.data)] == ["Deploy service", "Write docs"]
+
+    def test_search_index_follows_updates_and_deletes(self, client, db):
+        """Test the search index is updated when tasks change"""
+        response = client.post(
+            "/tasks", data=json.dumps({"title": "Kubernetes upgrade"}), content_type="application/json"
+        )
+        task_id = json.loads(response.data)["id"]
+
+        client.put(
+            f"/tasks/{task_id}", data=json.dumps({"title": "Terraform upgrade"}), content_type="application/json"
+        )
+        assert json.loads(client.get("/tasks/search?q=kubernetes").data) == []
+        assert len(json.loads(client.get("/tasks/search?q=terra").data)) == 1
+
+        client.delete(f"/tasks/{task_id}")
+        assert json.loads(client.get("/tasks/search?q=terraform").data) == []
+
+    def test_search_pagination(self, client, db):
+        """Test search results are paginated with a Link header"""
+        seed_tasks(db, 5)
+
+        first = client.get("/tasks/search?q=task&limit=3")
+        second = client.get(first.headers["Link"][1 : first.headers["Link"].index(">")])
+
+        assert len(json.loads(first.data)) == 3
+        assert len(json.loads(second.data)) == 2
+        assert "Link" not in second.headers
+        assert client.get("/tasks/search?q=task&offset=-1").status_code == 400
+
+
+class TestTaskPagination:
+    """Test keyset pagination, sorting, field selection and counts on GET /tasks"""
+
+    def walk(self, client, url):
+        """Follow the Link headers from ``url``, returning every page"""
+        pages = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            pages.append(json.loads(response.data))
+            link = response.headers.get("Link")
+            url = link[1 : link.index(">")] if link else None
+        return pages
+
+    def test_pages_cover_all_tasks_once(self, client, db):
+        seed_tasks(db, 25)
+
+        pages = self.walk(client, "/tasks?limit=10")
+
+        assert [len(page) for page in pages] == [10, 10, 5]
+        ids = [task["id"] for page in pages for task in page]
+        assert ids == sorted(ids)
+        assert len(set(ids)) == 25
+
+    def test_sort_by_due_date_descending_puts_undated_last(self, client, db):
+        for day in (3, 1, 2, None, 2):
+            payload = {"title": f"Due {day}"}
+            if day:
+                payload["due_date"] = f"2024-01-0{day}T00:00:00"
+            client.post("/tasks", data=json.dumps(payload), content_type="application/json")
+
+        pages = self.walk(client, "/tasks?sort=-due_date&limit=2")
+
+        titles = [task["title"] for page in pages for task in page]
+        assert titles == ["Due 3", "Due 2", "Due 2", "Due 1", "Due None"]
+
+    def test_cursor_for_another_sort_is_rejected(self, client, db):
+        seed_tasks(db, 3)
+        cursor = client.get("/tasks?limit=1").headers["X-Next-Cursor"]
+
+        assert client.get(f"/tasks?sort=due_date&cursor={cursor}").status_code == 400
+        assert client.get("/tasks?cursor=not-a-cursor").status_code == 400
+        assert client.get("/tasks?limit=0").status_code == 400
+
+    def test_fields_selection(self, client, db):
+        seed_tasks(db, 2)
+
+        response = client.get("/tasks?fields=id,title,tags")
+
+        data = json.loads(response.data)
+        assert set(data[0]) == {"id", "title", "tags"}
+        assert sorted(data[0]["tags"]) == ["backend", "urgent"]
+        assert client.get("/tasks?fields=id,secret").status_code == 400
+
+    def test_total_count(self, client, db):
+        seed_tasks(db, 12)
+        client.post("/tasks", data=json.dumps({"title": "High", "priority": "high"}), content_type="application/json")
+
+        response = client.get("/tasks?count=exact&limit=5")
+        assert response.headers["X-Total-Count"] == "13"
+        assert response.headers["X-Total-Count-Type"] == "exact"
+
+        response = client.get("/tasks?count=estimate&priority=high")
+        assert response.headers["X-Total-Count"] == "1"
+        assert client.get("/tasks?count=approximate").status_code == 400
+
+    def test_comment_pages_in_created_order(self, client, db):
+        seed_tasks(db, 2)
+        task_id, other_id = (task.id for task in Task.query.order_by(Task.id))
+        # Out of id order, with ties on created_at that the id must break
+        times = [datetime(2024, 1, 1 + i % 3) for i in range(25)]
+        rows = [{"content": str(i), "task_id": task_id, "created_at": created_at} for i, created_at in enumerate(times)]
+        db.session.execute(insert(Comment), rows)
+        db.session.execute(insert(Comment), [{"content": "elsewhere", "task_id": other_id}])
+        db.session.commit()
+
+        pages = self.walk(client, f"/tasks/{task_id}/comments?limit=10")
+
+        assert [len(page) for page in pages] == [10, 10, 5]
+        comments = [comment for page in pages for comment in page]
+        expected = sorted(range(25), key=lambda i: (times[i], i))
+        assert [comment["content"] for comment in comments] == [str(i) for i in expected]
+        assert client.get(f"/tasks/{task_id}/comments?cursor=not-a-cursor").status_code == 400
+        assert client.get("/tasks/999999/comments").status_code == 404
+
+    def test_comment_count(self, client, db):
+        seed_tasks(db, 3)
+        ids = [task.id for task in Task.query.order_by(Task.id)]
+        note = json.dumps({"content": "Note"})
+        for task_id in (ids[0], ids[0], ids[2]):
+            client.post(f"/tasks/{task_id}/comments", data=note, content_type="application/json")
+
+        listed = json.loads(client.get("/tasks").data)
+        assert [task["comment_count"] for task in listed] == [2, 0, 1]
+        assert json.loads(client.get("/tasks?fields=id,comment_count").data)[0] == {"id": ids[0], "comment_count": 2}
+        assert [task["comment_count"] for task in json.loads(client.get("/tasks/search?q=Task").data)] == [2, 0, 1]
+        assert json.loads(client.get(f"/tasks/{ids[2]}").data)["comment_count"] == 1
+
+
+class TestTaskBatch:
+    """Test bulk create, update and delete on /tasks/batch"""
+
+    def test_create_batch(self, client, db):
+        items = [{"title": f"Batch {i}", "priority": "high", "due_date": "2024-01-01T00:00:00"} for i in range(1200)]
+
+        with count_statements(db.engine) as statements:
+            response = client.post("/tasks/batch", data=json.dumps(items), content_type="application/json")
+
+        assert response.status_code == 201
+        results = json.loads(response.data)["results"]
+        assert [result["index"] for result in results] == list(range(1200))
+        assert {result["status"] for result in results} == {201}
+        first = json.loads(client.get(f"/tasks/{results[0]['id']}").data)
+        assert first["title"] == "Batch 0"
+        assert first["status"] == "pending"
+        assert first["due_date"] == "2024-01-01T00:00:00"
+        assert Task.query.count() == 1200
+        titles = dict(db.session.execute(db.select(Task.id, Task.title)).all())
+        assert [titles[result["id"]] for result in results] == [f"Batch {i}" for i in range(1200)]
+        inserts = [sql for sql, _ in statements if sql.startswith("INSERT INTO tasks")]
+        assert len(inserts) <= 3  # chunks of TASKS_BATCH_CHUNK_SIZE, not one statement per task
+
+    def test_create_batch_from_ndjson(self, client, db):
+        body = '{"title": "First"}\n\n{"title": "Second", "completed": true}\n'
+
+        response = client.post("/tasks/batch", data=body, content_type="application/x-ndjson")
+
+        assert response.status_code == 201
+        assert [task.title for task in Task.query.order_by(Task.id)] == ["First", "Second"]
+        bad = client.post("/tasks/batch", data='{"title": "ok"}\n{oops', content_type="application/x-ndjson")
+        assert bad.status_code == 400
+        assert "line 2" in json.loads(bad.data)["error"]
+
+    def test_invalid_item_rejects_the_whole_batch(self, client, db):
+        items = [{"title": "Fine"}, {"description": "no title"}, {"title": "Late", "due_date": "soon"}]
+        items.append({"title": "Nobody's", "user_id": 999})
+        items += [{"title": "Urgent", "priority": "urgent"}, {"title": "Numbered", "status": 5}]
+
+        response = client.post("/tasks/batch", data=json.dumps(items), content_type="application/json")
+
+        assert response.status_code == 400
+        errors = json.loads(response.data)["results"]
+        assert [error["index"] for error in errors] == [1, 2, 3, 4, 5]
+        assert errors[4]["error"] == "status must be one of pending, in_progress, completed"
+        assert Task.query.count() == 0
+        assert client.post("/tasks/batch", data="{}", content_type="application/json").status_code == 400
+
+    def test_update_batch(self, client, db):
+        seed_tasks(db, 3)
+        ids = [task.id for task in Task.query.order_by(Task.id)]
+        items = [
+            {"id": ids[0], "status": "in_progress", "completed": True},
+            {"id": ids[1], "title": "Renamed", "description": None},
+            {"id": 999999, "title": "Missing"},
+        ]
+
+        response = client.patch("/tasks/batch", data=json.dumps(items), content_type="application/json")
+
+        assert response.status_code == 200
+        assert [result["status"] for result in json.loads(response.data)["results"]] == [200, 200, 404]
+        tasks = {task.id: task for task in Task.query}
+        assert (tasks[ids[0]].status, tasks[ids[0]].completed, tasks[ids[0]].title) == ("in_progress", True, "Task 0")
+        assert (tasks[ids[1]].title, tasks[ids[1]].description, tasks[ids[1]].status) == ("Renamed", None, "pending")
+        assert tasks[ids[1]].updated_at > tasks[ids[2]].updated_at
+        assert tasks[ids[2]].title == "Task 2"
+        duplicate = [{"id": ids[0], "title": "A"}, {"id": ids[0], "title": "B"}]
+        response = client.patch("/tasks/batch", data=json.dumps(duplicate), content_type="application/json")
+        assert response.status_code == 400
+
+    def test_delete_batch(self, client, db):
+        seed_tasks(db, 3)
+        ids = [task.id for task in Task.query.order_by(Task.id)]
+        client.post(f"/tasks/{ids[0]}/comments", data=json.dumps({"content": "Note"}), content_type="application/json")
+
+        response = client.delete(
+            "/tasks/batch", data=json.dumps([ids[0], {"id": ids[1]}, 999999]), content_type="application/json"
+        )
+
+        assert response.status_code == 200
+        assert [result["status"] for result in json.loads(response.data)["results"]] == [200, 200, 404]
+        assert [task.id for task in Task.query] == [ids[2]]
+        assert db.session.execute(db.select(task_tags.c.task_id.distinct())).scalars().all() == [ids[2]]
+        assert client.get(f"/tasks/{ids[0]}/comments").status_code == 404
+
+
+class TestTagLinks:
+    """Test single and bulk tag links, and the tasks of a tag"""
+
+    def test_add_and_remove_tag(self, client, db):
+        seed_tasks(db, 1)
+        task = Task.query.one()
+        tag = client.post("/tags", data=json.dumps({"name": "docs"}), content_type="application/json")
+        tag_id = json.loads(tag.data)["id"]
+
+        url, body = f"/tasks/{task.id}/tags", json.dumps({"tag_id": tag_id})
+        response = client.post(url, data=body, content_type="application/json")
+        assert sorted(json.loads(response.data)["tags"]) == ["backend", "docs", "urgent"]
+        assert client.post(url, data=body, content_type="application/json").status_code == 409
+
+        assert client.delete(f"/tasks/{task.id}/tags/{tag_id}").status_code == 200
+        assert client.delete(f"/tasks/{task.id}/tags/{tag_id}").status_code == 404
+
+    def test_attach_and_detach_many(self, client, db):
+        seed_tasks(db, 3)
+        ids = [task.id for task in Task.query.order_by(Task.id)]
+        docs = json.loads(client.post("/tags", data=json.dumps({"name": "docs"}), content_type="application/json").data)
+        body = {"task_ids": ids, "tags": ["docs", "backend"]}
+
+        response = client.post("/tasks/batch/tags", data=json.dumps(body), content_type="application/json")
+        assert json.loads(response.data) == {"attached": 3}  # every task already had backend
+        with count_statements(db.engine) as statements:
+            response = client.post("/tasks/batch/tags", data=json.dumps(body), content_type="application/json")
+        assert json.loads(response.data) == {"attached": 0}
+        assert not any("tags.name" in sql for sql, _ in statements)  # the names came from the cache
+        assert not any("FROM task_tags" in sql for sql, _ in statements)  # no tag collection was loaded
+
+        body = {"task_ids": ids[:2], "tag_ids": [docs["id"]], "tags": ["urgent"]}
+        response = client.delete("/tasks/batch/tags", data=json.dumps(body), content_type="application/json")
+        assert json.loads(response.data) == {"detached": 4}
+        tags = {task["id"]: sorted(task["tags"]) for task in json.loads(client.get("/tasks").data)}
+        assert tags == {ids[0]: ["backend"], ids[1]: ["backend"], ids[2]: ["backend", "docs", "urgent"]}
+
+    def test_unknown_tasks_or_tags_write_nothing(self, client, db):
+        seed_tasks(db, 1)
+        task_id = Task.query.one().id
+        body = {"task_ids": [task_id, 999999], "tags": ["backend", "nope"], "tag_ids": [888888]}
+
+        response = client.post("/tasks/batch/tags", data=json.dumps(body), content_type="application/json")
+
+        assert response.status_code == 404
+        data = json.loads(response.data)
+        assert (data["task_ids"], data["tags"], data["tag_ids"]) == ([999999], ["nope"], [888888])
+        assert sorted(tag.name for tag in Task.query.one().tags) == ["backend", "urgent"]
+        no_tags = json.dumps({"task_ids": [task_id]})
+        assert client.post("/tasks/batch/tags", data=no_tags, content_type="application/json").status_code == 400
+
+    def test_tasks_of_a_tag(self, client, db):
+        seed_tasks(db, 5)
+        client.post("/tags", data=json.dumps({"name": "docs"}), content_type="application/json")
+        ids = [task.id for task in Task.query.order_by(Task.id)]
+        body = {"task_ids": ids[1:4], "tags": ["docs"]}
+        client.post("/tasks/batch/tags", data=json.dumps(body), content_type="application/json")
+        docs = tagging.tag_ids_by_name(["docs"])["docs"]
+
+        with count_statements(db.engine) as statements:
+            pages = TestTaskPagination().walk(client, f"/tags/{docs}/tasks?limit=2")
+
+        assert [[task["id"] for task in page] for page in pages] == [ids[1:3], ids[3:4]]
+        assert "docs" in pages[0][0]["tags"]
+        listing = [(sql, params) for sql, params in statements if "FROM tasks JOIN task_tags" in sql]
+        assert listing
+        for sql, params in listing:
+            assert full_scans(db, sql, params, table="task_tags") == [], sql
+        assert client.get("/tags/999999/tasks").status_code == 404
+
+
+class TestUserSummary:
+    """Test /users/<id>/summary counts and their cache"""
+
+    def post(self, client, url, body):
+        return json.loads(client.post(url, data=json.dumps(body), content_type="application/json").data)
+
+    def test_summary_counts(self, client, db):
+        user_id = self.post(client, "/users", {"username": "dash", "email": "dash@example.com"})["id"]
+        self.post(client, "/tasks", {"title": "Late", "user_id": user_id, "due_date": "2000-01-01T00:00:00"})
+        self.post(client, "/tasks", {"title": "Later", "user_id": user_id, "priority": "high"})
+        done = self.post(client, "/tasks", {"title": "Done", "user_id": user_id, "due_date": "2000-01-01T00:00:00"})
+        client.patch(f"/tasks/{done['id']}/complete")
+        self.post(client, "/tasks", {"title": "Someone else's"})
+
+        response = client.get(f"/users/{user_id}/summary")
+
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert (data["user_id"], data["total"], data["completed"], data["open"]) == (user_id, 3, 1, 2)
+        assert data["overdue"] == 1  # completed tasks are never overdue
+        assert data["by_status"] == {"pending": 3}
+        assert data["by_priority"] == {"medium": 2, "high": 1}
+        assert client.get("/users/999/summary").status_code == 404
+
+    def test_summary_invalidated_while_computed_is_not_cached(self, client, db, monkeypatch):
+        user_id = self.post(client, "/users", {"username": "dash", "email": "dash@example.com"})["id"]
+        compute = summary._compute
+
+        def compute_then_write(uid):
+            counts = compute(uid)
+            self.post(client, "/tasks", {"title": "Written meanwhile", "user_id": uid})
+            return counts
+
+        monkeypatch.setattr(summary, "_compute", compute_then_write)
+        assert json.loads(client.get(f"/users/{user_id}/summary").data)["total"] == 0
+        monkeypatch.setattr(summary, "_compute", compute)
+
+        assert json.loads(client.get(f"/users/{user_id}/summary").data)["total"] == 1
+
+    def test_invalidation_counts_are_bounded(self, client, db, monkeypatch):
+        user_id = self.post(client, "/users", {"username": "dash", "email": "dash@example.com"})["id"]
+        monkeypatch.setattr(summary, "MAX_GENERATIONS", 2)
+        compute = summary._compute
+
+        def compute_then_write(uid):
+            counts = compute(uid)
+            self.post(client, "/tasks", {"title": "Written meanwhile", "user_id": uid})
+            summary.invalidate(*range(1000, 1010))
+            return counts
+
+        monkeypatch.setattr(summary, "_compute", compute_then_write)
+        assert json.loads(client.get(f"/users/{user_id}/summary").data)["total"] == 0
+        monkeypatch.setattr(summary, "_compute", compute)
+
+        assert len(summary._generations) <= 2
+        assert json.loads(client.get(f"/users/{user_id}/summary").data)["total"] == 1
+
+    def test_summary_counts_tasks_without_status_or_priority(self, client, db):
+        user_id = self.post(client, "/users", {"username": "dash", "email": "dash@example.com"})["id"]
+        task = self.post(client, "/tasks", {"title": "Unset", "user_id": user_id})
+        client.put(f"/tasks/{task['id']}", data=json.dumps({"status": None}), content_type="application/json")
+        other = self.post(client, "/tasks", {"title": "No priority", "user_id": user_id})
+        unset = json.dumps([{"id": other["id"], "priority": None}])
+        client.patch("/tasks/batch", data=unset, content_type="application/json")
+
+        response = client.get(f"/users/{user_id}/summary")
+
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data["by_status"] == {"none": 1, "pending": 1}
+        assert data["by_priority"] == {"medium": 1, "none": 1}
+
+    def test_summary_cached_until_tasks_change(self, client, db):
+        user_id = self.post(client, "/users", {"username": "dash", "email": "dash@example.com"})["id"]
+        other_id = self.post(client, "/users", {"username": "other", "email": "other@example.com"})["id"]
+        task = self.post(client, "/tasks", {"title": "Mine", "user_id": user_id})
+        client.get(f"/users/{user_id}/summary")
+
+        with count_statements(db.engine) as statements:
+            assert json.loads(client.get(f"/users/{user_id}/summary").data)["total"] == 1
+        assert statements == []
+
+        def totals():
+            return [json.loads(client.get(f"/users/{uid}/summary").data)["total"] for uid in (user_id, other_id)]
+
+        client.put(f"/tasks/{task['id']}", data=json.dumps({"user_id": other_id}), content_type="application/json")
+        assert totals() == [0, 1]
+        self.post(client, "/tasks/batch", [{"title": "Bulk", "user_id": user_id}])
+        assert totals() == [1, 1]
+        client.patch(f"/tasks/{task['id']}/complete")
+        assert json.loads(client.get(f"/users/{other_id}/summary").data)["completed"] == 1
+        client.delete(f"/tasks/{task['id']}")
+        assert totals() == [1, 0]
+        remaining = [task.id for task in Task.query]
+        client.delete("/tasks/batch", data=json.dumps(remaining), content_type="application/json")
+        assert totals() == [0, 0]
+
+
+class TestConcurrentInserts:
+    """Unique values stay unique when concurrent requests insert them"""
+
+    def test_only_one_concurrent_insert_wins(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'concurrent.db'}", connect_args={"timeout": 30})
+        User.__table__.create(engine)
+        threads = 8
+        barrier = threading.Barrier(threads)
+        taken = []
+
+        def create_user(i):
+            with Session(engine) as session:
+                user = User(username="racer", email=f"racer{i}@example.com")
+                barrier.wait()  # start every INSERT at once
+                column = insert_unique(user, ("username", "email"), session)
+                if column is None:
+                    session.commit()
+                taken.append(column)
+
+        workers = [threading.Thread(target=create_user, args=(i,)) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert sorted(taken, key=str) == [None] + ["username"] * (threads - 1)
+        with Session(engine) as session:
+            assert session.query(User).count() == 1
+
+    def test_tag_name_conflict(self, client, db):
+        body = json.dumps({"name": "ops"})
+        assert client.post("/tags", data=body, content_type="application/json").status_code == 201
+
+        response = client.post("/tags", data=body, content_type="application/json")
+
+        assert response.status_code == 409
+        assert json.loads(response.data)["error"] == "Tag already exists"
+        assert tagging.tag_ids_by_name(["ops"]) == {"ops": Tag.query.one().id}
+
+
+class TestQueryCounts:
+    """Listing endpoints issue a fixed number of queries however many tasks they return"""
+
+    @pytest.mark.parametrize(
+        ("url", "page_size"), [("/tasks?limit=1000", 1000), ("/tasks/search?q=Task&limit=1000", 1000)]
+    )
+    def test_listing_statements_constant(self, client, db, url, page_size):
+        seed_tasks(db, 10)
+        with count_statements(db.engine) as small:
+            response = client.get(url)
+        assert response.status_code == 200
+        assert len(json.loads(response.data)) == 10
+
+        seed_tasks(db, 9990, start=10)
+        with count_statements(db.engine) as large:
+            response = client.get(url)
+        data = json.loads(response.data)
+        assert len(data) == page_size
+        assert sorted(data[-1]["tags"]) == ["backend", "urgent"]
+        assert len(large) == len(small)
+
+
+def full_scans(db, statement, parameters, table="tasks"):
+    """The steps of ``statement``'s plan that read every row of ``table``
+
+    That is a table scan, or an index scan with no condition on the index
+    (scanning a partial index is fine: it only holds the matching rows).
+    """
+    connection = db.session.connection()
+    indexes = db.metadata.tables[table].indexes
+    partial = {index.name for index in indexes if index.dialect_options["sqlite"]["where"] is not None}
+    if connection.dialect.name == "postgresql":
+        # The test tables are a few pages long; make the planner pick an index wherever one applies
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        nodes, scans = [plan[0]["Plan"]], []
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.get("Plans", []))
+            if node.get("Relation Name") != table:
+                continue
+            if node["Node Type"] == "Seq Scan" or (
+                "Index Name" in node and "Index Cond" not in node and node["Index Name"] not in partial
+            ):
+                scans.append(f"{node['Node Type']} {node.get('Index Name', '')}")
+        return scans
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [
+        detail
+        for *_, detail in rows
+        if detail.startswith(f"SCAN {table}") and not any(detail.endswith(f"INDEX {name}") for name in partial)
+    ]
+
+
+class TestListingIndexes:
+    """Every listed GET /tasks filter combination is served by an index, not a full scan"""
+
+    LISTINGS = [
+        "status=pending",
+        "priority=high",
+        "status=pending&priority=high",
+        "status=in_progress&sort=-due_date",
+        "user_id={user_id}",
+        "user_id={user_id}&status=pending",
+        "user_id={user_id}&completed=false",
+        "user_id={user_id}&priority=low&sort=due_date",
+        "completed=false",
+        "completed=false&sort=-created_at",
+    ]
+
+    @pytest.fixture
+    def tasks(self, db):
+        users = [User(username=f"indexed{i}", email=f"indexed{i}@example.com") for i in range(4)]
+        db.session.add_all(users)
+        db.session.flush()
+        statuses, priorities = ("pending", "in_progress", "completed"), ("high", "medium", "low")
+        combinations = itertools.product(statuses, priorities, (False, True), users)
+        db.session.execute(
+            insert(Task),
+            [
+                {"title": "Task", "status": status, "priority": priority, "completed": completed, "user_id": user.id}
+                for status, priority, completed, user in combinations
+            ],
+        )
+        db.session.commit()
+        if db.engine.dialect.name == "postgresql":
+            # Plan from statistics of this data, not from whatever autovacuum last saw
+            db.session.execute(text("ANALYZE tasks"))
+            db.session.commit()
+        return users[0].id
+
+    @pytest.mark.parametrize("listing", LISTINGS)
+    def test_listing_uses_an_index(self, client, db, tasks, listing):
+        url = f"/tasks?{listing.format(user_id=tasks)}&limit=1"
+        with count_statements(db.engine) as statements:
+            response = client.get(url)
+            link = response.headers["Link"]
+            assert client.get(link[1 : link.index(">")]).status_code == 200
+        pages = [(sql, params) for sql, params in statements if "FROM tasks" in sql and "LIMIT" in sql]
+        assert len(pages) == 2  # the first page, and the next one after a cursor
+
+        for sql, params in pages:
+            assert full_scans(db, sql, params) == [], sql
+
+
+class TestCommentIndexes:
+    """A page of a busy task's comments is read from the index, from the cursor on"""
+
+    def test_comment_page_uses_an_index(self, client, db):
+        seed_tasks(db, 2)
+        busy, quiet = (task.id for task in Task.query.order_by(Task.id))
+        db.session.execute(insert(Comment), [{"content": "busy", "task_id": busy} for _ in range(500)])
+        db.session.execute(insert(Comment), [{"content": "quiet", "task_id": quiet} for _ in range(5)])
+        db.session.commit()
+        if db.engine.dialect.name == "postgresql":
+            db.session.execute(text("ANALYZE comments"))
+            db.session.commit()
+
+        with count_statements(db.engine) as statements:
+            cursor = client.get(f"/tasks/{busy}/comments?limit=100").headers["X-Next-Cursor"]
+            response = client.get(f"/tasks/{busy}/comments?limit=100&cursor={cursor}")
+        assert len(json.loads(response.data)) == 100
+        pages = [(sql, params) for sql, params in statements if "FROM comments" in sql and "LIMIT" in sql]
+        assert len(pages) == 2
+
+        for sql, params in pages:
+            assert full_scans(db, sql, params, table="comments") == [], sql
+
+
+class TestMigrations:
+    """The migration scripts build the schema the models declare"""
+
+    def test_upgrade_matches_models_and_downgrade_removes_it(self, app, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+        config = Config()
+        config.set_main_option("script_location", os.path.join(os.path.dirname(__file__), "migrations"))
+        with engine.begin() as connection:
+            config.attributes["connection"] = connection
+            command.upgrade(config, "head")
+            context = MigrationContext.configure(connection, opts={"include_object": search.include_object})
+            assert compare_metadata(context, Task.metadata) == []
+
+            command.downgrade(config, "base")
+            assert inspect(connection).get_table_names() == ["alembic_version"]